@@ -2,22 +2,29 @@
 Main entry point for the Airulefy CLI.
 """
 
+import signal
 import sys
 from pathlib import Path
-from typing import List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 
 import typer
 from rich.console import Console
-from rich.table import Table
 
 from . import __version__
-from .config import SyncMode, load_config
-from .fsutils import find_markdown_files
-from .generator.cline import ClineGenerator
-from .generator.copilot import CopilotGenerator
-from .generator.cursor import CursorGenerator
-from .generator.devin import DevinGenerator
-from .watcher import watch_directory
+from .options import (
+    DEFAULT_MAX_LATENCY,
+    DEFAULT_METRICS_INTERVAL,
+    DEFAULT_QUIET_PERIOD,
+    DEFAULT_WATCH_BACKEND,
+    WatchBackend,
+)
+
+# Everything else is imported by the commands that need it: pydantic, yaml
+# and the generators cost more to import than most commands take to run, and
+# watchdog and rich tables are only used by one command each
+if TYPE_CHECKING:
+    from .build import ProjectResult, ToolResult
+    from .watcher import WatchedProject
 
 app = typer.Typer(
     help="Airulefy - Unify your AI rules across multiple AI coding agents.",
@@ -26,6 +33,14 @@ app = typer.Typer(
 
 console = Console()
 
+# How each sync strategy is described in the generate report, by SyncMode value
+SYNC_MODE_TEXT: Dict[Optional[str], str] = {
+    "symlink": "linked to",
+    "hardlink": "hardlinked to",
+    "reflink": "cloned to",
+    "copy": "copied to",
+}
+
 
 def get_project_root() -> Path:
     """Get the current project root."""
@@ -40,32 +55,129 @@ def generate(
     verbose: bool = typer.Option(
         False, "--verbose", "-v", help="Show verbose output"
     ),
+    force: bool = typer.Option(
+        False, "--force", "-f", help="Regenerate all rules even if nothing changed"
+    ),
+    jobs: int = typer.Option(
+        1, "--jobs", "-j", min=1,
+        help="Number of tools, or of projects with --all or --roots, to generate in parallel",
+    ),
+    all_projects: bool = typer.Option(
+        False, "--all", help="Generate for every project below the current directory"
+    ),
+    roots: Optional[List[Path]] = typer.Option(
+        None, "--roots", "--root",
+        help=(
+            "Generate for every project with a .ai-rules.yml or .ai/ below this directory "
+            "(repeatable)"
+        ),
+    ),
+    check: bool = typer.Option(
+        False, "--check",
+        help="Only check that the generated rules are up to date, writing nothing; exit 1 if not",
+    ),
+    profile: Optional[Path] = typer.Option(
+        None, "--profile",
+        help="Write the time, CPU time and I/O of each phase and tool to this JSON file",
+    ),
+    profile_stats: Optional[Path] = typer.Option(
+        None, "--profile-stats",
+        help="Write a cProfile dump of the run to this file, readable with pstats",
+    ),
 ):
     """Generate tool-specific rule files from .ai/ directory."""
-    project_root = get_project_root()
-    config = load_config(project_root)
-    
-    # Find markdown files in the input directory
-    input_dir = project_root / config.input_path
-    md_files = find_markdown_files(input_dir)
+    from .build import RuleBuilder, ToolStatus, build_projects
+    from .config import SyncMode, load_config
+    from .fsutils import find_project_roots
+    from .profiling import profile_phase, profiling
     
-    if not md_files:
-        console.print(f"[yellow]No Markdown files found in {input_dir}[/yellow]")
-        return
-    
-    if verbose:
-        console.print(f"Found {len(md_files)} Markdown files in {input_dir}")
-        for file in md_files:
-            console.print(f"  - {file.relative_to(project_root)}")
+    with profiling(profile, profile_stats) as profiler:
+        project_root = get_project_root()
+        # Force copy mode if requested
+        force_mode = SyncMode.COPY if copy else None
+        
+        if all_projects or roots:
+            # Build every project in this process instead of one process each
+            with profile_phase(profiler, "projects"):
+                project_roots = find_project_roots(roots or [project_root], include_input_dirs=True)
+            if not project_roots:
+                console.print(
+                    "[yellow]No projects with a .ai-rules.yml or .ai directory found.[/yellow]"
+                )
+                return
+            
+            if verbose:
+                console.print(f"Found {len(project_roots)} projects")
+            project_results = build_projects(
+                project_roots, force_mode, force, jobs, check=check, profiler=profiler
+            )
+            with profile_phase(profiler, "report"):
+                succeeded = print_project_results(project_results, verbose)
+            if not succeeded:
+                sys.exit(1)
+            return
+        
+        with profile_phase(profiler, "config"):
+            config = load_config(project_root, write_cache=not check)
+        builder = RuleBuilder(project_root, config, force_mode, jobs=jobs, profiler=profiler)
+        
+        # Find markdown files in the input directory
+        input_dir = builder.input_dir
+        md_files = builder.find_input_files()
+        
+        if not md_files:
+            console.print(f"[yellow]No Markdown files found in {input_dir}[/yellow]")
+            return
+        
+        if verbose:
+            console.print(f"Found {len(md_files)} Markdown files in {input_dir}")
+            for file in md_files:
+                console.print(f"  - {file.relative_to(project_root)}")
+        
+        if check:
+            # Compare the outputs with what would be generated, writing nothing
+            results = builder.check(md_files)
+            with profile_phase(profiler, "report"):
+                print_results(results, project_root, verbose, summary=False)
+            out_of_date = [
+                result.tool_name
+                for result in results
+                if result.status in (ToolStatus.STALE, ToolStatus.FAILED)
+            ]
+            if out_of_date:
+                console.print(f"[red]Rules are out of date for: {', '.join(out_of_date)}[/red]")
+                sys.exit(1)
+            console.print("[green]All rules are up to date.[/green]")
+            return
+        
+        # Generate for each tool
+        results = builder.build(md_files, force=force)
+        with profile_phase(profiler, "report"):
+            print_results(results, project_root, verbose)
+
+
+def print_results(
+    results: List["ToolResult"],
+    project_root: Path,
+    verbose: bool = False,
+    summary: bool = True,
+) -> None:
+    """
+    Print the outcome of a build for each tool and a summary.
     
-    # Force copy mode if requested
-    force_mode = SyncMode.COPY if copy else None
+    Args:
+        results: Build results
+        project_root: Path to the project root
+        verbose: Whether to show verbose output
+        summary: Whether to print the summary line
+    """
+    from .build import ToolStatus
     
-    # Generate for each tool
     success_count = 0
-    for tool_name, tool_config in config.tools.items():
-        generator = get_generator(tool_name, tool_config, project_root)
-        if not generator:
+    unchanged_count = 0
+    for result in results:
+        tool_name = result.tool_name
+        if result.status == ToolStatus.SKIPPED:
             if verbose:
                 console.print(f"[yellow]Skipping unknown tool: {tool_name}[/yellow]")
             continue
@@ -73,29 +185,206 @@ def generate(
         if verbose:
             console.print(f"Generating rules for {tool_name}...")
         
-        success = generator.generate(md_files, force_mode)
+        if result.status == ToolStatus.FAILED:
+            if result.error:
+                console.print(f"[red]✗[/red] {tool_name}: {result.error}")
+            else:
+                console.print(f"[red]✗[/red] {tool_name}: Failed to generate rules")
+            continue
         
-        if success:
-            success_count += 1
-            mode_text = "copied to" if force_mode == SyncMode.COPY or tool_config.mode == SyncMode.COPY else "linked to"
-            rel_path = generator.output_path.relative_to(project_root)
-            console.print(f"[green]✓[/green] {tool_name}: {mode_text} [blue]{rel_path}[/blue]")
+        if result.status == ToolStatus.STALE:
+            console.print(f"[red]✗[/red] {tool_name}: out of date")
+            for stale_file in result.stale_files:
+                console.print(f"  - [blue]{stale_file.relative_to(project_root)}[/blue]")
+            continue
+        
+        success_count += 1
+        if result.output_path is None:
+            continue
+        rel_path = result.output_path.relative_to(project_root)
+        if result.status == ToolStatus.UNCHANGED:
+            unchanged_count += 1
+            console.print(f"[green]✓[/green] {tool_name}: unchanged [blue]{rel_path}[/blue]")
         else:
-            console.print(f"[red]✗[/red] {tool_name}: Failed to generate rules")
+            mode_text = SYNC_MODE_TEXT.get(result.sync_mode, "copied to")
+            console.print(f"[green]✓[/green] {tool_name}: {mode_text} [blue]{rel_path}[/blue]")
+        
+        for kept_file in result.kept_files:
+            console.print(
+                f"  [yellow]Kept modified file that is no longer generated:[/yellow] "
+                f"[blue]{kept_file.relative_to(project_root)}[/blue]"
+            )
     
+    if not summary:
+        return
     if success_count == 0:
         console.print("[red]No rules were generated successfully.[/red]")
+    elif unchanged_count:
+        console.print(
+            f"[green]Successfully generated rules for {success_count} tools "
+            f"({unchanged_count} unchanged).[/green]"
+        )
     else:
         console.print(f"[green]Successfully generated rules for {success_count} tools.[/green]")
 
 
+def print_project_results(project_results: List["ProjectResult"], verbose: bool = False) -> bool:
+    """
+    Print the outcome of a batch build for each project and one summary.
+    
+    Args:
+        project_results: Build results per project
+        verbose: Whether to show verbose output
+    
+    Returns:
+        bool: True if every project was built without failures
+    """
+    from .build import ToolStatus
+    
+    counts = {status: 0 for status in ToolStatus}
+    failed_projects = 0
+    for project_result in project_results:
+        project_root = project_result.project_root
+        console.print(f"[bold]{project_root}[/bold]")
+        if project_result.error is not None:
+            failed_projects += 1
+            console.print(f"[red]✗[/red] {project_result.error}")
+            continue
+        if not project_result.results:
+            console.print("[yellow]No Markdown files found[/yellow]")
+            continue
+        
+        print_results(project_result.results, project_root, verbose, summary=False)
+        for result in project_result.results:
+            counts[result.status] += 1
+        if any(
+            result.status in (ToolStatus.FAILED, ToolStatus.STALE)
+            for result in project_result.results
+        ):
+            failed_projects += 1
+    
+    generated = counts[ToolStatus.GENERATED]
+    unchanged = counts[ToolStatus.UNCHANGED]
+    summary = (
+        f"{len(project_results)} projects: {generated + unchanged} tools succeeded "
+        f"({unchanged} unchanged), {counts[ToolStatus.FAILED]} failed."
+    )
+    if counts[ToolStatus.STALE]:
+        summary += f" {counts[ToolStatus.STALE]} tools out of date."
+    if failed_projects:
+        console.print(f"[red]{summary} {failed_projects} of them had errors.[/red]")
+        return False
+    console.print(f"[green]{summary}[/green]")
+    return True
+
+
 @app.command()
 def watch(
     copy: bool = typer.Option(
         False, "--copy", "-c", help="Force copy mode instead of symlink"
     ),
+    debounce: float = typer.Option(
+        DEFAULT_QUIET_PERIOD, "--debounce", min=0.0,
+        help="Seconds without changes to wait before regenerating",
+    ),
+    max_latency: float = typer.Option(
+        DEFAULT_MAX_LATENCY, "--max-latency", min=0.0,
+        help="Maximum seconds to delay regeneration while changes keep arriving",
+    ),
+    roots: Optional[List[Path]] = typer.Option(
+        None, "--roots", "--root",
+        help="Watch every project with a .ai-rules.yml below this directory (repeatable)",
+    ),
+    backend: WatchBackend = typer.Option(
+        DEFAULT_WATCH_BACKEND, "--backend",
+        help="Source of file change events: native, polling, or native with a fallback to polling",
+    ),
+    metrics_file: Optional[Path] = typer.Option(
+        None, "--metrics-file",
+        help="Keep a Prometheus text file with latency and rebuild metrics up to date",
+    ),
+    metrics_interval: float = typer.Option(
+        DEFAULT_METRICS_INTERVAL, "--metrics-interval", min=0.1,
+        help="Seconds between rewrites of the metrics file",
+    ),
 ):
     """Watch .ai/ directory for changes and regenerate rules automatically."""
+    from .config import SyncMode, load_config
+    from .fsutils import find_project_roots
+    from .metrics import MetricsExporter, WatchMetrics
+    from .watcher import WatchedProject, watch_project, watch_projects
+    
+    force_mode = SyncMode.COPY if copy else None
+    metrics = WatchMetrics()
+    
+    def serve(run: Callable[[], None]) -> None:
+        exporter = None
+        if metrics_file:
+            exporter = MetricsExporter(metrics, metrics_file, metrics_interval)
+        # Print a summary of the metrics on demand
+        previous_handler = None
+        if hasattr(signal, "SIGUSR1"):
+            previous_handler = signal.signal(
+                signal.SIGUSR1,
+                lambda signum, frame: console.print(
+                    metrics.summary(), markup=False, highlight=False, soft_wrap=True
+                ),
+            )
+        if exporter is not None:
+            exporter.start()
+        try:
+            run()
+        finally:
+            if exporter is not None:
+                exporter.stop()
+            if previous_handler is not None:
+                signal.signal(signal.SIGUSR1, previous_handler)
+    
+    # Event storms already reported, per project root
+    rescans: Dict[Path, int] = {}
+    
+    def report(project: "WatchedProject", results: List["ToolResult"]) -> None:
+        if roots:
+            console.print(f"[bold]{project.project_root}[/bold]")
+        if project.rescans != rescans.get(project.project_root, 0):
+            rescans[project.project_root] = project.rescans
+            console.print(
+                f"[yellow]Too many changes at once, rescanned {project.input_dir} "
+                f"(event storms so far: {project.rescans})[/yellow]"
+            )
+        if not results:
+            console.print(f"[yellow]No Markdown files found in {project.input_dir}[/yellow]")
+            return
+        print_results(results, project.project_root)
+    
+    def report_fallback() -> None:
+        console.print(
+            "[yellow]Native file system events are not delivered, switching to polling[/yellow]"
+        )
+    
+    if roots:
+        # Host all projects in this process, sharing one observer
+        project_roots = find_project_roots(roots)
+        if not project_roots:
+            console.print("[yellow]No projects with a .ai-rules.yml found.[/yellow]")
+            return
+        
+        projects = [WatchedProject(project_root, force_mode) for project_root in project_roots]
+        console.print(f"Watching {len(projects)} projects for changes...")
+        console.print("Press Ctrl+C to stop.")
+        
+        # Initial generation, reported unless nothing needed rebuilding
+        for project in projects:
+            results = project.regenerate()
+            if results is not None:
+                report(project, results)
+        
+        serve(lambda: watch_projects(
+            projects, report, quiet_period=debounce, max_latency=max_latency,
+            backend=backend, metrics=metrics, on_fallback=report_fallback,
+        ))
+        return
+    
     project_root = get_project_root()
     config = load_config(project_root)
     
@@ -109,22 +398,37 @@ def watch(
     console.print(f"Watching [blue]{config.input_path}[/blue] for changes...")
     console.print("Press Ctrl+C to stop.")
     
-    # Initial generation
-    generate(copy=copy, verbose=False)
+    # The project keeps its configuration, input file index and manifest
+    # between regenerations, so each change only touches the affected files
+    project = WatchedProject(project_root, force_mode)
+    
+    # Initial generation, reported unless nothing needed rebuilding
+    results = project.regenerate()
+    if results is not None:
+        report(project, results)
     
     # Start watching
-    watch_directory(input_dir, lambda: generate(copy=copy, verbose=False))
+    serve(lambda: watch_project(
+        project, report, quiet_period=debounce, max_latency=max_latency,
+        backend=backend, metrics=metrics, on_fallback=report_fallback,
+    ))
 
 
 @app.command()
 def validate():
     """Validate the configuration and rule files."""
+    from .build import get_generator
+    from .config import load_config
+    from .fsutils import find_markdown_files
+    
     project_root = get_project_root()
     config = load_config(project_root)
     
     # Find markdown files in the input directory
     input_dir = project_root / config.input_path
-    md_files = find_markdown_files(input_dir)
+    md_files = find_markdown_files(
+        input_dir, max_depth=config.max_depth, follow_symlinks=config.follow_symlinks
+    )
     
     # Validation checks
     errors = []
@@ -147,8 +451,26 @@ def validate():
         
         # Check if output path is valid
         output_path = generator.output_path
-        if output_path.exists() and not output_path.is_file() and not output_path.is_symlink():
+        if generator.emits_directory:
+            if output_path.exists() and not output_path.is_dir():
+                errors.append(
+                    f"Output path for {tool_name} exists but is not a directory: {output_path}"
+                )
+        elif output_path.exists() and not output_path.is_file() and not output_path.is_symlink():
             errors.append(f"Output path for {tool_name} exists but is not a file: {output_path}")
+        
+        # Outputs inside the input directory are skipped as inputs, but cause
+        # extra file events while watching
+        resolved_input = input_dir.resolve()
+        resolved_output = output_path.resolve()
+        if (
+            resolved_output == resolved_input
+            or resolved_input in resolved_output.parents
+            or resolved_output in resolved_input.parents
+        ):
+            warnings.append(
+                f"Output path for {tool_name} overlaps the input directory: {output_path}"
+            )
     
     # Display results
     if not errors and not warnings:
@@ -172,6 +494,11 @@ def validate():
 @app.command(name="list-tools")
 def list_tools():
     """List supported AI tools and their configurations."""
+    from rich.table import Table
+    
+    from .build import get_generator
+    from .config import load_config
+    
     project_root = get_project_root()
     config = load_config(project_root)
     
@@ -204,22 +531,6 @@ def list_tools():
     console.print(table)
 
 
-def get_generator(tool_name: str, tool_config, project_root: Path):
-    """Get the generator for the specified tool."""
-    generators = {
-        "cursor": CursorGenerator,
-        "cline": ClineGenerator,
-        "copilot": CopilotGenerator,
-        "devin": DevinGenerator,
-    }
-    
-    generator_class = generators.get(tool_name)
-    if not generator_class:
-        return None
-    
-    return generator_class(tool_name, tool_config, project_root)
-
-
 @app.callback(invoke_without_command=True)
 def main(
     version: bool = typer.Option(False, "--version", "-V", help="Show version and exit."),
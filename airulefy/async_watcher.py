@@ -0,0 +1,218 @@
+"""
+Asyncio interface to watch mode for Airulefy.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .build import ToolResult
+from .metrics import WatchMetrics
+from .options import (
+    DEFAULT_MAX_LATENCY,
+    DEFAULT_QUIET_PERIOD,
+    DEFAULT_WATCH_BACKEND,
+    WatchBackend,
+)
+from .watcher import ChangeSet, RuleWatcher, WatchedProject
+
+
+class AsyncRegenerationWorker:
+    """
+    Run regenerations one at a time in an executor, scheduled by an event loop.
+    
+    A drop-in replacement for RegenerationWorker: changes are queued and
+    merged per callback in the same way, but waiting for them costs no
+    thread. submit() and stop() can be called from any thread except the
+    event loop's, which only start() must be called from.
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, executor: Optional[Executor] = None):
+        """
+        Initialize the worker.
+        
+        Args:
+            loop: Event loop scheduling the regenerations
+            executor: Executor running the regenerations (default: the
+                loop's default executor)
+        """
+        self.loop = loop
+        self.executor = executor
+        # Queued change sets keyed by callback, in submission order
+        self._queued: Dict[Callable[[ChangeSet], None], ChangeSet] = {}
+        self._stopped = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        """Start processing submissions. Must be called from the event loop."""
+        self._task = self.loop.create_task(self._run())
+    
+    def submit(self, changes: ChangeSet, callback: Callable[[ChangeSet], None]) -> None:
+        """
+        Queue changes for regeneration.
+        
+        Args:
+            changes: Changes to process
+            callback: Function to process them with
+        """
+        self.loop.call_soon_threadsafe(self._enqueue, changes.model_copy(deep=True), callback)
+    
+    def stop(self) -> None:
+        """Process the queued changes, then stop. Blocks until done."""
+        asyncio.run_coroutine_threadsafe(self.aclose(), self.loop).result()
+    
+    async def aclose(self) -> None:
+        """Process the queued changes, then stop."""
+        # Scheduled behind the submissions made before this call
+        self.loop.call_soon(self._request_stop)
+        if self._task is not None:
+            await self._task
+    
+    def _request_stop(self) -> None:
+        """Stop once the queue is empty. Runs on the event loop."""
+        self._stopped = True
+        self._wakeup.set()
+    
+    def _enqueue(self, changes: ChangeSet, callback: Callable[[ChangeSet], None]) -> None:
+        """Merge changes into the queue. Runs on the event loop."""
+        if self._stopped:
+            return
+        if callback in self._queued:
+            self._queued[callback].update(changes)
+        else:
+            self._queued[callback] = changes
+        self._wakeup.set()
+    
+    async def _run(self) -> None:
+        """Process queued change sets until stopped."""
+        while True:
+            while not self._queued:
+                if self._stopped:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            
+            # Later submissions for this callback start a new change set
+            callback = next(iter(self._queued))
+            changes = self._queued.pop(callback)
+            
+            try:
+                await self.loop.run_in_executor(self.executor, callback, changes)
+            except Exception as e:
+                print(f"Error regenerating rules: {e}")
+
+
+class AsyncRuleWatcher:
+    """
+    Watch projects from an asyncio event loop, yielding their regeneration results.
+    
+    File system events are observed and debounced as by RuleWatcher, and
+    regenerations run in an executor, so the event loop is never blocked.
+    Iterating over the watcher yields a (project, results) pair for each
+    regeneration until the watcher is stopped. Results are buffered until
+    they are consumed.
+    
+    Example:
+        async with AsyncRuleWatcher([WatchedProject(root)]) as watcher:
+            async for project, results in watcher:
+                ...
+    """
+    
+    def __init__(
+        self,
+        projects: Iterable[WatchedProject] = (),
+        quiet_period: float = DEFAULT_QUIET_PERIOD,
+        max_latency: float = DEFAULT_MAX_LATENCY,
+        backend: WatchBackend = DEFAULT_WATCH_BACKEND,
+        metrics: Optional[WatchMetrics] = None,
+        executor: Optional[Executor] = None,
+        on_fallback: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Initialize the watcher.
+        
+        Args:
+            projects: Projects to watch
+            quiet_period: Seconds without events to wait before regenerating
+            max_latency: Maximum seconds to delay regeneration during a burst
+            backend: Source of file system events
+            metrics: Metrics to record latencies, durations and event counts in
+            executor: Executor running the regenerations (default: the
+                running loop's default executor)
+            on_fallback: Function called when the auto backend switches to polling
+        """
+        self.projects = list(projects)
+        self.quiet_period = quiet_period
+        self.max_latency = max_latency
+        self.backend = backend
+        self.metrics = metrics
+        self.executor = executor
+        self.on_fallback = on_fallback
+        self._watcher: Optional[RuleWatcher] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Results of each regeneration, ended by None once stopped
+        self._results: asyncio.Queue[Optional[Tuple[WatchedProject, List[ToolResult]]]] = (
+            asyncio.Queue()
+        )
+    
+    async def start(self) -> None:
+        """Start watching the projects."""
+        self._loop = asyncio.get_running_loop()
+        worker = AsyncRegenerationWorker(self._loop, self.executor)
+        self._watcher = RuleWatcher(
+            self._on_results,
+            self.quiet_period,
+            self.max_latency,
+            self.backend,
+            self.metrics,
+            worker=worker,
+            on_fallback=self.on_fallback,
+        )
+        for project in self.projects:
+            self._watcher.add_project(project)
+        self._watcher.start()
+    
+    async def stop(self) -> None:
+        """Stop watching, after processing pending changes, and end the iteration."""
+        if self._watcher is None:
+            return
+        
+        watcher, self._watcher = self._watcher, None
+        # Stopping joins the observer threads and waits for the worker,
+        # which needs the event loop to keep running
+        await self._running_loop().run_in_executor(None, watcher.stop)
+        self._results.put_nowait(None)
+    
+    async def __aenter__(self) -> "AsyncRuleWatcher":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
+    
+    def __aiter__(self) -> "AsyncRuleWatcher":
+        return self
+    
+    async def __anext__(self) -> Tuple[WatchedProject, List[ToolResult]]:
+        item = await self._results.get()
+        if item is None:
+            # Let further iterations end as well
+            self._results.put_nowait(None)
+            raise StopAsyncIteration
+        return item
+    
+    def _on_results(self, project: WatchedProject, results: List[ToolResult]) -> None:
+        """Hand results over from the executor to the event loop."""
+        self._running_loop().call_soon_threadsafe(self._results.put_nowait, (project, results))
+    
+    def _running_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Get the event loop the watcher was started from.
+        
+        Raises:
+            RuntimeError: If the watcher has not been started
+        """
+        if self._loop is None:
+            raise RuntimeError("The watcher has not been started")
+        return self._loop
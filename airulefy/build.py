@@ -0,0 +1,676 @@
+"""
+Rule generation pipeline for Airulefy.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel, Field
+
+from .config import AirulefyConfig, SyncMode, ToolConfig, load_config
+from .fsutils import (
+    IGNORE_FILE,
+    IgnoreRules,
+    find_markdown_files,
+    is_markdown_input,
+    load_ignore_rules,
+    read_markdown_files,
+)
+from .generator.base import RuleGenerator
+from .generator.cline import ClineGenerator
+from .generator.copilot import CopilotGenerator
+from .generator.cursor import CursorGenerator
+from .generator.devin import DevinGenerator
+from .manifest import (
+    RACY_WINDOW_NS,
+    BuildManifest,
+    OutputFileRecord,
+    config_digest,
+    inputs_digest,
+    load_manifest,
+    record_output,
+    save_manifest,
+)
+from .profiling import Profiler, profile_phase
+
+# Inputs up to this total size are read once and shared by all generators.
+# Larger rule sets are streamed from disk by each generator instead, keeping
+# memory use bounded.
+SHARED_CONTENT_LIMIT = 8 * 1024 * 1024
+
+
+class ToolStatus(str, Enum):
+    """Outcome of generating the rules for one tool."""
+    
+    GENERATED = "generated"
+    UNCHANGED = "unchanged"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+    STALE = "stale"
+
+
+class ToolResult(BaseModel):
+    """Result of generating the rules for one tool."""
+    
+    tool_name: str = Field(description="Name of the AI tool")
+    status: ToolStatus = Field(description="Outcome of the generation")
+    output_path: Optional[Path] = Field(default=None, description="Path to the output file")
+    sync_mode: Optional[SyncMode] = Field(
+        default=None, description="Strategy used to place a regenerated output"
+    )
+    error: Optional[str] = Field(default=None, description="Error message for failed tools")
+    duration: Optional[float] = Field(
+        default=None, description="Seconds spent generating the outputs (None if not regenerated)"
+    )
+    stale_files: List[Path] = Field(
+        default_factory=list, description="Output files found out of date by a check"
+    )
+    kept_files: List[Path] = Field(
+        default_factory=list,
+        description="Modified output files no longer generated, which were not removed",
+    )
+
+
+class ProjectResult(BaseModel):
+    """Result of generating the rules for one project of a batch."""
+    
+    project_root: Path = Field(description="Path to the project root")
+    input_count: int = Field(default=0, description="Number of input Markdown files found")
+    results: List[ToolResult] = Field(default_factory=list, description="Results per tool")
+    error: Optional[str] = Field(
+        default=None, description="Error that prevented building the project"
+    )
+
+
+def get_generator(
+    tool_name: str, tool_config: ToolConfig, project_root: Path
+) -> Optional[RuleGenerator]:
+    """Get the generator for the specified tool."""
+    generators: Dict[str, Type[RuleGenerator]] = {
+        "cursor": CursorGenerator,
+        "cline": ClineGenerator,
+        "copilot": CopilotGenerator,
+        "devin": DevinGenerator,
+    }
+    
+    generator_class = generators.get(tool_name)
+    if not generator_class:
+        return None
+    
+    return generator_class(tool_name, tool_config, project_root)
+
+
+def _completed(results: List[Optional[ToolResult]]) -> List[ToolResult]:
+    """Get the results once every placeholder has been filled in."""
+    completed = [result for result in results if result is not None]
+    if len(completed) != len(results):
+        raise RuntimeError("Results are missing for some of the tools")
+    return completed
+
+
+class RuleBuilder:
+    """Generate the rule files of all configured tools for a project."""
+    
+    def __init__(
+        self,
+        project_root: Path,
+        config: AirulefyConfig,
+        force_mode: Optional[SyncMode] = None,
+        jobs: int = 1,
+        profiler: Optional[Profiler] = None,
+    ):
+        """
+        Initialize the builder.
+        
+        Args:
+            project_root: Path to the project root
+            config: Project configuration
+            force_mode: Force a specific sync mode for all tools (overrides config)
+            jobs: Maximum number of tools to generate concurrently
+            profiler: Profiler to record the time and I/O of each phase in
+        """
+        self.project_root = project_root
+        self.config = config
+        self.force_mode = force_mode
+        self.jobs = max(1, jobs)
+        self.profiler = profiler
+        self.input_dir = project_root / config.input_path
+        # State kept between rebuilds by long-running processes (watch mode)
+        self._index: Optional[Set[Path]] = None
+        self._ignore_rules: Optional[IgnoreRules] = None
+        self._manifest: Optional[BuildManifest] = None
+        self._output_paths = self._find_output_paths()
+    
+    @property
+    def input_files(self) -> List[Path]:
+        """Input files in the index kept by rebuild(), in processing order."""
+        return sorted(self._index or ())
+    
+    def find_input_files(self) -> List[Path]:
+        """
+        Find the Markdown files in the input directory.
+        
+        Returns:
+            List of input files in processing order
+        """
+        with profile_phase(self.profiler, "discovery"):
+            self._ignore_rules = load_ignore_rules(self.input_dir)
+            files = find_markdown_files(
+                self.input_dir,
+                max_depth=self.config.max_depth,
+                follow_symlinks=self.config.follow_symlinks,
+                rules=self._ignore_rules,
+            )
+        # Generated rules placed inside the input directory are not inputs
+        return [f for f in files if not self.is_output_path(f)]
+    
+    def is_output_path(self, path: Path) -> bool:
+        """
+        Check whether a path is, or is inside, the output of a configured tool.
+        
+        Args:
+            path: Path to check
+        
+        Returns:
+            bool: True if the path is generated by this builder
+        """
+        return any(
+            path == output_path or output_path in path.parents
+            for output_path in self._output_paths
+        )
+    
+    def output_records(self) -> Dict[Path, OutputFileRecord]:
+        """
+        Get the recorded state of the output files of the last build.
+        
+        Returns:
+            Dict mapping output file paths to their records
+        """
+        if self._manifest is None:
+            return {}
+        
+        return {
+            self.project_root / key: file_record
+            for record in self._manifest.outputs.values()
+            for key, file_record in record.files.items()
+        }
+    
+    def _find_output_paths(self) -> List[Path]:
+        """Get the output paths of the configured tools."""
+        output_paths = []
+        for tool_name, tool_config in self.config.tools.items():
+            generator = get_generator(tool_name, tool_config, self.project_root)
+            if generator:
+                output_paths.append(generator.output_path)
+        return output_paths
+    
+    def update_input_files(self, paths: Iterable[Path]) -> Set[Path]:
+        """
+        Update the input file index for paths reported as changed.
+        
+        Only the given paths are examined, except that a directory path is
+        searched for Markdown files and a change to the ignore file causes
+        a full rescan.
+        
+        Args:
+            paths: Created, modified, deleted or moved files and directories
+        
+        Returns:
+            Set of input files that were added, removed or may have been modified
+        """
+        paths = set(paths)
+        if (
+            self._index is None
+            or self._ignore_rules is None
+            or self.input_dir / IGNORE_FILE in paths
+        ):
+            previous = self._index or set()
+            self._index = set(self.find_input_files())
+            return (previous ^ self._index) | (self._index & paths)
+        
+        affected: Set[Path] = set()
+        for path in paths:
+            if path in self._index or path.suffix == ".md":
+                if not self.is_output_path(path) and is_markdown_input(
+                    self.input_dir,
+                    path,
+                    max_depth=self.config.max_depth,
+                    follow_symlinks=self.config.follow_symlinks,
+                    rules=self._ignore_rules,
+                ):
+                    self._index.add(path)
+                    affected.add(path)
+                elif path in self._index:
+                    self._index.discard(path)
+                    affected.add(path)
+                continue
+            
+            # A directory that was created, removed or moved as a whole
+            contained = {f for f in self._index if path in f.parents}
+            found = set()
+            if path.is_dir():
+                found = {
+                    f for f in find_markdown_files(
+                        self.input_dir,
+                        max_depth=self.config.max_depth,
+                        follow_symlinks=self.config.follow_symlinks,
+                        start=path,
+                        rules=self._ignore_rules,
+                    )
+                    if not self.is_output_path(f)
+                }
+            self._index = (self._index - contained) | found
+            affected |= contained | found
+        
+        return affected
+    
+    def rebuild(self, changed_paths: Optional[Iterable[Path]] = None) -> Optional[List[ToolResult]]:
+        """
+        Regenerate the rules after changes, keeping state between calls.
+        
+        The input file index and the manifest are kept in memory, so only the
+        changed paths are examined and only the changed inputs are stat'ed
+        and hashed. Tools whose outputs are still current are skipped as in
+        build().
+        
+        Args:
+            changed_paths: Paths reported as changed since the previous call,
+                or None to rediscover all input files
+        
+        Returns:
+            List of results, an empty list if there are no input files, or
+            None if none of the changed paths affects the inputs
+        """
+        if changed_paths is None or self._index is None:
+            self._index = set(self.find_input_files())
+            changed = None
+        else:
+            changed = self.update_input_files(changed_paths)
+            if not changed:
+                return None
+        
+        if not self._index:
+            return []
+        
+        return self.build(self.input_files, changed=changed)
+    
+    def reload_config(self, config: AirulefyConfig) -> Optional[Set[str]]:
+        """
+        Switch to a new configuration, keeping the state that is still valid.
+        
+        Args:
+            config: New project configuration
+        
+        Returns:
+            Names of the tools whose configuration changed, or None if the
+            input files must be rediscovered because the input settings changed
+        """
+        previous = self.config
+        previous_outputs = self._output_paths
+        self.config = config
+        self._output_paths = self._find_output_paths()
+        
+        if (
+            previous.input_path != config.input_path
+            or previous.max_depth != config.max_depth
+            or previous.follow_symlinks != config.follow_symlinks
+            or any(
+                # Outputs moved into or out of the input directory change the inputs
+                self.input_dir in output_path.parents or output_path in self.input_dir.parents
+                for output_path in set(self._output_paths) ^ set(previous_outputs)
+            )
+        ):
+            self.input_dir = self.project_root / config.input_path
+            self._index = None
+            self._ignore_rules = None
+            return None
+        
+        return {
+            tool_name
+            for tool_name in set(previous.tools) | set(config.tools)
+            if previous.tools.get(tool_name) != config.tools.get(tool_name)
+        }
+    
+    def rebuild_tools(self, tool_names: Set[str]) -> List[ToolResult]:
+        """
+        Regenerate the rules of some tools from the indexed input files.
+        
+        Args:
+            tool_names: Names of the tools to regenerate
+        
+        Returns:
+            List of results for the given tools that are configured
+        """
+        if self._index is None:
+            self._index = set(self.find_input_files())
+        if not self._index:
+            return []
+        
+        return self.build(self.input_files, changed=set(), tools=tool_names)
+    
+    def check(self, input_files: List[Path]) -> List[ToolResult]:
+        """
+        Check whether the outputs of all configured tools are up to date.
+        
+        Every output is rendered in memory and compared with the file on
+        disk. Nothing is written, not even the build manifest, so this works
+        on read-only checkouts.
+        
+        Args:
+            input_files: Input Markdown files
+        
+        Returns:
+            List of results, in the order of the configured tools: UNCHANGED
+            for tools whose outputs are up to date, STALE for the others
+        """
+        # Generators fill in their placeholder once they have been checked
+        results: List[Optional[ToolResult]] = []
+        generators: List[Tuple[int, RuleGenerator]] = []
+        for tool_name, tool_config in self.config.tools.items():
+            generator = get_generator(tool_name, tool_config, self.project_root)
+            if not generator:
+                results.append(ToolResult(tool_name=tool_name, status=ToolStatus.SKIPPED))
+                continue
+            generators.append((len(results), generator))
+            results.append(None)
+        
+        # Read and combine the input files once, as build() does
+        content = None
+        try:
+            if any(not generator.identity_transform for _, generator in generators):
+                total_size = sum(os.stat(file_path).st_size for file_path in input_files)
+                if total_size <= SHARED_CONTENT_LIMIT:
+                    with profile_phase(self.profiler, "read"):
+                        content = read_markdown_files(input_files)
+        except (OSError, UnicodeDecodeError) as e:
+            for index, generator in generators:
+                results[index] = ToolResult(
+                    tool_name=generator.tool_name,
+                    status=ToolStatus.FAILED,
+                    output_path=generator.output_path,
+                    error=f"Failed to read Markdown files: {e}",
+                )
+            return _completed(results)
+        
+        for index, generator in generators:
+            try:
+                with profile_phase(self.profiler, "check", generator.tool_name):
+                    stale_files = generator.check(
+                        input_files, self.force_mode, content=content, source_root=self.input_dir
+                    )
+            except (OSError, UnicodeDecodeError) as e:
+                results[index] = ToolResult(
+                    tool_name=generator.tool_name,
+                    status=ToolStatus.FAILED,
+                    output_path=generator.output_path,
+                    error=f"Failed to check outputs: {e}",
+                )
+                continue
+            
+            results[index] = ToolResult(
+                tool_name=generator.tool_name,
+                status=ToolStatus.STALE if stale_files else ToolStatus.UNCHANGED,
+                output_path=generator.output_path,
+                stale_files=stale_files,
+            )
+        
+        return _completed(results)
+    
+    def build(
+        self,
+        input_files: List[Path],
+        force: bool = False,
+        changed: Optional[Set[Path]] = None,
+        tools: Optional[Set[str]] = None,
+    ) -> List[ToolResult]:
+        """
+        Generate the rule files for all configured tools.
+        
+        The build manifest is used to skip tools whose configuration, inputs
+        and output are unchanged since the last run. In that case no input
+        file is opened at all. Otherwise the inputs are read and combined
+        once and shared by all tools that need regenerating.
+        
+        Args:
+            input_files: Input Markdown files
+            force: Regenerate every tool even if the manifest shows it is up to date
+            changed: Input files known to have changed since the previous
+                build by this builder. Other inputs are then trusted to be
+                unchanged without checking them.
+            tools: Names of the tools to generate (default: all configured tools)
+        
+        Returns:
+            List of results, in the order of the configured tools
+        """
+        scan_started_ns = time.time_ns()
+        with profile_phase(self.profiler, "scan"):
+            if changed is not None and self._manifest is not None:
+                manifest = self._manifest
+            else:
+                manifest = load_manifest(self.project_root)
+            inputs = manifest.scan_inputs(input_files, self.project_root, changed)
+            inputs_hash = inputs_digest(inputs)
+        
+        updated = BuildManifest(inputs=inputs)
+        results: List[Optional[ToolResult]] = []
+        # Index of the result, generator and configuration digest of each tool to generate
+        pending: List[Tuple[int, RuleGenerator, str]] = []
+        
+        # Work out which tools need regenerating
+        for tool_name, tool_config in self.config.tools.items():
+            if tools is not None and tool_name not in tools:
+                # Keep the records of tools left alone
+                if tool_name in manifest.outputs:
+                    updated.outputs[tool_name] = manifest.outputs[tool_name]
+                continue
+            
+            generator = get_generator(tool_name, tool_config, self.project_root)
+            if not generator:
+                results.append(ToolResult(tool_name=tool_name, status=ToolStatus.SKIPPED))
+                continue
+            
+            mode = self.force_mode if self.force_mode is not None else tool_config.mode
+            config_hash = config_digest(generator, mode)
+            
+            if not force and manifest.is_output_current(
+                tool_name, config_hash, inputs_hash, self.project_root
+            ):
+                updated.outputs[tool_name] = manifest.outputs[tool_name]
+                results.append(ToolResult(
+                    tool_name=tool_name,
+                    status=ToolStatus.UNCHANGED,
+                    output_path=generator.output_path,
+                ))
+                continue
+            
+            # Filled in once the tool has been generated
+            pending.append((len(results), generator, config_hash))
+            results.append(None)
+        
+        if pending:
+            changed_inputs = manifest.changed_inputs(inputs, self.project_root)
+            content = None
+            read_error = None
+            
+            # Read and combine the input files once, shared by all generators
+            # that transform it. Identity generators copy the files directly.
+            needs_content = any(not generator.identity_transform for _, generator, _ in pending)
+            total_size = sum(record.size for record in inputs.values())
+            if needs_content and total_size <= SHARED_CONTENT_LIMIT:
+                try:
+                    with profile_phase(self.profiler, "read"):
+                        content = read_markdown_files(input_files)
+                except (OSError, UnicodeDecodeError) as e:
+                    read_error = f"Failed to read Markdown files: {e}"
+            
+            if read_error is not None:
+                for index, generator, _ in pending:
+                    results[index] = ToolResult(
+                        tool_name=generator.tool_name,
+                        status=ToolStatus.FAILED,
+                        output_path=generator.output_path,
+                        error=read_error,
+                    )
+                pending = []
+            
+            def run(item: Tuple[int, RuleGenerator, str]) -> Tuple[bool, float]:
+                _, generator, config_hash = item
+                started = time.perf_counter()
+                record = manifest.outputs.get(generator.tool_name)
+                changed_files = None
+                previous_files = None
+                if record is not None:
+                    previous_files = {
+                        self.project_root / key: file_record.matches(self.project_root / key)
+                        for key, file_record in record.files.items()
+                    }
+                    # Per-file outputs of unchanged inputs can be kept as long
+                    # as the configuration that produced them is the same
+                    if not force and record.config_hash == config_hash:
+                        changed_files = changed_inputs
+                
+                with profile_phase(self.profiler, "generate", generator.tool_name):
+                    success = generator.generate(
+                        input_files,
+                        self.force_mode,
+                        content=content,
+                        source_root=self.input_dir,
+                        changed_files=changed_files,
+                        previous_files=previous_files,
+                    )
+                return success, time.perf_counter() - started
+            
+            # Generators write distinct outputs, so they can run concurrently.
+            # Results are collected in configuration order either way.
+            if self.jobs > 1 and len(pending) > 1:
+                with ThreadPoolExecutor(max_workers=min(self.jobs, len(pending))) as executor:
+                    outcomes = list(executor.map(run, pending))
+            else:
+                outcomes = [run(item) for item in pending]
+            
+            for (index, generator, config_hash), (success, duration) in zip(pending, outcomes):
+                tool_name = generator.tool_name
+                if not success:
+                    results[index] = ToolResult(
+                        tool_name=tool_name,
+                        status=ToolStatus.FAILED,
+                        output_path=generator.output_path,
+                        duration=duration,
+                    )
+                    continue
+                
+                try:
+                    with profile_phase(self.profiler, "record", tool_name):
+                        updated.outputs[tool_name] = record_output(
+                            config_hash,
+                            inputs_hash,
+                            generator.output_files,
+                            self.project_root,
+                            manifest.outputs.get(tool_name),
+                        )
+                except OSError as e:
+                    print(f"Error recording outputs of {tool_name}: {e}")
+                
+                results[index] = ToolResult(
+                    tool_name=tool_name,
+                    status=ToolStatus.GENERATED if generator.changed else ToolStatus.UNCHANGED,
+                    output_path=generator.output_path,
+                    sync_mode=generator.sync_mode,
+                    duration=duration,
+                    kept_files=generator.kept_files,
+                )
+        
+        # Only rewrite the manifest when something in it changed, or when
+        # inputs had to be re-hashed only because they were modified too close
+        # to the previous scan
+        racy = any(
+            record.mtime_ns >= manifest.scanned_at_ns - RACY_WINDOW_NS
+            for record in inputs.values()
+        )
+        if updated.inputs != manifest.inputs or updated.outputs != manifest.outputs or racy:
+            updated.scanned_at_ns = scan_started_ns
+            with profile_phase(self.profiler, "save"):
+                save_manifest(self.project_root, updated)
+            manifest = updated
+        self._manifest = manifest
+        
+        return _completed(results)
+
+
+def build_project(
+    project_root: Path,
+    force_mode: Optional[SyncMode] = None,
+    force: bool = False,
+    jobs: int = 1,
+    check: bool = False,
+    profiler: Optional[Profiler] = None,
+) -> ProjectResult:
+    """
+    Load a project's configuration and generate its rule files.
+    
+    Args:
+        project_root: Path to the project root
+        force_mode: Force a specific sync mode for all tools (overrides config)
+        force: Regenerate every tool even if the manifest shows it is up to date
+        jobs: Maximum number of tools to generate concurrently
+        check: Only check whether the outputs are up to date, see RuleBuilder.check()
+        profiler: Profiler to record the time and I/O of each phase in
+    
+    Returns:
+        ProjectResult: Results of the project, without any if it has no input
+        files or its configuration could not be loaded
+    """
+    try:
+        with profile_phase(profiler, "config"):
+            config = load_config(project_root, write_cache=not check)
+    except Exception as e:
+        return ProjectResult(project_root=project_root, error=f"Error loading configuration: {e}")
+    
+    builder = RuleBuilder(project_root, config, force_mode, jobs=jobs, profiler=profiler)
+    input_files = builder.find_input_files()
+    if not input_files:
+        return ProjectResult(project_root=project_root)
+    
+    if check:
+        results = builder.check(input_files)
+    else:
+        results = builder.build(input_files, force=force)
+    return ProjectResult(project_root=project_root, input_count=len(input_files), results=results)
+
+
+def build_projects(
+    project_roots: List[Path],
+    force_mode: Optional[SyncMode] = None,
+    force: bool = False,
+    jobs: int = 1,
+    check: bool = False,
+    profiler: Optional[Profiler] = None,
+) -> List[ProjectResult]:
+    """
+    Generate the rule files of many projects in this process.
+    
+    Projects share nothing but their pool of threads, so they are built
+    concurrently. The tools of each project are generated one after another.
+    
+    Args:
+        project_roots: Paths to the project roots
+        force_mode: Force a specific sync mode for all tools (overrides config)
+        force: Regenerate every tool even if the manifest shows it is up to date
+        jobs: Maximum number of projects to build concurrently
+        check: Only check whether the outputs are up to date, see RuleBuilder.check()
+        profiler: Profiler to record the time and I/O of each phase in
+    
+    Returns:
+        List of results, in the order of the project roots
+    """
+    def run(project_root: Path) -> ProjectResult:
+        return build_project(project_root, force_mode, force, check=check, profiler=profiler)
+    
+    if jobs > 1 and len(project_roots) > 1:
+        with ThreadPoolExecutor(max_workers=min(jobs, len(project_roots))) as executor:
+            return list(executor.map(run, project_roots))
+    return [run(project_root) for project_root in project_roots]
@@ -2,12 +2,26 @@
 Configuration handling for Airulefy.
 """
 
+import os
+import threading
+import time
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
-import yaml
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+from . import __version__
+
+# Name of the configuration file in the project root
+CONFIG_FILE = ".ai-rules.yml"
+
+# Input directory relative to the project root when none is configured
+DEFAULT_INPUT_PATH = ".ai"
+
+# Location of the configuration cache relative to the project root. It is only
+# kept in projects that already have this directory for the build manifest.
+CONFIG_CACHE_PATH = ".airulefy/config-cache.json"
 
 
 class SyncMode(str, Enum):
@@ -15,6 +29,9 @@ class SyncMode(str, Enum):
 
     SYMLINK = "symlink"
     COPY = "copy"
+    HARDLINK = "hardlink"
+    REFLINK = "reflink"
+    AUTO = "auto"
 
 
 class ToolConfig(BaseModel):
@@ -24,6 +41,10 @@ class ToolConfig(BaseModel):
     output: Optional[str] = Field(
         default=None, description="Output file path (relative to project root)"
     )
+    split: bool = Field(
+        default=False,
+        description="Emit one output file per input file into the output directory (Cursor only)",
+    )
 
 
 class AirulefyConfig(BaseModel):
@@ -36,7 +57,14 @@ class AirulefyConfig(BaseModel):
         default_factory=dict, description="Tool-specific configurations"
     )
     input_path: str = Field(
-        default=".ai", description="Path to directory containing AI rule files (relative to project root)"
+        default=DEFAULT_INPUT_PATH,
+        description="Path to directory containing AI rule files (relative to project root)",
+    )
+    max_depth: Optional[int] = Field(
+        default=None, ge=0, description="Maximum subdirectory depth searched for rule files"
+    )
+    follow_symlinks: bool = Field(
+        default=False, description="Whether to search symlinked directories for rule files"
     )
 
     @model_validator(mode="after")
@@ -60,32 +88,123 @@ class AirulefyConfig(BaseModel):
     def validate_input_path(cls, v: str) -> str:
         """Validate input path."""
         if not v:
-            return ".ai"
+            return DEFAULT_INPUT_PATH
         
         # Normalize path
         return v.rstrip("/\\")
 
 
-def load_config(project_root: Union[str, Path]) -> AirulefyConfig:
+class ConfigCacheEntry(BaseModel):
+    """A validated configuration and the state of the file it was loaded from."""
+    
+    version: str = Field(default=__version__, description="Airulefy version that loaded the file")
+    path: str = Field(description="Absolute path to the configuration file")
+    size: int = Field(description="File size in bytes")
+    mtime_ns: int = Field(description="Modification time in nanoseconds")
+    loaded_at_ns: int = Field(description="Time the file was loaded")
+    config: AirulefyConfig = Field(description="Configuration loaded from the file")
+    
+    def matches(self, path: str, config_stat: os.stat_result) -> bool:
+        """
+        Check whether the configuration file is still in the recorded state.
+        
+        Files modified so close to loading that a later change within the
+        same mtime tick could have been missed never match.
+        
+        Args:
+            path: Absolute path to the configuration file
+            config_stat: Current stat of the configuration file
+        
+        Returns:
+            bool: True if the cached configuration can be used for the file
+        """
+        from .manifest import RACY_WINDOW_NS
+        
+        return (
+            self.version == __version__
+            and self.path == path
+            and self.size == config_stat.st_size
+            and self.mtime_ns == config_stat.st_mtime_ns
+            and self.mtime_ns < self.loaded_at_ns - RACY_WINDOW_NS
+        )
+
+
+# Configurations loaded by this process, keyed by configuration file path
+_config_cache: Dict[str, ConfigCacheEntry] = {}
+_config_cache_lock = threading.Lock()
+
+
+def load_config(project_root: Union[str, Path], write_cache: bool = True) -> AirulefyConfig:
     """
     Load configuration from .ai-rules.yml in the project root.
     
+    The validated configuration is cached by the path, size and mtime of the
+    file: in memory for the life of the process, and in the project's
+    .airulefy directory for later runs. Neither YAML parsing nor the tool
+    defaults are redone while the file is unchanged.
+    
     Args:
         project_root: Path to the project root directory
+        write_cache: Whether to update the cache on disk
         
     Returns:
         AirulefyConfig: Configuration object
     """
     project_root = Path(project_root)
-    config_path = project_root / ".ai-rules.yml"
+    config_path = project_root / CONFIG_FILE
+    loaded_at_ns = time.time_ns()
     
-    if not config_path.exists():
+    try:
+        config_stat = os.stat(config_path)
+    except OSError:
         # Return default config if no config file exists
         return AirulefyConfig()
     
+    key = os.path.abspath(config_path)
+    with _config_cache_lock:
+        entry = _config_cache.get(key)
+    
+    if entry is None or not entry.matches(key, config_stat):
+        entry = _load_config_cache(project_root)
+        if entry is None or not entry.matches(key, config_stat):
+            entry = ConfigCacheEntry(
+                path=key,
+                size=config_stat.st_size,
+                mtime_ns=config_stat.st_mtime_ns,
+                loaded_at_ns=loaded_at_ns,
+                config=_parse_config_file(config_path),
+            )
+            if write_cache:
+                _save_config_cache(project_root, entry)
+        with _config_cache_lock:
+            _config_cache[key] = entry
+    
+    # Callers own their configuration and may modify it
+    return entry.config.model_copy(deep=True)
+
+
+def _parse_config_file(config_path: Union[str, Path]) -> AirulefyConfig:
+    """
+    Parse and validate a configuration file, bypassing the cache.
+    
+    Args:
+        config_path: Path to the configuration file
+        
+    Returns:
+        AirulefyConfig: Configuration object
+    """
+    import yaml
+    
+    # libyaml's parser is much faster than the pure Python one
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
     with open(config_path, "r", encoding="utf-8") as f:
-        config_data = yaml.safe_load(f) or {}
+        config_data = yaml.load(f, Loader=loader) or {}
     
+    return _build_config(config_data)
+
+
+def _build_config(config_data: Dict[str, Any]) -> AirulefyConfig:
+    """Validate parsed configuration data, applying the default mode to tools."""
     # Get the default mode before processing tools
     default_mode = config_data.get("default_mode", SyncMode.SYMLINK)
     
@@ -114,6 +233,29 @@ def load_config(project_root: Union[str, Path]) -> AirulefyConfig:
     return AirulefyConfig(**config_data)
 
 
+def _load_config_cache(project_root: Path) -> Optional[ConfigCacheEntry]:
+    """Load the configuration cached on disk, or None if there is none."""
+    try:
+        with open(project_root / CONFIG_CACHE_PATH, "r", encoding="utf-8") as f:
+            return ConfigCacheEntry.model_validate_json(f.read())
+    except (OSError, ValueError, ValidationError):
+        return None
+
+
+def _save_config_cache(project_root: Path, entry: ConfigCacheEntry) -> None:
+    """Cache a configuration on disk, if the project has a .airulefy directory."""
+    from .fsutils import write_file_atomic
+    
+    cache_path = project_root / CONFIG_CACHE_PATH
+    if not cache_path.parent.is_dir():
+        return
+    
+    try:
+        write_file_atomic(cache_path, entry.model_dump_json(indent=2))
+    except OSError:
+        pass
+
+
 def get_default_output_path(tool_name: str) -> str:
     """
     Get the default output path for a specific tool.
@@ -2,39 +2,385 @@
 File system utilities for Airulefy.
 """
 
+import errno
 import os
+import re
 import shutil
+import stat
+import tempfile
+import threading
 from pathlib import Path
-from typing import List, Union
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
-from .config import SyncMode
+from .config import CONFIG_FILE, DEFAULT_INPUT_PATH, SyncMode
 
+# Separator inserted between combined Markdown files
+MARKDOWN_SEPARATOR = "\n\n---\n\n"
 
-def find_markdown_files(directory: Union[str, Path]) -> List[Path]:
+# Gitignore-style file in the input directory listing paths to skip
+IGNORE_FILE = ".airulefyignore"
+
+# Directories never searched for rule files unless re-included
+DEFAULT_IGNORE_PATTERNS = (".git/", "node_modules/")
+
+
+def _translate_ignore_pattern(pattern: str) -> str:
+    """Translate a gitignore-style glob into a regular expression."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            close = pattern.find("]", i + 1)
+            if close == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1:close]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = close
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+class IgnoreRules:
+    """
+    Gitignore-style patterns excluding files and directories from rule discovery.
+    
+    Supported syntax: blank lines and # comments, ! negation, a trailing /
+    matching directories only, patterns containing a / anchored to the
+    scanned directory, and the *, ?, [...] and ** wildcards. The last
+    matching pattern wins. An ignored directory is not descended into.
+    """
+    
+    def __init__(self, patterns: Iterable[str] = ()):
+        """
+        Initialize the rules.
+        
+        Args:
+            patterns: Lines of a gitignore-style file
+        """
+        self._rules: List[Tuple["re.Pattern[str]", bool, bool]] = []
+        for line in patterns:
+            self.add(line)
+    
+    def add(self, line: str) -> None:
+        """
+        Add one line of a gitignore-style file.
+        
+        Args:
+            line: Pattern line
+        """
+        pattern = line.rstrip("\n\r")
+        if not pattern.endswith("\\ "):
+            pattern = pattern.rstrip()
+        if not pattern or pattern.startswith("#"):
+            return
+        
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        elif pattern.startswith("\\"):
+            pattern = pattern[1:]
+        
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            return
+        
+        # Patterns without an inner slash match at any depth
+        anchored = "/" in pattern
+        regex = _translate_ignore_pattern(pattern.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        self._rules.append((re.compile(regex + r"\Z", re.DOTALL), negate, dir_only))
+    
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """
+        Check whether a path is excluded.
+        
+        Args:
+            relative_path: POSIX path relative to the scanned directory
+            is_dir: Whether the path is a directory
+        
+        Returns:
+            bool: True if the path is ignored
+        """
+        ignored = False
+        for regex, negate, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                ignored = not negate
+        return ignored
+
+
+def load_ignore_rules(directory: Union[str, Path]) -> IgnoreRules:
+    """
+    Load the ignore rules for rule discovery in a directory.
+    
+    The default patterns always apply. Patterns from an .airulefyignore file
+    in the directory are added after them, so they can re-include defaults.
+    
+    Args:
+        directory: Directory being scanned
+    
+    Returns:
+        IgnoreRules: Combined ignore rules
+    """
+    rules = IgnoreRules(DEFAULT_IGNORE_PATTERNS)
+    try:
+        with open(Path(directory) / IGNORE_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                rules.add(line)
+    except (OSError, UnicodeDecodeError):
+        pass
+    return rules
+
+
+def find_markdown_files(
+    directory: Union[str, Path],
+    max_depth: Optional[int] = None,
+    follow_symlinks: bool = False,
+    start: Optional[Union[str, Path]] = None,
+    rules: Optional[IgnoreRules] = None,
+) -> List[Path]:
     """
     Find all Markdown files in the specified directory.
     
+    The tree is walked with os.scandir, so the file type of most entries is
+    known without a separate stat call. Paths matching the ignore rules of
+    the directory (see load_ignore_rules) are skipped, and ignored
+    directories are not descended into.
+    
     Args:
         directory: Directory to search in
+        max_depth: Maximum number of subdirectory levels to descend into
+            (0 searches only the directory itself, None is unlimited)
+        follow_symlinks: Whether to descend into symlinked directories, off
+            by default like Path.glob. Symlinks leading back to a directory
+            being walked are skipped.
+        start: Subdirectory to search instead of the whole directory. Ignore
+            rules and the depth limit still apply relative to directory.
+        rules: Ignore rules to use instead of loading them from directory
         
     Returns:
         List of Path objects for the found files
     """
     directory = Path(directory)
+    if rules is None:
+        rules = load_ignore_rules(directory)
     
-    if not directory.exists() or not directory.is_dir():
+    try:
+        root_stat = os.stat(directory)
+    except OSError:
         return []
+    if not stat.S_ISDIR(root_stat.st_mode):
+        return []
+    
+    ancestors = {(root_stat.st_dev, root_stat.st_ino)}
+    prefix = ""
+    depth = 0
+    if start is not None:
+        start = Path(start)
+        try:
+            parts = start.relative_to(directory).parts
+        except ValueError:
+            return []
+        if parts:
+            if not _is_included(directory, parts, True, rules, max_depth, follow_symlinks):
+                return []
+            try:
+                start_stat = os.stat(start)
+            except OSError:
+                return []
+            if not stat.S_ISDIR(start_stat.st_mode):
+                return []
+            ancestors.add((start_stat.st_dev, start_stat.st_ino))
+            prefix = "/".join(parts) + "/"
+            depth = len(parts)
+    
+    md_files: List[Path] = []
+    
+    def walk(path: str, prefix: str, depth: int, ancestors: Set[Tuple[int, int]]) -> None:
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return
+        
+        for entry in entries:
+            relative_path = prefix + entry.name
+            try:
+                is_dir = entry.is_dir()
+                if is_dir:
+                    if max_depth is not None and depth >= max_depth:
+                        continue
+                    if entry.is_symlink():
+                        if not follow_symlinks:
+                            continue
+                        entry_stat = entry.stat()
+                        key = (entry_stat.st_dev, entry_stat.st_ino)
+                        if key in ancestors:
+                            continue
+                    else:
+                        entry_stat = entry.stat(follow_symlinks=False)
+                        key = (entry_stat.st_dev, entry_stat.st_ino)
+                    if rules.is_ignored(relative_path, True):
+                        continue
+                    walk(entry.path, relative_path + "/", depth + 1, ancestors | {key})
+                elif entry.name.endswith(".md") and entry.is_file():
+                    if not rules.is_ignored(relative_path, False):
+                        md_files.append(Path(entry.path))
+            except OSError:
+                continue
     
-    # Find all .md files in directory and subdirectories
-    md_files = []
-    for file_path in directory.glob("**/*.md"):
-        if file_path.is_file():
-            md_files.append(file_path)
+    walk(str(start or directory), prefix, depth, ancestors)
     
     md_files.sort()  # Sort files for consistent order
     return md_files
 
 
+def is_markdown_input(
+    directory: Union[str, Path],
+    path: Union[str, Path],
+    max_depth: Optional[int] = None,
+    follow_symlinks: bool = False,
+    rules: Optional[IgnoreRules] = None,
+) -> bool:
+    """
+    Check whether find_markdown_files would find a file, without walking the tree.
+    
+    Args:
+        directory: Directory searched for Markdown files
+        path: Path of the file
+        max_depth: Maximum number of subdirectory levels searched
+        follow_symlinks: Whether symlinked directories are searched
+        rules: Ignore rules to use instead of loading them from directory
+    
+    Returns:
+        bool: True if the path is an existing Markdown file that would be found
+    """
+    directory = Path(directory)
+    path = Path(path)
+    try:
+        parts = path.relative_to(directory).parts
+    except ValueError:
+        return False
+    
+    if not parts or not parts[-1].endswith(".md"):
+        return False
+    
+    if rules is None:
+        rules = load_ignore_rules(directory)
+    
+    included = _is_included(directory, parts, False, rules, max_depth, follow_symlinks)
+    return included and path.is_file()
+
+
+def _is_included(
+    directory: Path,
+    parts: Tuple[str, ...],
+    is_dir: bool,
+    rules: IgnoreRules,
+    max_depth: Optional[int],
+    follow_symlinks: bool,
+) -> bool:
+    """Check a relative path against the depth limit, symlink policy and ignore rules."""
+    dir_count = len(parts) if is_dir else len(parts) - 1
+    if max_depth is not None and dir_count > max_depth:
+        return False
+    
+    current = directory
+    for index in range(dir_count):
+        current = current / parts[index]
+        if rules.is_ignored("/".join(parts[:index + 1]), True):
+            return False
+        if not follow_symlinks and current.is_symlink():
+            return False
+    
+    return is_dir or not rules.is_ignored("/".join(parts), False)
+
+
+def find_project_roots(
+    directories: Iterable[Union[str, Path]],
+    max_depth: Optional[int] = None,
+    include_input_dirs: bool = False,
+) -> List[Path]:
+    """
+    Find the project roots, directories containing a configuration file, in directory trees.
+    
+    Each tree is walked once with os.scandir. Hidden directories,
+    node_modules and symlinked directories are not searched, and nested
+    projects are found as well.
+    
+    Args:
+        directories: Directories to search, which can be project roots themselves
+        max_depth: Maximum number of subdirectory levels to descend into
+            (None is unlimited)
+        include_input_dirs: Whether directories containing a default input
+            directory (.ai) but no configuration file are project roots too
+    
+    Returns:
+        Sorted list of project root directories
+    """
+    roots: Set[Path] = set()
+    
+    def walk(path: str, depth: int) -> None:
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return
+        
+        subdirectories = []
+        for entry in entries:
+            if entry.name == CONFIG_FILE:
+                roots.add(Path(path))
+            elif include_input_dirs and entry.name == DEFAULT_INPUT_PATH:
+                try:
+                    if entry.is_dir():
+                        roots.add(Path(path))
+                except OSError:
+                    continue
+            elif (
+                not entry.name.startswith(".")
+                and entry.name != "node_modules"
+                and (max_depth is None or depth < max_depth)
+            ):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                except OSError:
+                    continue
+        
+        for subdirectory in subdirectories:
+            walk(subdirectory, depth + 1)
+    
+    for directory in directories:
+        walk(os.path.abspath(directory), 0)
+    
+    return sorted(roots)
+
+
 def ensure_directory_exists(path: Union[str, Path]) -> None:
     """
     Ensure that the parent directory for the given path exists.
@@ -46,6 +392,142 @@ def ensure_directory_exists(path: Union[str, Path]) -> None:
     directory.mkdir(parents=True, exist_ok=True)
 
 
+# Strategies that place a source file at a target without copying its data
+LINK_MODES = (SyncMode.SYMLINK, SyncMode.HARDLINK, SyncMode.REFLINK)
+
+# Order in which AUTO mode tries the link strategies, cheapest first
+AUTO_MODE_ORDER = (SyncMode.SYMLINK, SyncMode.HARDLINK, SyncMode.REFLINK)
+
+# Errors meaning a link strategy is not supported between two file systems,
+# rather than that a particular attempt failed
+_LINK_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.EMLINK,
+}
+
+# ioctl request to clone a file's extents (Linux FICLONE, btrfs/xfs)
+_FICLONE = 0x40049409
+
+# Link strategies known not to work, keyed by (source device, target device)
+_unsupported_modes: Dict[Tuple[int, int], Set[SyncMode]] = {}
+_unsupported_modes_lock = threading.Lock()
+
+
+def clear_sync_mode_cache() -> None:
+    """Forget which link strategies were found unsupported on which file systems."""
+    with _unsupported_modes_lock:
+        _unsupported_modes.clear()
+
+
+def _device_key(source: Path, target: Path) -> Optional[Tuple[int, int]]:
+    """Get the capability cache key for syncing source into target's directory."""
+    try:
+        return os.stat(source).st_dev, os.stat(target.parent).st_dev
+    except OSError:
+        return None
+
+
+def _candidate_modes(source: Path, target: Path, mode: SyncMode) -> List[SyncMode]:
+    """
+    List the link strategies to try for a sync mode, skipping known unsupported ones.
+    
+    Args:
+        source: Source file path
+        target: Target file path
+        mode: Requested synchronization mode
+        
+    Returns:
+        Link strategies in the order to try them; copying is always the fallback
+    """
+    if mode == SyncMode.AUTO:
+        candidates = list(AUTO_MODE_ORDER)
+    elif mode in LINK_MODES:
+        candidates = [mode]
+    else:
+        return []
+    
+    key = _device_key(source, target)
+    if key is None:
+        return candidates
+    
+    with _unsupported_modes_lock:
+        unsupported = _unsupported_modes.get(key, set())
+        return [candidate for candidate in candidates if candidate not in unsupported]
+
+
+def _mark_unsupported(source: Path, target: Path, mode: SyncMode) -> None:
+    """Remember that a link strategy does not work between two file systems."""
+    key = _device_key(source, target)
+    if key is None:
+        return
+    
+    with _unsupported_modes_lock:
+        _unsupported_modes.setdefault(key, set()).add(mode)
+
+
+def resolve_sync_mode(
+    source: Union[str, Path], target: Union[str, Path], mode: SyncMode
+) -> SyncMode:
+    """
+    Get the strategy a sync is expected to use, based on known capabilities.
+    
+    Args:
+        source: Source file path
+        target: Target file path
+        mode: Requested synchronization mode
+        
+    Returns:
+        SyncMode: The first link strategy not known to be unsupported, or COPY
+    """
+    candidates = _candidate_modes(Path(source), Path(target), mode)
+    return candidates[0] if candidates else SyncMode.COPY
+
+
+def file_in_sync(source: Union[str, Path], target: Union[str, Path], mode: SyncMode) -> bool:
+    """
+    Check whether a target already reflects its source for the given sync mode.
+    
+    Args:
+        source: Source file path
+        target: Target file path
+        mode: Requested synchronization mode
+        
+    Returns:
+        bool: True if syncing again would not change the target
+    """
+    source = Path(source)
+    target = Path(target)
+    strategy = resolve_sync_mode(source, target, mode)
+    
+    if strategy == SyncMode.SYMLINK:
+        return symlink_points_to(target, source)
+    
+    if target.is_symlink():
+        return False
+    
+    if strategy == SyncMode.HARDLINK:
+        try:
+            return os.path.samefile(source, target)
+        except OSError:
+            return False
+    
+    # Reflinks and copies are independent files with the same content, so a
+    # hardlink to the source left by the hardlink mode is out of date
+    try:
+        if os.lstat(target).st_nlink > 1 or os.path.samefile(source, target):
+            return False
+        with open(source, 'rb') as infile:
+            return file_has_content(target, infile.read())
+    except OSError:
+        return False
+
+
 def sync_file(source: Union[str, Path], target: Union[str, Path], mode: SyncMode) -> bool:
     """
     Synchronize a file from source to target using the specified mode.
@@ -53,44 +535,502 @@ def sync_file(source: Union[str, Path], target: Union[str, Path], mode: SyncMode
     Args:
         source: Source file path
         target: Target file path
-        mode: Synchronization mode (symlink or copy)
+        mode: Synchronization mode
         
     Returns:
         bool: True if successful, False otherwise
     """
+    return sync_file_with_mode(source, target, mode) is not None
+
+
+def sync_file_with_mode(
+    source: Union[str, Path], target: Union[str, Path], mode: SyncMode
+) -> Optional[SyncMode]:
+    """
+    Synchronize a file from source to target, reporting the strategy used.
+    
+    Link modes fall back to copying when the link cannot be created. When a
+    strategy fails because the file systems involved do not support it, this
+    is remembered per pair of devices, so later syncs skip straight to a
+    strategy that works. AUTO mode tries symlink, hardlink and reflink in
+    that order.
+    
+    Args:
+        source: Source file path
+        target: Target file path
+        mode: Synchronization mode
+        
+    Returns:
+        The strategy used (SYMLINK, HARDLINK, REFLINK or COPY), or None on failure
+    """
     source = Path(source)
     target = Path(target)
     
     # Check if source exists
     if not source.exists() or not source.is_file():
-        return False
+        return None
     
     # Ensure target directory exists
     ensure_directory_exists(target)
     
-    # Remove existing target if it exists
-    if target.exists():
-        if target.is_symlink() or target.is_file():
+    # Refuse to replace anything that is not a file or symlink
+    if target.exists() and not target.is_symlink() and not target.is_file():
+        return None  # Target exists but is not a file or symlink
+    
+    try:
+        for strategy in _candidate_modes(source, target, mode):
+            try:
+                if strategy == SyncMode.SYMLINK:
+                    source_rel = os.path.relpath(source, target.parent)
+                    _replace_with(target, lambda temp_path: temp_path.symlink_to(source_rel))
+                elif strategy == SyncMode.HARDLINK:
+                    _replace_with(target, lambda temp_path: os.link(source, temp_path))
+                else:
+                    _replace_with(target, lambda temp_path: _reflink(source, temp_path))
+                return strategy
+            except NotImplementedError:
+                _mark_unsupported(source, target, strategy)
+            except OSError as e:
+                if e.errno in _LINK_UNSUPPORTED_ERRNOS:
+                    _mark_unsupported(source, target, strategy)
+                # Fall back to the next strategy
+        
+        # Copy the file (either as primary mode or fallback). Copying into a
+        # new file also replaces symlinks and hardlinks to the source rather
+        # than writing through them.
+        _replace_with(target, lambda temp_path: shutil.copy2(source, temp_path))
+        return SyncMode.COPY
+    except Exception:
+        return None
+
+
+def _temp_sibling(path: Path) -> Path:
+    """Get a temporary path next to path, unique to this process and thread."""
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _replace_with(path: Path, create: Callable[[Path], object]) -> None:
+    """
+    Atomically replace path with a file created by a callback.
+    
+    Args:
+        path: Path to replace
+        create: Function creating the new file at the temporary path it is given
+    """
+    temp_path = _temp_sibling(path)
+    if temp_path.is_symlink() or temp_path.exists():
+        temp_path.unlink()
+    
+    create(temp_path)
+    try:
+        os.replace(temp_path, path)
+    finally:
+        # Renaming onto another link to the same file does nothing
+        if temp_path.is_symlink() or temp_path.exists():
+            temp_path.unlink()
+
+
+def _reflink(source: Path, target: Path) -> None:
+    """
+    Create target as a copy-on-write clone of source.
+    
+    Raises:
+        NotImplementedError: If the platform has no clone ioctl
+        OSError: If the file system does not support cloning
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise NotImplementedError("reflinks are not supported on this platform")
+    
+    try:
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        shutil.copystat(source, target)
+    except BaseException:
+        try:
             target.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def _read_umask() -> int:
+    """Get the process umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Permission bits for newly created files. The umask can only be read by
+# briefly changing it, so this is done once at import time rather than while
+# other threads may be creating files.
+_DEFAULT_FILE_MODE = 0o666 & ~_read_umask()
+
+
+def file_has_content(path: Union[str, Path], data: bytes) -> bool:
+    """
+    Check whether a regular file already contains exactly the given bytes.
+    
+    The file size is compared first, so differing files are usually detected
+    without reading them.
+    
+    Args:
+        path: File path
+        data: Expected content
+        
+    Returns:
+        bool: True if the file exists, is not a symlink and matches data
+    """
+    try:
+        path_stat = os.lstat(path)
+    except OSError:
+        return False
+    
+    if not stat.S_ISREG(path_stat.st_mode) or path_stat.st_size != len(data):
+        return False
+    
+    try:
+        with open(path, 'rb') as infile:
+            return infile.read() == data
+    except OSError:
+        return False
+
+
+def symlink_points_to(link: Union[str, Path], source: Union[str, Path]) -> bool:
+    """
+    Check whether a symlink already points to the given source file.
+    
+    Args:
+        link: Symlink path
+        source: Expected source file
+        
+    Returns:
+        bool: True if link is a symlink resolving to source, False otherwise
+    """
+    link = Path(link)
+    if not link.is_symlink():
+        return False
+    
+    try:
+        link_target = os.readlink(link)
+    except OSError:
+        return False
+    
+    resolved = os.path.abspath(os.path.join(link.parent, link_target))
+    return resolved == os.path.abspath(source)
+
+
+def write_file_atomic(target: Union[str, Path], content: Union[str, Iterable[str]]) -> bool:
+    """
+    Write content to a file atomically, unless it already has that content.
+    
+    The content is written to a temporary file next to the target and then
+    moved over it with os.replace, so the target is never missing or only
+    partially written. An existing symlink at the target is replaced by a
+    regular file. If the target already holds the same bytes it is left
+    untouched, keeping its mtime, unless other hard links share it.
+    
+    Content may be given as an iterable of text chunks, which is consumed
+    once. Chunks are compared against the existing file as they arrive, and
+    the temporary file is only created at the first difference, so rendering
+    and comparing take constant memory.
+    
+    Args:
+        target: Target file path
+        content: Text content to write, as a string or an iterable of chunks
+        
+    Returns:
+        bool: True if the file was written, False if it was already up to date
+        
+    Raises:
+        OSError: If the file could not be written
+    """
+    target = Path(target)
+    chunks = [content] if isinstance(content, str) else content
+    
+    existing = _open_regular_file(target)
+    # The existing file, if its content can be compared and kept
+    reusable = existing if existing is not None and not _has_other_links(existing) else None
+    matched = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            if writer is None:
+                if reusable is not None and reusable.read(len(data)) == data:
+                    matched += len(data)
+                    continue
+                writer = _AtomicFileWriter(target, existing, matched)
+            writer.write(data)
+        
+        if writer is None:
+            # Everything matched so far; the file is only up to date if it
+            # has no trailing bytes beyond the new content
+            if reusable is not None and not reusable.read(1):
+                return False
+            writer = _AtomicFileWriter(target, existing, matched)
+        
+        writer.commit()
+        return True
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+    finally:
+        if existing is not None:
+            existing.close()
+
+
+def _open_regular_file(path: Path) -> Optional[BinaryIO]:
+    """Open a file for binary reading if it is a regular file, not following symlinks."""
+    try:
+        if not stat.S_ISREG(os.lstat(path).st_mode):
+            return None
+        return open(path, 'rb')
+    except OSError:
+        return None
+
+
+def _has_other_links(file: BinaryIO) -> bool:
+    """
+    Check whether an open file is also reachable through other hard links.
+    
+    Such a target is usually a hardlink to an input left by the hardlink
+    mode. Keeping it, even with the right content, would leave the output
+    and the input as one file, so it is always replaced.
+    """
+    return os.fstat(file.fileno()).st_nlink > 1
+
+
+class _AtomicFileWriter:
+    """Temporary file next to a target that is renamed over it when complete."""
+    
+    def __init__(self, target: Path, existing: Optional[BinaryIO], prefix_size: int):
+        """
+        Create the temporary file.
+        
+        Args:
+            target: Target file path
+            existing: Open handle of the current target file, if any
+            prefix_size: Number of leading bytes to copy from the existing file
+        """
+        self.target = target
+        ensure_directory_exists(target)
+        
+        # Keep the permissions of an existing regular file
+        if existing is not None:
+            self.file_mode = stat.S_IMODE(os.fstat(existing.fileno()).st_mode)
         else:
-            return False  # Target exists but is not a file or symlink
+            self.file_mode = _DEFAULT_FILE_MODE
+        
+        fd, self.temp_name = tempfile.mkstemp(
+            dir=target.parent, prefix=f".{target.name}.", suffix=".tmp"
+        )
+        self.file = os.fdopen(fd, 'wb')
+        
+        # The content so far matched the existing file, so copy it from there
+        if prefix_size and existing is not None:
+            existing.seek(0)
+            remaining = prefix_size
+            while remaining:
+                data = existing.read(min(remaining, 1024 * 1024))
+                if not data:
+                    break
+                self.file.write(data)
+                remaining -= len(data)
+    
+    def write(self, data: bytes) -> None:
+        """Write data to the temporary file."""
+        self.file.write(data)
+    
+    def commit(self) -> None:
+        """Move the temporary file over the target."""
+        self.file.close()
+        os.chmod(self.temp_name, self.file_mode)
+        os.replace(self.temp_name, self.target)
+    
+    def discard(self) -> None:
+        """Remove the temporary file."""
+        self.file.close()
+        try:
+            os.unlink(self.temp_name)
+        except OSError:
+            pass
+
+
+def concatenate_files_atomic(
+    files: List[Path], target: Union[str, Path], separator: str = MARKDOWN_SEPARATOR
+) -> bool:
+    """
+    Concatenate files into a target file atomically, unless it already has that content.
     
+    The bytes of the source files are copied verbatim, without decoding,
+    using os.copy_file_range or os.sendfile where the platform supports them
+    so the data does not pass through Python buffers. Like write_file_atomic,
+    the target is replaced in a single rename and left untouched when it
+    already holds the same bytes and has no other hard links.
+    
+    Args:
+        files: List of source files
+        target: Target file path
+        separator: Text inserted between the source files
+        
+    Returns:
+        bool: True if the file was written, False if it was already up to date
+        
+    Raises:
+        OSError: If a source could not be read or the target could not be written
+    """
+    target = Path(target)
+    separator_data = separator.encode('utf-8')
+    sizes = [os.stat(file_path).st_size for file_path in files]
+    expected_size = sum(sizes) + len(separator_data) * max(len(files) - 1, 0)
+    
+    existing = _open_regular_file(target)
+    writer = None
     try:
-        if mode == SyncMode.SYMLINK:
-            # Try to create symlink
-            try:
-                source_rel = os.path.relpath(source, target.parent)
-                target.symlink_to(source_rel)
-                return True
-            except (OSError, NotImplementedError):
-                # Fallback to copy if symlink fails
-                pass
-        
-        # Copy the file (either as primary mode or fallback)
-        shutil.copy2(source, target)
+        if (
+            existing is not None
+            and not _has_other_links(existing)
+            and os.fstat(existing.fileno()).st_size == expected_size
+        ):
+            if _matches_concatenation(existing, files, separator_data):
+                return False
+        
+        writer = _AtomicFileWriter(target, existing, 0)
+        out_fd = writer.file.fileno()
+        for i, (file_path, size) in enumerate(zip(files, sizes)):
+            # Add separator between files
+            if i > 0:
+                _write_all(out_fd, separator_data)
+            
+            with open(file_path, 'rb') as infile:
+                _copy_file_data(infile.fileno(), out_fd, size)
+        
+        writer.commit()
         return True
-    except Exception:
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+    finally:
+        if existing is not None:
+            existing.close()
+
+
+def file_has_concatenation(
+    path: Union[str, Path], files: List[Path], separator: str = MARKDOWN_SEPARATOR
+) -> bool:
+    """
+    Check whether a regular file already contains the concatenation of files.
+    
+    Like file_has_content, the file size is compared before any content.
+    
+    Args:
+        path: File path
+        files: List of source files
+        separator: Text inserted between the source files
+        
+    Returns:
+        bool: True if the file exists, is not a symlink and matches the
+        content concatenate_files_atomic would write
+        
+    Raises:
+        OSError: If a source file could not be read
+    """
+    separator_data = separator.encode('utf-8')
+    expected_size = sum(os.stat(file_path).st_size for file_path in files)
+    expected_size += len(separator_data) * max(len(files) - 1, 0)
+    
+    existing = _open_regular_file(Path(path))
+    if existing is None:
         return False
+    
+    with existing:
+        if os.fstat(existing.fileno()).st_size != expected_size:
+            return False
+        return _matches_concatenation(existing, files, separator_data)
+
+
+def _matches_concatenation(existing: BinaryIO, files: List[Path], separator_data: bytes) -> bool:
+    """Compare an open file against the concatenation of files and separators."""
+    existing.seek(0)
+    for i, file_path in enumerate(files):
+        if i > 0 and existing.read(len(separator_data)) != separator_data:
+            return False
+        
+        with open(file_path, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(1024 * 1024), b''):
+                if existing.read(len(chunk)) != chunk:
+                    return False
+    
+    return not existing.read(1)
+
+
+# Errors meaning a kernel copy mechanism is unavailable for a pair of files,
+# rather than that the copy itself failed
+_COPY_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EPERM,
+    errno.EBADF,
+}
+
+
+def _copy_file_data(in_fd: int, out_fd: int, count: int) -> None:
+    """
+    Copy up to count bytes between file descriptors, from their current positions.
+    
+    Tries os.copy_file_range, then os.sendfile, then a buffered copy, moving
+    on whenever a mechanism is unsupported for these files.
+    """
+    if count and hasattr(os, "copy_file_range"):
+        count = _copy_with(lambda n: os.copy_file_range(in_fd, out_fd, n), count)
+    
+    if count and hasattr(os, "sendfile"):
+        count = _copy_with(lambda n: os.sendfile(out_fd, in_fd, None, n), count)
+    
+    while count:
+        data = os.read(in_fd, min(count, 1024 * 1024))
+        if not data:
+            break
+        _write_all(out_fd, data)
+        count -= len(data)
+
+
+def _copy_with(copy: Callable[[int], int], count: int) -> int:
+    """
+    Copy data with a kernel copy function until count bytes are done.
+    
+    Returns:
+        int: Number of bytes left to copy, non-zero if the mechanism is unsupported
+    """
+    while count:
+        try:
+            copied = copy(min(count, 1 << 30))
+        except OSError as e:
+            if e.errno in _COPY_UNSUPPORTED_ERRNOS:
+                return count
+            raise
+        
+        if copied == 0:
+            # The source ended early
+            return 0
+        count -= copied
+    
+    return 0
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write all of data to a file descriptor."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
 
 
 def combine_markdown_files(files: List[Path], output_file: Path) -> bool:
@@ -112,16 +1052,81 @@ def combine_markdown_files(files: List[Path], output_file: Path) -> bool:
         ensure_directory_exists(output_file)
         
         with open(output_file, 'w', encoding='utf-8') as outfile:
-            for i, file_path in enumerate(files):
-                with open(file_path, 'r', encoding='utf-8') as infile:
-                    content = infile.read()
-                    
-                    # Add separator between files
-                    if i > 0:
-                        outfile.write('\n\n---\n\n')
-                    
-                    outfile.write(content)
+            outfile.writelines(iter_markdown_files(files))
         
         return True
     except Exception:
         return False
+
+
+def read_markdown_files(files: List[Path]) -> str:
+    """
+    Read multiple Markdown files and combine them into a single string.
+    
+    The files are joined with the same separator used by combine_markdown_files,
+    so the result matches the content of a combined output file.
+    
+    Args:
+        files: List of input Markdown files
+        
+    Returns:
+        str: Combined content of all files
+    """
+    contents = []
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as infile:
+            contents.append(infile.read())
+    
+    return MARKDOWN_SEPARATOR.join(contents)
+
+
+def iter_markdown_files(files: List[Path]) -> Iterator[str]:
+    """
+    Stream the combined content of multiple Markdown files line by line.
+    
+    The lines match the content of read_markdown_files, but only one line is
+    held in memory at a time.
+    
+    Args:
+        files: List of input Markdown files
+        
+    Yields:
+        str: Lines of the combined content, see iter_lines
+    """
+    def chunks() -> Iterator[str]:
+        for i, file_path in enumerate(files):
+            with open(file_path, 'r', encoding='utf-8') as infile:
+                # Add separator between files
+                if i > 0:
+                    yield MARKDOWN_SEPARATOR
+                
+                yield from infile
+    
+    return iter_lines(chunks())
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Regroup text chunks into lines.
+    
+    Every yielded line ends with a newline, except possibly the last one, and
+    joining the lines gives back the original text.
+    
+    Args:
+        chunks: Text chunks split at arbitrary positions
+        
+    Yields:
+        str: Lines of the text
+    """
+    partial = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        
+        lines = (partial + chunk).split("\n")
+        partial = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    
+    if partial:
+        yield partial
@@ -2,17 +2,40 @@
 Base generator class for Airulefy.
 """
 
+import os
 from abc import ABC, abstractmethod
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Union
 
 from ..config import SyncMode, ToolConfig, get_default_output_path
-from ..fsutils import combine_markdown_files, sync_file
+from ..fsutils import (
+    LINK_MODES,
+    concatenate_files_atomic,
+    file_has_concatenation,
+    file_has_content,
+    file_in_sync,
+    iter_lines,
+    iter_markdown_files,
+    resolve_sync_mode,
+    symlink_points_to,
+    sync_file_with_mode,
+    write_file_atomic,
+)
 
 
 class RuleGenerator(ABC):
     """Base class for AI rule generators."""
+    
+    # Set by generators whose transformation returns the content unchanged.
+    # Their output is then copied from the input files without decoding.
+    identity_transform = False
+    
+    # Set by generators that can emit one output file per input file into an
+    # output directory, enabled with the split option
+    supports_split = False
+    
+    # File extension of per-file outputs
+    split_suffix = ".md"
 
     def __init__(self, tool_name: str, tool_config: ToolConfig, project_root: Path):
         """
@@ -27,17 +50,38 @@ class RuleGenerator(ABC):
         self.config = tool_config
         self.project_root = project_root
         self.output_path = self._resolve_output_path()
+        # Whether the last call to generate() modified the output
+        self.changed = False
+        # Strategy used to place the output by the last call to generate()
+        self.sync_mode: Optional[SyncMode] = None
+        # Files written or kept by the last call to generate()
+        self.output_files: List[Path] = []
+        # Outputs of a previous run no longer produced, but left in place by
+        # the last call to generate() because they were modified since
+        self.kept_files: List[Path] = []
+    
+    @property
+    def emits_directory(self) -> bool:
+        """Whether the output path is a directory with one file per input file."""
+        return self.supports_split and self.config.split
     
     def _resolve_output_path(self) -> Path:
         """
         Resolve the output path for the rule file.
         
         Returns:
-            Path to the output file
+            Path to the output file, or directory when emitting one file per input
         """
         # Use the configured output path or the default
-        output_rel = self.config.output or get_default_output_path(self.tool_name)
-        return self.project_root / output_rel
+        if self.config.output:
+            return self.project_root / self.config.output
+        
+        output_path = self.project_root / get_default_output_path(self.tool_name)
+        
+        # Per-file outputs go to the directory of the default output file
+        if self.emits_directory:
+            return output_path.parent
+        return output_path
     
     @abstractmethod
     def transform_content(self, content: str) -> str:
@@ -53,67 +97,283 @@ class RuleGenerator(ABC):
         # Default implementation: return the content as-is
         return content
     
-    def generate(self, input_files: List[Path], force_mode: Optional[SyncMode] = None) -> bool:
+    def transform_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Transform streamed content for the specific tool format.
+        
+        Generators that can work line by line override this to render in
+        constant memory. The default implementation collects all lines and
+        passes them to transform_content.
+        
+        Args:
+            lines: Lines of the original content, each ending with a newline
+                except possibly the last one
+            
+        Yields:
+            Chunks of the transformed content
+        """
+        yield self.transform_content("".join(lines))
+    
+    def generate(
+        self,
+        input_files: List[Path],
+        force_mode: Optional[SyncMode] = None,
+        content: Optional[str] = None,
+        source_root: Optional[Path] = None,
+        changed_files: Optional[Set[Path]] = None,
+        previous_files: Optional[Dict[Path, bool]] = None,
+    ) -> bool:
         """
         Generate the rule file for the AI tool.
         
         Args:
             input_files: List of input Markdown files
             force_mode: Force a specific sync mode (overrides config)
+            content: Pre-combined content of the input files. When given, the
+                input files are not read again, so callers generating for
+                several tools can share a single read. Otherwise the input
+                files are streamed through transform_lines. Generators with
+                identity_transform set copy the input files directly and
+                ignore this.
+            source_root: Directory the input files were found in, used to
+                name per-file outputs. Defaults to their common parent.
+            changed_files: Input files changed since the previous run. When
+                given, per-file outputs of other inputs are left alone if
+                they are still unmodified.
+            previous_files: Output files written by the previous run, mapped
+                to whether they are still unmodified. Unmodified files no
+                longer produced are removed, modified ones are listed in
+                kept_files.
             
         Returns:
-            bool: True if successful, False otherwise
+            bool: True if successful, False otherwise. After a successful call,
+            the changed attribute tells whether any output was modified, and
+            output_files lists the files making up the output.
         """
+        self.changed = False
+        self.sync_mode = None
+        self.output_files = []
+        self.kept_files = []
+        
         if not input_files:
             return False
         
         # Determine sync mode
         mode = force_mode if force_mode is not None else self.config.mode
         
-        # Make sure the output directory exists
-        self.output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # For a single input file, we can directly sync it
-        if len(input_files) == 1 and mode == SyncMode.SYMLINK:
-            # Skip transformation for symlink if possible
-            return sync_file(input_files[0], self.output_path, mode)
-        
-        # For multiple files or when transformation is needed
         try:
-            # Create a temporary file for the combined/transformed content
-            with NamedTemporaryFile(mode='w+', encoding='utf-8', suffix='.md', delete=False) as tmp_file:
-                temp_path = Path(tmp_file.name)
+            if self.emits_directory:
+                if source_root is None:
+                    source_root = Path(os.path.commonpath([f.parent for f in input_files]))
                 
-                # Combine input files
-                if len(input_files) == 1:
-                    with open(input_files[0], 'r', encoding='utf-8') as f:
-                        content = f.read()
-                else:
-                    # Create temporary combined file
-                    combined_path = Path(tmp_file.name + '.combined')
-                    combine_markdown_files(input_files, combined_path)
+                for source in input_files:
+                    target = self.output_path / source.relative_to(source_root).with_suffix(
+                        self.split_suffix
+                    )
+                    self.output_files.append(target)
                     
-                    with open(combined_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
+                    # Leave outputs of unchanged inputs alone
+                    if (
+                        changed_files is not None
+                        and source not in changed_files
+                        and previous_files is not None
+                        and previous_files.get(target)
+                    ):
+                        continue
                     
-                    # Clean up the combined file
-                    combined_path.unlink()
-                
-                # Transform content for the specific tool
-                transformed_content = self.transform_content(content)
-                
-                # Write the transformed content to the temporary file
-                tmp_file.write(transformed_content)
-                tmp_file.flush()
-            
-            # Sync the temporary file to the output path
-            result = sync_file(temp_path, self.output_path, mode)
+                    if not self._generate_file([source], target, mode, None):
+                        return False
+            else:
+                self.output_files.append(self.output_path)
+                if not self._generate_file(input_files, self.output_path, mode, content):
+                    return False
             
-            # Clean up the temporary file
-            temp_path.unlink()
+            # Remove outputs of a previous run that are no longer produced
+            if previous_files:
+                self._remove_stale_files(previous_files, input_files)
             
-            return result
+            return True
         
         except Exception as e:
             print(f"Error generating rule file for {self.tool_name}: {e}")
             return False
+    
+    def check(
+        self,
+        input_files: List[Path],
+        force_mode: Optional[SyncMode] = None,
+        content: Optional[str] = None,
+        source_root: Optional[Path] = None,
+    ) -> List[Path]:
+        """
+        Find the output files that differ from what generate() would write.
+        
+        Outputs are rendered in memory and compared with the files on disk,
+        size first, without writing anything. A linked output is up to date
+        when it is a symlink to its source or a file with the same content,
+        since hardlinks and reflinks do not survive a checkout.
+        
+        Args:
+            input_files: List of input Markdown files
+            force_mode: Force a specific sync mode (overrides config)
+            content: Pre-combined content of the input files, see generate()
+            source_root: Directory the input files were found in, see generate()
+            
+        Returns:
+            List of missing or outdated output files
+            
+        Raises:
+            OSError: If an input file could not be read
+        """
+        mode = force_mode if force_mode is not None else self.config.mode
+        
+        if not self.emits_directory:
+            if self._file_up_to_date(input_files, self.output_path, mode, content):
+                return []
+            return [self.output_path]
+        
+        if source_root is None:
+            source_root = Path(os.path.commonpath([f.parent for f in input_files]))
+        
+        stale = []
+        for source in input_files:
+            target = self.output_path / source.relative_to(source_root).with_suffix(
+                self.split_suffix
+            )
+            if not self._file_up_to_date([source], target, mode, None):
+                stale.append(target)
+        return stale
+    
+    def _file_up_to_date(
+        self,
+        input_files: List[Path],
+        output_path: Path,
+        mode: SyncMode,
+        content: Optional[str],
+    ) -> bool:
+        """
+        Check one output file against the given input files, see check().
+        
+        Args:
+            input_files: List of input Markdown files
+            output_path: Path to the output file
+            mode: Sync mode
+            content: Pre-combined content of the input files, if available
+            
+        Returns:
+            bool: True if the output file is up to date
+        """
+        # Mirrors the cases of _generate_file
+        if len(input_files) == 1 and mode in LINK_MODES + (SyncMode.AUTO,):
+            source = input_files[0]
+            if symlink_points_to(output_path, source):
+                return True
+            with open(source, 'rb') as infile:
+                return file_has_content(output_path, infile.read())
+        
+        if self.identity_transform:
+            return file_has_concatenation(output_path, input_files)
+        
+        if content is None:
+            lines = iter_markdown_files(input_files)
+        else:
+            lines = iter_lines([content])
+        rendered = "".join(self.transform_lines(lines))
+        return file_has_content(output_path, rendered.encode('utf-8'))
+    
+    def _generate_file(
+        self,
+        input_files: List[Path],
+        output_path: Path,
+        mode: SyncMode,
+        content: Optional[str],
+    ) -> bool:
+        """
+        Generate one output file from the given input files.
+        
+        Args:
+            input_files: List of input Markdown files
+            output_path: Path to the output file
+            mode: Sync mode
+            content: Pre-combined content of the input files, if available
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        # Make sure the output directory exists
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # For a single input file, we can directly sync it
+        if len(input_files) == 1 and mode in LINK_MODES + (SyncMode.AUTO,):
+            # Skip transformation for links if possible
+            source = input_files[0]
+            if file_in_sync(source, output_path, mode):
+                self.sync_mode = resolve_sync_mode(source, output_path, mode)
+                return True
+            
+            self.sync_mode = sync_file_with_mode(source, output_path, mode)
+            if self.sync_mode is None:
+                return False
+            
+            self.changed = True
+            return True
+        
+        # Without a transformation, the input files can be concatenated
+        # straight into the output
+        if self.identity_transform:
+            if concatenate_files_atomic(input_files, output_path):
+                self.changed = True
+            self.sync_mode = SyncMode.COPY
+            return True
+        
+        # Combine input files unless the caller already did
+        if content is None:
+            lines = iter_markdown_files(input_files)
+        else:
+            lines = iter_lines([content])
+        
+        # Transform content for the specific tool
+        transformed_content = self.transform_lines(lines)
+        
+        # Transformed content has no source file to link to, so it is
+        # always written to the output path as a regular file
+        if write_file_atomic(output_path, transformed_content):
+            self.changed = True
+        self.sync_mode = SyncMode.COPY
+        return True
+    
+    def _remove_stale_files(
+        self, previous_files: Dict[Path, bool], input_files: List[Path]
+    ) -> None:
+        """
+        Remove output files of a previous run that are no longer produced.
+        
+        Files modified since the previous run are not removed, so no manual
+        edits are lost, but listed in kept_files.
+        
+        Args:
+            previous_files: Output files written by the previous run, mapped
+                to whether they are still unmodified
+            input_files: Current input files, which are never removed
+        """
+        keep = set(self.output_files) | set(input_files)
+        for stale, unmodified in previous_files.items():
+            if stale in keep or not (stale.is_symlink() or stale.is_file()):
+                continue
+            
+            if not unmodified:
+                self.kept_files.append(stale)
+                continue
+            
+            stale.unlink()
+            self.changed = True
+            
+            # Remove directories emptied inside a per-file output directory
+            if self.emits_directory:
+                parent = stale.parent
+                while parent != self.output_path and self.output_path in parent.parents:
+                    try:
+                        parent.rmdir()
+                    except OSError:
+                        break
+                    parent = parent.parent
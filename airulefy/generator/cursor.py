@@ -2,15 +2,22 @@
 Generator for Cursor rules.
 """
 
+from itertools import islice
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from ..config import ToolConfig
+from ..fsutils import iter_lines
 from .base import RuleGenerator
 
 
 class CursorGenerator(RuleGenerator):
     """Generator for Cursor rules."""
     
+    # Cursor reads every .mdc file in .cursor/rules/
+    supports_split = True
+    split_suffix = ".mdc"
+    
     def transform_content(self, content: str) -> str:
         """
         Transform Markdown content for Cursor's .mdc format.
@@ -21,29 +28,35 @@ class CursorGenerator(RuleGenerator):
         Returns:
             str: Transformed content for Cursor
         """
+        return "".join(self.transform_lines(iter_lines([content])))
+    
+    def transform_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Transform streamed Markdown content for Cursor's .mdc format.
+        
+        Args:
+            lines: Lines of the original Markdown content
+            
+        Yields:
+            str: Lines of the transformed content for Cursor
+        """
         # Cursor's .mdc format has some special handling:
         # 1. Make sure there's a title at the top (if none exists)
         # 2. Convert any header format to be compatible with .mdc
         # 3. Handle any special Cursor-specific formatting
         
-        lines = content.split("\n")
-        transformed_lines = []
+        lines = iter(lines)
         
-        # Check if there's a title at the top (# Title)
-        has_title = False
-        for line in lines[:5]:  # Check first few lines
-            if line.strip().startswith("# "):
-                has_title = True
-                break
+        # Check if there's a title at the top (# Title), buffering only the
+        # first few lines
+        head = list(islice(lines, 5))
+        has_title = any(line.strip().startswith("# ") for line in head)
         
         # If no title found, add a default one
         if not has_title:
-            transformed_lines.append("# Cursor Rules")
-            transformed_lines.append("")
+            yield "# Cursor Rules\n\n"
         
         # Process the rest of the content
-        for line in lines:
-            # Append the line (no special transformations needed for .mdc format)
-            transformed_lines.append(line)
-        
-        return "\n".join(transformed_lines)
+        # (no special transformations needed for .mdc format)
+        yield from head
+        yield from lines
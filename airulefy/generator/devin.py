@@ -3,6 +3,7 @@ Generator for Devin rules.
 """
 
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from ..config import ToolConfig
 from .base import RuleGenerator
@@ -11,6 +12,8 @@ from .base import RuleGenerator
 class DevinGenerator(RuleGenerator):
     """Generator for Devin rules."""
     
+    identity_transform = True
+    
     def transform_content(self, content: str) -> str:
         """
         Transform Markdown content for Devin format.
@@ -23,3 +26,16 @@ class DevinGenerator(RuleGenerator):
         """
         # Devin uses standard Markdown format, so no special transformation is needed
         return content
+    
+    def transform_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Transform streamed Markdown content for Devin format.
+        
+        Args:
+            lines: Lines of the original Markdown content
+            
+        Yields:
+            str: Lines of the transformed content for Devin
+        """
+        # No transformation is needed, so lines are passed through as they arrive
+        yield from lines
@@ -0,0 +1,349 @@
+"""
+Incremental build manifest for Airulefy.
+"""
+
+import hashlib
+import json
+import os
+import stat
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Union
+
+from pydantic import BaseModel, Field, ValidationError
+
+from . import __version__
+from .config import SyncMode
+from .fsutils import write_file_atomic
+from .generator.base import RuleGenerator
+
+# Location of the manifest file relative to the project root
+MANIFEST_PATH = ".airulefy/manifest.json"
+
+# Bumped whenever the manifest layout changes, invalidating older manifests
+MANIFEST_VERSION = 2
+
+# Files modified this close to the previous scan are always re-hashed, since a
+# later change within the same timestamp granularity would not alter the mtime
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class InputRecord(BaseModel):
+    """State of an input Markdown file when it was last hashed."""
+    
+    size: int = Field(description="File size in bytes")
+    mtime_ns: int = Field(description="Modification time in nanoseconds")
+    sha256: str = Field(description="SHA-256 digest of the file content")
+
+
+class OutputFileRecord(BaseModel):
+    """State of a generated output file after it was last written."""
+    
+    sha256: Optional[str] = Field(
+        default=None, description="SHA-256 digest of the file content (None for symlinks)"
+    )
+    link_target: Optional[str] = Field(default=None, description="Symlink target of the file")
+    size: Optional[int] = Field(default=None, description="File size in bytes")
+    mtime_ns: Optional[int] = Field(default=None, description="Modification time in nanoseconds")
+    
+    def matches(self, path: Path) -> bool:
+        """
+        Check whether a file is still in the recorded state.
+        
+        The file is only stat'ed, never read.
+        
+        Args:
+            path: Path to the output file
+        
+        Returns:
+            bool: True if the file has not been modified since it was recorded
+        """
+        try:
+            path_stat = os.lstat(path)
+        except OSError:
+            return False
+        
+        if self.link_target is not None:
+            if not stat.S_ISLNK(path_stat.st_mode):
+                return False
+            try:
+                return os.readlink(path) == self.link_target
+            except OSError:
+                return False
+        
+        return (
+            stat.S_ISREG(path_stat.st_mode)
+            and path_stat.st_size == self.size
+            and path_stat.st_mtime_ns == self.mtime_ns
+        )
+
+
+class OutputRecord(BaseModel):
+    """State of a tool's outputs after they were last generated."""
+    
+    config_hash: str = Field(description="Digest of the tool configuration used")
+    inputs_hash: str = Field(description="Digest of the input files used")
+    files: Dict[str, OutputFileRecord] = Field(
+        default_factory=dict, description="Output files keyed by path relative to project root"
+    )
+
+
+class BuildManifest(BaseModel):
+    """Record of the inputs and outputs of the last generate run."""
+    
+    version: int = Field(default=MANIFEST_VERSION, description="Manifest format version")
+    scanned_at_ns: int = Field(default=0, description="Time the inputs were last scanned")
+    inputs: Dict[str, InputRecord] = Field(
+        default_factory=dict, description="Input files keyed by path relative to project root"
+    )
+    outputs: Dict[str, OutputRecord] = Field(
+        default_factory=dict, description="Generated outputs keyed by tool name"
+    )
+    
+    def scan_inputs(
+        self,
+        files: List[Path],
+        project_root: Path,
+        changed: Optional[Set[Path]] = None,
+    ) -> Dict[str, InputRecord]:
+        """
+        Build records for the given input files, reusing known hashes.
+        
+        A file is only read and hashed when its size or mtime differs from the
+        recorded state, or when it was modified so close to the last scan that
+        a change within the same mtime tick could have been missed.
+        
+        Args:
+            files: Input Markdown files
+            project_root: Path to the project root
+            changed: Files known to have changed since this manifest was
+                recorded, for example from file system events. When given,
+                recorded files not in this set are trusted without a stat.
+        
+        Returns:
+            Dict mapping relative paths to input records
+        """
+        inputs = {}
+        for file_path in files:
+            key = _relative_key(file_path, project_root)
+            previous = self.inputs.get(key)
+            if changed is not None and previous is not None and file_path not in changed:
+                inputs[key] = previous
+                continue
+            
+            file_stat = os.stat(file_path)
+            if (
+                previous is not None
+                and previous.size == file_stat.st_size
+                and previous.mtime_ns == file_stat.st_mtime_ns
+                and file_stat.st_mtime_ns < self.scanned_at_ns - RACY_WINDOW_NS
+            ):
+                inputs[key] = previous
+            else:
+                inputs[key] = InputRecord(
+                    size=file_stat.st_size,
+                    mtime_ns=file_stat.st_mtime_ns,
+                    sha256=hash_file(file_path),
+                )
+        
+        return inputs
+    
+    def is_output_current(
+        self, tool_name: str, config_hash: str, inputs_hash: str, project_root: Path
+    ) -> bool:
+        """
+        Check whether a tool's outputs are known to be up to date.
+        
+        The output files are only stat'ed, never read.
+        
+        Args:
+            tool_name: Name of the AI tool
+            config_hash: Digest of the current tool configuration
+            inputs_hash: Digest of the current input files
+            project_root: Path to the project root
+        
+        Returns:
+            bool: True if the outputs were generated from the same configuration
+            and inputs and none has been modified since
+        """
+        record = self.outputs.get(tool_name)
+        if record is None or not record.files:
+            return False
+        
+        if record.config_hash != config_hash or record.inputs_hash != inputs_hash:
+            return False
+        
+        return all(
+            file_record.matches(project_root / key) for key, file_record in record.files.items()
+        )
+    
+    def changed_inputs(self, inputs: Dict[str, InputRecord], project_root: Path) -> Set[Path]:
+        """
+        Find the input files that are new or changed compared to this manifest.
+        
+        Args:
+            inputs: Current input records, as returned by scan_inputs
+            project_root: Path to the project root
+        
+        Returns:
+            Set of paths of new or modified input files
+        """
+        return {
+            project_root / key
+            for key, record in inputs.items()
+            if key not in self.inputs or self.inputs[key].sha256 != record.sha256
+        }
+
+
+def hash_file(path: Union[str, Path]) -> str:
+    """
+    Calculate the SHA-256 digest of a file.
+    
+    Args:
+        path: File path
+    
+    Returns:
+        str: Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def inputs_digest(inputs: Dict[str, InputRecord]) -> str:
+    """
+    Calculate a digest identifying a set of input files and their content.
+    
+    Args:
+        inputs: Input records keyed by relative path
+    
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    for key in sorted(inputs):
+        digest.update(f"{key}\0{inputs[key].sha256}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def config_digest(generator: RuleGenerator, mode: SyncMode) -> str:
+    """
+    Calculate a digest of everything in a tool's configuration that affects its output.
+    
+    Args:
+        generator: Rule generator for the tool
+        mode: Effective sync mode for the tool
+    
+    Returns:
+        str: Hex digest
+    """
+    data = {
+        "version": __version__,
+        "tool": generator.tool_name,
+        "generator": type(generator).__name__,
+        "config": generator.config.model_dump(mode="json"),
+        "mode": mode.value,
+        "output": str(generator.output_path),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def record_output(
+    config_hash: str,
+    inputs_hash: str,
+    output_paths: List[Path],
+    project_root: Path,
+    previous: Optional[OutputRecord] = None,
+) -> OutputRecord:
+    """
+    Create a record of freshly generated output files.
+    
+    Files whose state still matches the previous record are not hashed again.
+    
+    Args:
+        config_hash: Digest of the tool configuration used
+        inputs_hash: Digest of the input files used
+        output_paths: Paths to the output files
+        project_root: Path to the project root
+        previous: The tool's record from the last run, if any
+    
+    Returns:
+        OutputRecord: Record of the outputs' current state
+    """
+    files = {}
+    for output_path in output_paths:
+        key = _relative_key(output_path, project_root)
+        if (
+            previous is not None
+            and key in previous.files
+            and previous.files[key].matches(output_path)
+        ):
+            files[key] = previous.files[key]
+            continue
+        
+        output_stat = os.lstat(output_path)
+        if stat.S_ISLNK(output_stat.st_mode):
+            files[key] = OutputFileRecord(link_target=os.readlink(output_path))
+        else:
+            files[key] = OutputFileRecord(
+                sha256=hash_file(output_path),
+                size=output_stat.st_size,
+                mtime_ns=output_stat.st_mtime_ns,
+            )
+    
+    return OutputRecord(config_hash=config_hash, inputs_hash=inputs_hash, files=files)
+
+
+def load_manifest(project_root: Union[str, Path]) -> BuildManifest:
+    """
+    Load the build manifest from the project root.
+    
+    Args:
+        project_root: Path to the project root directory
+    
+    Returns:
+        BuildManifest: The stored manifest, or an empty one if it is missing,
+        unreadable or from another manifest version
+    """
+    manifest_path = Path(project_root) / MANIFEST_PATH
+    
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = BuildManifest.model_validate_json(f.read())
+    except (OSError, ValueError, ValidationError):
+        return BuildManifest()
+    
+    if manifest.version != MANIFEST_VERSION:
+        return BuildManifest()
+    
+    return manifest
+
+
+def save_manifest(project_root: Union[str, Path], manifest: BuildManifest) -> bool:
+    """
+    Save the build manifest to the project root.
+    
+    Args:
+        project_root: Path to the project root directory
+        manifest: Manifest to save
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    manifest_path = Path(project_root) / MANIFEST_PATH
+    
+    try:
+        write_file_atomic(manifest_path, manifest.model_dump_json(indent=2))
+        return True
+    except OSError:
+        return False
+
+
+def _relative_key(path: Path, project_root: Path) -> str:
+    """Get the manifest key for a file: its POSIX path relative to the project root."""
+    try:
+        return path.relative_to(project_root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
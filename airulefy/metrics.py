@@ -0,0 +1,294 @@
+"""
+Watch mode metrics for Airulefy.
+"""
+
+import math
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .build import ToolResult
+from .fsutils import write_file_atomic
+from .options import DEFAULT_METRICS_INTERVAL
+
+# Upper bounds in seconds of the buckets of the event-to-rebuild latency histogram
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Upper bounds in seconds of the buckets of the per-tool rebuild duration histogram
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# Counter names and help texts, in export order
+COUNTERS = {
+    "rebuilds": "Regenerations run for file changes",
+    "coalesced_events": "File system events merged into another event's regeneration",
+    "suppressed_events": "Changed paths ignored as caused by the watcher's own writes",
+    "rescans": "Event storms handled by rescanning the input directory",
+}
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets, as exported to Prometheus."""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        """
+        Initialize the histogram.
+        
+        Args:
+            buckets: Increasing upper bounds of the buckets
+        """
+        self.buckets = buckets
+        # Number of observations per bucket, not cumulative, plus one above all bounds
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float) -> None:
+        """
+        Record an observation.
+        
+        Args:
+            value: Observed value
+        """
+        index = next(
+            (i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets)
+        )
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket containing it.
+        
+        Args:
+            q: Quantile between 0 and 1
+        
+        Returns:
+            float: Upper bound of the bucket, or the maximum observed value
+            for the bucket above all bounds
+        """
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class WatchMetrics:
+    """
+    Latencies, rebuild durations and event counts of watched projects.
+    
+    Metrics are recorded per project from the regeneration thread and can
+    be rendered at any time from other threads.
+    """
+    
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Histogram] = {}
+        self._durations: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str], int] = {}
+    
+    def record_regeneration(
+        self,
+        project: Union[str, Path],
+        latency: Optional[float],
+        event_count: int,
+        suppressed: int = 0,
+        rescan: bool = False,
+        results: Optional[List[ToolResult]] = None,
+    ) -> None:
+        """
+        Record a regeneration run for file changes.
+        
+        Args:
+            project: Project root
+            latency: Seconds from the first event to the start of the regeneration
+            event_count: Number of file system events the regeneration covers
+            suppressed: Number of changed paths dropped as the watcher's own writes
+            rescan: Whether the input directory was rescanned after an event storm
+            results: Results of the regeneration, or None if nothing was rebuilt
+        """
+        project = str(project)
+        with self._lock:
+            if latency is not None:
+                self._latencies.setdefault(project, Histogram(LATENCY_BUCKETS)).observe(latency)
+            self._increment("coalesced_events", project, max(event_count - 1, 0))
+            self._increment("suppressed_events", project, suppressed)
+            self._increment("rescans", project, int(rescan))
+            if results is None:
+                return
+            
+            self._increment("rebuilds", project, 1)
+            for result in results:
+                if result.duration is not None:
+                    histogram = self._durations.setdefault(
+                        (project, result.tool_name), Histogram(DURATION_BUCKETS)
+                    )
+                    histogram.observe(result.duration)
+    
+    def render(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+        
+        Returns:
+            str: Metrics text, suitable for the node exporter's textfile collector
+        """
+        lines: List[str] = []
+        with self._lock:
+            _render_histogram(
+                lines,
+                "airulefy_watch_event_to_rebuild_seconds",
+                "Seconds from the first file event of a change to the start of its regeneration",
+                {
+                    (("project", project),): histogram
+                    for project, histogram in self._latencies.items()
+                },
+            )
+            _render_histogram(
+                lines,
+                "airulefy_watch_tool_rebuild_seconds",
+                "Seconds spent regenerating the outputs of a tool",
+                {
+                    (("project", project), ("tool", tool)): histogram
+                    for (project, tool), histogram in self._durations.items()
+                },
+            )
+            for name, help_text in COUNTERS.items():
+                metric = f"airulefy_watch_{name}_total"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for (counter, project), value in sorted(self._counters.items()):
+                    if counter == name:
+                        lines.append(f"{metric}{_format_labels((('project', project),))} {value}")
+        
+        return "\n".join(lines) + "\n"
+    
+    def summary(self) -> str:
+        """
+        Summarize the metrics for people.
+        
+        Returns:
+            str: One block of lines per project
+        """
+        lines = []
+        with self._lock:
+            projects = sorted(
+                set(self._latencies)
+                | {project for project, _ in self._durations}
+                | {project for _, project in self._counters}
+            )
+            if not projects:
+                return "No changes handled yet."
+            
+            for project in projects:
+                counts = ", ".join(
+                    f"{self._counters.get((name, project), 0)} {name.replace('_', ' ')}"
+                    for name in COUNTERS
+                )
+                lines.append(f"{project}: {counts}")
+                
+                latency = self._latencies.get(project)
+                if latency is not None:
+                    lines.append(f"  event to rebuild: {_describe(latency)}")
+                for (duration_project, tool), histogram in sorted(self._durations.items()):
+                    if duration_project == project:
+                        lines.append(f"  {tool}: {_describe(histogram)}")
+        
+        return "\n".join(lines)
+    
+    def _increment(self, name: str, project: str, amount: int) -> None:
+        """Add to a counter. Must be called with the lock held."""
+        if amount:
+            self._counters[(name, project)] = self._counters.get((name, project), 0) + amount
+
+
+class MetricsExporter:
+    """Rewrite a Prometheus text file with the current metrics at a fixed interval."""
+    
+    def __init__(
+        self,
+        metrics: WatchMetrics,
+        path: Union[str, Path],
+        interval: float = DEFAULT_METRICS_INTERVAL,
+    ):
+        """
+        Initialize the exporter.
+        
+        Args:
+            metrics: Metrics to export
+            path: Path to the metrics file
+            interval: Seconds between rewrites
+        """
+        self.metrics = metrics
+        self.path = Path(path)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Write the metrics file now and keep rewriting it on a background thread."""
+        self.write()
+        self._thread = threading.Thread(target=self._run, name="airulefy-metrics", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop rewriting the metrics file, after writing it a last time."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+    
+    def write(self) -> None:
+        """Write the current metrics to the file, replacing it atomically."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_file_atomic(self.path, self.metrics.render())
+        except OSError as e:
+            print(f"Error writing metrics to {self.path}: {e}")
+    
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.write()
+
+
+def _render_histogram(
+    lines: List[str],
+    metric: str,
+    help_text: str,
+    histograms: Dict[Tuple[Tuple[str, str], ...], Histogram],
+) -> None:
+    """Append a histogram family in the Prometheus text format to lines."""
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for labels, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            bucket_labels = _format_labels(labels + (("le", repr(bound)),))
+            lines.append(f"{metric}_bucket{bucket_labels} {cumulative}")
+        bucket_labels = _format_labels(labels + (("le", "+Inf"),))
+        lines.append(f"{metric}_bucket{bucket_labels} {histogram.count}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum!r}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    """Format label pairs as a Prometheus label set, escaping the values."""
+    pairs = []
+    for name, value in labels:
+        value = value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _describe(histogram: Histogram) -> str:
+    """Describe a histogram of durations in one line."""
+    return (
+        f"{histogram.count} runs, mean {histogram.sum / histogram.count:.3f}s, "
+        f"p95 <= {histogram.quantile(0.95):.3f}s, max {histogram.max:.3f}s"
+    )
@@ -0,0 +1,699 @@
+"""
+File system observers serving all their watches from one thread for Airulefy.
+
+watchdog observers start a thread for every watch, and its inotify observer
+also opens an inotify instance for every watch. Watching many projects
+then starts hundreds of threads and runs into the per-user limit of inotify
+instances, 128 by default. The observers here share one thread, and on
+Linux one inotify instance, between all their watches.
+"""
+
+import ctypes
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    DirModifiedEvent,
+    DirMovedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileSystemEvent,
+    FileSystemEventHandler,
+)
+from watchdog.observers import Observer
+from watchdog.observers.api import ObservedWatch
+
+from .fsutils import IGNORE_FILE, IgnoreRules, load_ignore_rules
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+# Events requested for every watched directory
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+    | IN_EXCL_UNLINK
+)
+
+# Header of an inotify event: watch descriptor, mask, cookie and name length
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Bytes read from the inotify instance at once
+_READ_SIZE = 64 * 1024
+
+# Events with the handlers to pass them to
+Dispatches = List[Tuple[FileSystemEvent, List[FileSystemEventHandler]]]
+
+
+class SharedObserver:
+    """
+    Observer delivering the events of all its watches from one thread.
+    
+    Subclasses set up and tear down the watches in _add_watch and
+    _remove_watch, which are called with the observer's lock held, and
+    produce events in _run. Events are passed to the handlers without
+    holding the lock, so handlers may schedule and unschedule watches.
+    
+    Like find_markdown_files, recursive watches do not enter symlinked
+    directories unless asked to.
+    
+    Provides the schedule, unschedule, start, stop, join and is_alive
+    methods of a watchdog observer.
+    """
+    
+    def __init__(self, name: str):
+        """
+        Initialize the observer.
+        
+        Args:
+            name: Name of the observer thread
+        """
+        self._lock = threading.RLock()
+        self._handlers: Dict[ObservedWatch, List[FileSystemEventHandler]] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+    
+    @property
+    def watches(self) -> List[ObservedWatch]:
+        """Watches currently scheduled."""
+        with self._lock:
+            return list(self._handlers)
+    
+    def schedule(
+        self,
+        event_handler: FileSystemEventHandler,
+        path: str,
+        *,
+        recursive: bool = False,
+        follow_symlinks: bool = False,
+    ) -> ObservedWatch:
+        """
+        Watch a directory.
+        
+        Args:
+            event_handler: Handler to pass the events to
+            path: Directory to watch
+            recursive: Whether to watch the directories below it too
+            follow_symlinks: Whether a recursive watch enters symlinked
+                directories. A watch scheduled again keeps its first policy.
+        
+        Returns:
+            The watch, to pass to unschedule()
+        
+        Raises:
+            OSError: If the directory could not be watched
+        """
+        watch = ObservedWatch(os.fspath(path), recursive=recursive)
+        with self._lock:
+            handlers = self._handlers.get(watch)
+            if handlers is None:
+                self._add_watch(watch, follow_symlinks)
+                handlers = self._handlers[watch] = []
+            if event_handler not in handlers:
+                handlers.append(event_handler)
+        return watch
+    
+    def unschedule(self, watch: ObservedWatch) -> None:
+        """
+        Stop watching a directory.
+        
+        Raises:
+            KeyError: If the watch is not scheduled
+        """
+        with self._lock:
+            del self._handlers[watch]
+            self._remove_watch(watch)
+    
+    def start(self) -> None:
+        """Start the observer thread."""
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the observer thread."""
+        self._stopped.set()
+        self._wake()
+    
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the observer thread to stop."""
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+    
+    def is_alive(self) -> bool:
+        """Whether the observer thread is running."""
+        return self._thread.is_alive()
+    
+    def _dispatch(self, event: FileSystemEvent, handlers: List[FileSystemEventHandler]) -> None:
+        """Pass an event to handlers, reporting their errors."""
+        for handler in handlers:
+            try:
+                handler.dispatch(event)
+            except Exception as e:
+                print(f"Error handling file system event: {e}")
+    
+    def _handlers_of(self, watches: List[ObservedWatch]) -> List[FileSystemEventHandler]:
+        """Get the handlers of watches, each once, with the lock held."""
+        handlers: List[FileSystemEventHandler] = []
+        for watch in watches:
+            for handler in self._handlers.get(watch, ()):
+                if handler not in handlers:
+                    handlers.append(handler)
+        return handlers
+    
+    def _add_watch(self, watch: ObservedWatch, follow_symlinks: bool) -> None:
+        """Set up a new watch."""
+        raise NotImplementedError
+    
+    def _remove_watch(self, watch: ObservedWatch) -> None:
+        """Tear down a watch no longer scheduled."""
+        raise NotImplementedError
+    
+    def _run(self) -> None:
+        """Deliver events until stopped."""
+        raise NotImplementedError
+    
+    def _wake(self) -> None:
+        """Interrupt the observer thread waiting for events, so it sees it was stopped."""
+
+
+class InotifyObserver(SharedObserver):
+    """
+    Observer of native file system events on Linux using a single inotify instance.
+    
+    inotify watches single directories, so a recursive watch adds an inotify
+    watch for each directory below it, skipping the directories excluded by
+    the ignore rules of the watched directory. Directories created below a
+    recursive watch are watched as soon as they are reported, and creation
+    events are reported for the entries they already contain. Watches of
+    several observed directories sharing directories share their inotify
+    watches.
+    
+    A move within the watched directories is reported as one event, other
+    moves as a deletion or a creation. When the kernel's event queue
+    overflows, the recursively watched directories are reported as created,
+    so handlers rescan them.
+    """
+    
+    def __init__(self) -> None:
+        super().__init__("airulefy-inotify")
+        self._fd: Optional[int] = None
+        # Pipe written to wake the observer thread up when stopping
+        self._wake_fds: Optional[Tuple[int, int]] = None
+        # Watched directories by inotify watch descriptor, and the reverse
+        self._paths: Dict[int, str] = {}
+        self._descriptors: Dict[str, int] = {}
+        # Scheduled watches by path, and the ignore rules and symlink policy
+        # of recursive watches
+        self._watches_by_path: Dict[str, List[ObservedWatch]] = {}
+        self._rules: Dict[ObservedWatch, IgnoreRules] = {}
+        self._follow_symlinks: Dict[ObservedWatch, bool] = {}
+    
+    @staticmethod
+    def is_supported() -> bool:
+        """Whether inotify is available on this platform."""
+        return _load_libc() is not None
+    
+    def start(self) -> None:
+        """
+        Start the observer thread.
+        
+        Raises:
+            OSError: If no inotify instance could be created
+        """
+        with self._lock:
+            self._open()
+        super().start()
+    
+    def stop(self) -> None:
+        """Stop the observer thread, closing the inotify instance once it stops."""
+        super().stop()
+        if not self._thread.is_alive() and self._thread.ident is None:
+            with self._lock:
+                self._close()
+    
+    def _open(self) -> None:
+        """Create the inotify instance if it does not exist yet."""
+        if self._fd is not None:
+            return
+        
+        libc = _load_libc()
+        if libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            if error == errno.EMFILE:
+                raise OSError(error, "inotify instance limit reached")
+            raise OSError(error, os.strerror(error))
+        self._fd = fd
+        self._wake_fds = os.pipe()
+    
+    def _instance(self) -> Tuple[ctypes.CDLL, int]:
+        """
+        Get the C library and the inotify instance.
+        
+        Raises:
+            OSError: If the inotify instance is not open
+        """
+        libc = _load_libc()
+        if libc is None or self._fd is None:
+            raise OSError(errno.EBADF, "inotify instance is not open")
+        return libc, self._fd
+    
+    def _close(self) -> None:
+        """Close the inotify instance, dropping all inotify watches."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._wake_fds is not None:
+            for fd in self._wake_fds:
+                os.close(fd)
+            self._wake_fds = None
+        self._paths.clear()
+        self._descriptors.clear()
+    
+    def _wake(self) -> None:
+        with self._lock:
+            if self._wake_fds is not None:
+                os.write(self._wake_fds[1], b"\0")
+    
+    def _add_watch(self, watch: ObservedWatch, follow_symlinks: bool) -> None:
+        self._open()
+        if watch.is_recursive:
+            self._rules[watch] = load_ignore_rules(watch.path)
+            self._follow_symlinks[watch] = follow_symlinks
+        self._watches_by_path.setdefault(watch.path, []).append(watch)
+        try:
+            self._watch_tree(watch.path, watch)
+        except OSError:
+            self._forget_watch(watch)
+            raise
+    
+    def _remove_watch(self, watch: ObservedWatch) -> None:
+        self._forget_watch(watch)
+    
+    def _forget_watch(self, watch: ObservedWatch) -> None:
+        """Drop a watch and the inotify watches no other watch needs."""
+        self._watches_by_path[watch.path].remove(watch)
+        if not self._watches_by_path[watch.path]:
+            del self._watches_by_path[watch.path]
+        self._rules.pop(watch, None)
+        self._follow_symlinks.pop(watch, None)
+        self._prune()
+    
+    def _watch_tree(
+        self, directory: str, watch: ObservedWatch, events: Optional[List[FileSystemEvent]] = None
+    ) -> None:
+        """
+        Add inotify watches for a directory and, if recursive, the directories below it.
+        
+        Args:
+            directory: Directory to watch
+            watch: Watch covering the directory
+            events: List to add creation events for the entries found to, if any
+        
+        Raises:
+            OSError: If the directory could not be watched, or the limit of
+                inotify watches was reached below it
+        """
+        if not self._add_directory(directory) or not watch.is_recursive:
+            return
+        
+        follow_symlinks = self._follow_symlinks[watch]
+        pending = [directory]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as scanned:
+                    entries = list(scanned)
+            except OSError:
+                continue
+            
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                    if is_dir and not follow_symlinks and entry.is_symlink():
+                        continue
+                except OSError:
+                    continue
+                
+                if not is_dir:
+                    if events is not None:
+                        events.append(FileCreatedEvent(entry.path))
+                    continue
+                if not self._covers(watch, entry.path):
+                    continue
+                if events is not None:
+                    events.append(DirCreatedEvent(entry.path))
+                try:
+                    # Symlinks to directories watched already, including
+                    # symlink cycles, are not entered
+                    if self._add_directory(entry.path):
+                        pending.append(entry.path)
+                except OSError as e:
+                    if e.errno == errno.ENOSPC:
+                        raise
+    
+    def _add_directory(self, path: str) -> bool:
+        """
+        Add an inotify watch for a directory.
+        
+        Returns:
+            bool: False if the directory is watched already under another path
+        """
+        if path in self._descriptors:
+            return True
+        
+        libc, fd = self._instance()
+        wd = libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                raise OSError(error, f"inotify watch limit reached: {path}")
+            raise OSError(error, f"{os.strerror(error)}: {path}")
+        
+        if wd in self._paths:
+            return False
+        self._paths[wd] = path
+        self._descriptors[path] = wd
+        return True
+    
+    def _remove_directory(self, path: str) -> None:
+        """Remove the inotify watch of a directory."""
+        wd = self._descriptors.pop(path)
+        del self._paths[wd]
+        # Fails when the directory is gone, which removed the watch already
+        libc, fd = self._instance()
+        libc.inotify_rm_watch(fd, wd)
+    
+    def _forget_tree(self, path: str) -> None:
+        """Remove the inotify watches of a directory and the directories below it."""
+        prefix = path + os.sep
+        for watched in [p for p in self._descriptors if p == path or p.startswith(prefix)]:
+            self._remove_directory(watched)
+    
+    def _prune(self) -> None:
+        """Remove the inotify watches no watch needs anymore."""
+        for path in [p for p in self._descriptors if not self._is_needed(p)]:
+            self._remove_directory(path)
+    
+    def _covers(self, watch: ObservedWatch, path: str) -> bool:
+        """Check whether a watch includes a directory, considering its ignore rules."""
+        if path == watch.path:
+            return True
+        if not watch.is_recursive or not path.startswith(watch.path + os.sep):
+            return False
+        
+        parts = path[len(watch.path) + 1:].split(os.sep)
+        rules = self._rules[watch]
+        return not any(
+            rules.is_ignored("/".join(parts[:i]), True) for i in range(1, len(parts) + 1)
+        )
+    
+    def _watches_covering(self, path: str) -> List[ObservedWatch]:
+        """Get the watches including a directory."""
+        watches = list(self._watches_by_path.get(path, ()))
+        ancestor = os.path.dirname(path)
+        while True:
+            for watch in self._watches_by_path.get(ancestor, ()):
+                if watch.is_recursive and self._covers(watch, path):
+                    watches.append(watch)
+            parent = os.path.dirname(ancestor)
+            if parent == ancestor:
+                return watches
+            ancestor = parent
+    
+    def _is_needed(self, path: str) -> bool:
+        """Check whether any watch includes a directory."""
+        return bool(self._watches_covering(path))
+    
+    def _run(self) -> None:
+        try:
+            # Opened by start(), and closed only once this thread ends
+            fd, wake_fds = self._fd, self._wake_fds
+            if fd is None or wake_fds is None:
+                return
+            
+            poller = select.poll()
+            poller.register(fd, select.POLLIN)
+            poller.register(wake_fds[0], select.POLLIN)
+            while not self._stopped.is_set():
+                poller.poll()
+                if self._stopped.is_set():
+                    break
+                try:
+                    data = os.read(fd, _READ_SIZE)
+                except BlockingIOError:
+                    continue
+                
+                with self._lock:
+                    dispatches = self._read_events(data)
+                for event, handlers in dispatches:
+                    self._dispatch(event, handlers)
+        finally:
+            with self._lock:
+                self._close()
+    
+    def _read_events(self, data: bytes) -> Dispatches:
+        """
+        Turn raw inotify events into file system events, with the lock held.
+        
+        Returns:
+            The events with the handlers to pass them to
+        """
+        dispatches: Dispatches = []
+        # Sources of moves waiting for their destination, by cookie
+        moves: Dict[int, Tuple[str, bool, List[FileSystemEventHandler]]] = {}
+        # Recursive watches whose ignore file changed
+        changed_rules: List[ObservedWatch] = []
+        
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            
+            if mask & IN_Q_OVERFLOW:
+                dispatches.extend(self._recover_overflow())
+                continue
+            
+            directory = self._paths.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._paths[wd]
+                if self._descriptors.get(directory) == wd:
+                    del self._descriptors[directory]
+                continue
+            
+            if not name:
+                # The watched directory itself was deleted or moved away
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    # Its inotify watch lasts while the directory is open
+                    # somewhere, but a new directory at its path needs another
+                    self._forget_tree(directory)
+                    handlers = self._handlers_of(self._watches_by_path.get(directory, []))
+                    if handlers:
+                        dispatches.append((DirDeletedEvent(directory), handlers))
+                elif mask & (IN_MODIFY | IN_ATTRIB):
+                    handlers = self._handlers_of(self._watches_by_path.get(directory, []))
+                    if handlers:
+                        dispatches.append((DirModifiedEvent(directory), handlers))
+                continue
+            
+            path = os.path.join(directory, name)
+            is_dir = bool(mask & IN_ISDIR)
+            handlers = self._handlers_of(self._watches_covering(directory))
+            if name == IGNORE_FILE:
+                changed_rules.extend(
+                    w for w in self._watches_by_path.get(directory, ()) if w.is_recursive
+                )
+            
+            if mask & IN_MOVED_FROM:
+                if is_dir:
+                    self._forget_tree(path)
+                moves[cookie] = (path, is_dir, handlers)
+            elif mask & IN_MOVED_TO:
+                source = moves.pop(cookie, None)
+                if source is not None:
+                    event_class = DirMovedEvent if is_dir else FileMovedEvent
+                    handlers = source[2] + [h for h in handlers if h not in source[2]]
+                    dispatches.append((event_class(source[0], path), handlers))
+                else:
+                    dispatches.append(
+                        ((DirCreatedEvent if is_dir else FileCreatedEvent)(path), handlers)
+                    )
+                if is_dir:
+                    dispatches.extend(self._watch_new_directory(path, created=source is None))
+            elif mask & IN_CREATE:
+                dispatches.append(
+                    ((DirCreatedEvent if is_dir else FileCreatedEvent)(path), handlers)
+                )
+                if is_dir:
+                    dispatches.extend(self._watch_new_directory(path, created=True))
+            elif mask & IN_DELETE:
+                if is_dir:
+                    self._forget_tree(path)
+                dispatches.append(
+                    ((DirDeletedEvent if is_dir else FileDeletedEvent)(path), handlers)
+                )
+            elif mask & (IN_MODIFY | IN_ATTRIB):
+                dispatches.append(
+                    ((DirModifiedEvent if is_dir else FileModifiedEvent)(path), handlers)
+                )
+        
+        # Moves to unwatched directories
+        for path, is_dir, handlers in moves.values():
+            dispatches.append(((DirDeletedEvent if is_dir else FileDeletedEvent)(path), handlers))
+        
+        for watch in changed_rules:
+            if watch in self._rules:
+                self._rules[watch] = load_ignore_rules(watch.path)
+                self._prune()
+                dispatches.extend(self._watch_new_directory(watch.path, created=False))
+        
+        return [(event, handlers) for event, handlers in dispatches if handlers]
+    
+    def _watch_new_directory(self, path: str, created: bool) -> Dispatches:
+        """
+        Watch a directory that appeared, for the watches including it.
+        
+        Args:
+            path: Directory created or moved in
+            created: Whether to report creation events for its entries, which
+                may have been added before it was watched
+        
+        Returns:
+            The creation events with the handlers to pass them to
+        """
+        dispatches: Dispatches = []
+        for watch in self._watches_covering(path):
+            events: Optional[List[FileSystemEvent]] = [] if created else None
+            try:
+                self._watch_tree(path, watch, events)
+            except OSError as e:
+                print(f"Error watching {path}: {e}")
+                continue
+            handlers = self._handlers_of([watch])
+            dispatches.extend((event, handlers) for event in events or ())
+        return dispatches
+    
+    def _recover_overflow(self) -> Dispatches:
+        """Watch the directories missed while events were lost, and report the watches to rescan."""
+        dispatches: Dispatches = []
+        for watches in list(self._watches_by_path.values()):
+            for watch in watches:
+                try:
+                    self._watch_tree(watch.path, watch)
+                except OSError:
+                    continue
+                if watch.is_recursive:
+                    dispatches.append((DirCreatedEvent(watch.path), self._handlers_of([watch])))
+        return dispatches
+
+
+class WatchdogObserver:
+    """
+    watchdog's observer for the platform, for platforms without inotify.
+    
+    Starts a thread for every watch. Recursive watches follow the platform's
+    API, so whether they enter symlinked directories does not depend on
+    follow_symlinks.
+    
+    Provides the schedule, unschedule, start, stop, join and is_alive
+    methods of a SharedObserver.
+    """
+    
+    def __init__(self) -> None:
+        self._observer = Observer()
+    
+    def schedule(
+        self,
+        event_handler: FileSystemEventHandler,
+        path: str,
+        *,
+        recursive: bool = False,
+        follow_symlinks: bool = False,
+    ) -> ObservedWatch:
+        """Watch a directory, see SharedObserver.schedule."""
+        watch: ObservedWatch = self._observer.schedule(event_handler, path, recursive=recursive)
+        return watch
+    
+    def unschedule(self, watch: ObservedWatch) -> None:
+        """Stop watching a directory."""
+        self._observer.unschedule(watch)
+    
+    def start(self) -> None:
+        """Start the observer threads."""
+        self._observer.start()
+    
+    def stop(self) -> None:
+        """Stop the observer threads."""
+        self._observer.stop()
+    
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the observer threads to stop."""
+        if self._observer.is_alive():
+            self._observer.join(timeout)
+    
+    def is_alive(self) -> bool:
+        """Whether the observer thread is running."""
+        return bool(self._observer.is_alive())
+
+
+_libc: Optional[ctypes.CDLL] = None
+_libc_loaded = False
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    """Load the inotify functions of the C library, or get None where they are missing."""
+    global _libc, _libc_loaded
+    if _libc_loaded:
+        return _libc
+    
+    _libc_loaded = True
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        init = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+        rm_watch = libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    
+    init.argtypes = [ctypes.c_int]
+    init.restype = ctypes.c_int
+    add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    add_watch.restype = ctypes.c_int
+    rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    rm_watch.restype = ctypes.c_int
+    _libc = libc
+    return _libc
@@ -0,0 +1,30 @@
+"""
+Watch mode option types and defaults for Airulefy.
+
+This module must only import the standard library: the command line
+declares its options with these values before it knows which command runs.
+"""
+
+from enum import Enum
+
+# Seconds without further events before a burst of changes is processed
+DEFAULT_QUIET_PERIOD = 0.3
+
+# Maximum seconds between the first event of a burst and its processing,
+# so a continuous stream of events cannot postpone regeneration forever
+DEFAULT_MAX_LATENCY = 2.0
+
+# Seconds between rewrites of the metrics file
+DEFAULT_METRICS_INTERVAL = 15.0
+
+
+class WatchBackend(str, Enum):
+    """Source of file system events in watch mode."""
+    
+    NATIVE = "native"
+    POLLING = "polling"
+    AUTO = "auto"
+
+
+# Native events, switching to polling when they are not delivered
+DEFAULT_WATCH_BACKEND = WatchBackend.AUTO
@@ -0,0 +1,423 @@
+"""
+Polling file system observers for Airulefy.
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileSystemEvent,
+    FileSystemEventHandler,
+)
+from watchdog.observers.api import ObservedWatch
+
+from .config import CONFIG_FILE
+from .fsutils import IGNORE_FILE, IgnoreRules, load_ignore_rules
+from .observers import SharedObserver, WatchdogObserver
+from .options import WatchBackend
+
+# Seconds between polls right after a change was detected
+DEFAULT_MIN_POLL_INTERVAL = 0.25
+
+# Seconds between polls once the watched files have been idle for a while.
+# The interval doubles after every poll without changes up to this limit.
+DEFAULT_MAX_POLL_INTERVAL = 4.0
+
+# Seconds to wait for the native backend to report a change seen by polling
+# before considering it dead
+DEFAULT_NATIVE_GRACE = 1.0
+
+# Snapshot entries: modification time and size of files, None for directories
+Snapshot = Dict[str, Optional[Tuple[int, int]]]
+
+
+class PolledDirectory:
+    """
+    Find changes by comparing snapshots of the rule files below a directory.
+    
+    Only directories and the files that can affect the rules are recorded:
+    Markdown files, ignore files and configuration files. Other files are
+    never stat'ed and directories excluded by the ignore rules are not
+    entered, nor are symlinked directories unless asked to. Moves are
+    reported as a deletion and a creation.
+    """
+    
+    def __init__(self, path: str, recursive: bool, follow_symlinks: bool = False):
+        """
+        Initialize the directory, recording its current state.
+        
+        Args:
+            path: Directory to poll
+            recursive: Whether to poll the directories below it too
+            follow_symlinks: Whether to poll symlinked directories below it
+        """
+        self.path = path
+        self.recursive = recursive
+        self.follow_symlinks = follow_symlinks
+        # Ignore rules of the directory and the state of the file they came from
+        self._rules: Optional[IgnoreRules] = None
+        self._rules_state: Optional[Tuple[int, int]] = None
+        self.snapshot: Snapshot = self.take_snapshot()
+    
+    def poll(self) -> List[FileSystemEvent]:
+        """
+        Take a new snapshot and compare it with the previous one.
+        
+        Returns:
+            The events turning the previous snapshot into the new one
+        """
+        snapshot = self.take_snapshot()
+        events = _diff_snapshots(self.snapshot, snapshot)
+        self.snapshot = snapshot
+        return events
+    
+    def take_snapshot(self) -> Snapshot:
+        """
+        Record the state of the rule files below the directory.
+        
+        Returns:
+            Snapshot mapping paths to their modification time and size, or
+            to None for directories. A missing directory has an empty snapshot.
+        """
+        root = self.path
+        snapshot: Snapshot = {}
+        try:
+            root_stat = os.stat(root)
+            ancestors = {(root_stat.st_dev, root_stat.st_ino)}
+            self._scan(root, "", self._load_rules(root), snapshot, ancestors)
+        except OSError:
+            return {}
+        return snapshot
+    
+    def _scan(
+        self,
+        directory: str,
+        prefix: str,
+        rules: IgnoreRules,
+        snapshot: Snapshot,
+        ancestors: set,
+    ) -> None:
+        """Add the entries of a directory to a snapshot, descending if recursive."""
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relative_path = prefix + entry.name
+                try:
+                    is_dir = entry.is_dir()
+                    if is_dir and not self.follow_symlinks and entry.is_symlink():
+                        continue
+                except OSError:
+                    continue
+                
+                if is_dir:
+                    if rules.is_ignored(relative_path, True):
+                        continue
+                    snapshot[entry.path] = None
+                    if not self.recursive:
+                        continue
+                    
+                    try:
+                        entry_stat = entry.stat()
+                        key = (entry_stat.st_dev, entry_stat.st_ino)
+                        # Directory symlink cycle
+                        if key in ancestors:
+                            continue
+                        self._scan(
+                            entry.path, relative_path + "/", rules, snapshot, ancestors | {key}
+                        )
+                    except OSError:
+                        continue
+                elif _is_rule_file(entry.name) and not rules.is_ignored(relative_path, False):
+                    try:
+                        entry_stat = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.path] = (entry_stat.st_mtime_ns, entry_stat.st_size)
+    
+    def _load_rules(self, root: str) -> IgnoreRules:
+        """Get the ignore rules of the directory, reloading them when the file changes."""
+        try:
+            ignore_stat = os.stat(os.path.join(root, IGNORE_FILE))
+            state = (ignore_stat.st_mtime_ns, ignore_stat.st_size)
+        except OSError:
+            state = None
+        
+        if self._rules is None or state != self._rules_state:
+            self._rules = load_ignore_rules(root)
+            self._rules_state = state
+        return self._rules
+
+
+class AdaptivePollingObserver(SharedObserver):
+    """
+    Observer polling snapshots of the rule files, for file systems without native events.
+    
+    Useful in containers and on network file systems, where changes made
+    by the host or another machine are not reported by inotify and similar
+    APIs. All watches are polled by one thread, see PolledDirectory.
+    
+    The watches are polled again min_interval seconds after a change was
+    detected; every poll without changes doubles the interval, up to
+    max_interval.
+    """
+    
+    def __init__(
+        self,
+        min_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+        max_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+    ):
+        """
+        Initialize the observer.
+        
+        Args:
+            min_interval: Seconds between polls after a change
+            max_interval: Maximum seconds between polls while idle
+        """
+        super().__init__("airulefy-poll")
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.interval = self.min_interval
+        self._directories: Dict[ObservedWatch, PolledDirectory] = {}
+    
+    def poll(self) -> bool:
+        """
+        Poll every watch once, passing the changes to the handlers.
+        
+        Returns:
+            bool: True if any change was found
+        """
+        with self._lock:
+            directories = list(self._directories.items())
+        
+        changed = False
+        for watch, directory in directories:
+            events = directory.poll()
+            if not events:
+                continue
+            changed = True
+            with self._lock:
+                handlers = self._handlers_of([watch])
+            for event in events:
+                self._dispatch(event, handlers)
+        
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        return changed
+    
+    def _add_watch(self, watch: ObservedWatch, follow_symlinks: bool) -> None:
+        self._directories[watch] = PolledDirectory(watch.path, watch.is_recursive, follow_symlinks)
+    
+    def _remove_watch(self, watch: ObservedWatch) -> None:
+        del self._directories[watch]
+    
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.poll()
+
+
+class AutoObserver:
+    """
+    Use native file system events, switching to polling if they never arrive.
+    
+    Until the native observer has delivered its first event, every watch
+    is also polled. A change seen by polling that the native observer does
+    not report within the grace period means native events are not
+    delivered, as for bind mounts in containers or network file systems:
+    the native observer is then stopped and polling takes over, starting
+    with the changes it already saw. Once the native observer delivers an
+    event, polling stops. The native observer failing to start also
+    switches to polling.
+    
+    Provides the schedule, unschedule, start, stop and join methods of a
+    watchdog observer.
+    """
+    
+    def __init__(
+        self,
+        native: Union[SharedObserver, WatchdogObserver],
+        polling: Optional[SharedObserver] = None,
+        grace: float = DEFAULT_NATIVE_GRACE,
+        on_fallback: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Initialize the observer.
+        
+        Args:
+            native: Observer using the platform's native events
+            polling: Observer to fall back to, by default an AdaptivePollingObserver
+            grace: Seconds to wait for the native observer to report a change
+                seen by polling
+            on_fallback: Function called when switching to polling
+        """
+        self.native = native
+        self.polling = polling if polling is not None else AdaptivePollingObserver()
+        self.grace = grace
+        self.on_fallback = on_fallback
+        # Backend in use once decided, None while both are running
+        self.backend: Optional[WatchBackend] = None
+        self._lock = threading.Lock()
+        # Events seen by polling while undecided, with their handlers
+        self._pending: List[Tuple[FileSystemEventHandler, FileSystemEvent]] = []
+        self._timer: Optional[threading.Timer] = None
+    
+    def schedule(
+        self,
+        event_handler: FileSystemEventHandler,
+        path: str,
+        *,
+        recursive: bool = False,
+        follow_symlinks: bool = False,
+    ) -> Tuple[Optional[ObservedWatch], Optional[ObservedWatch]]:
+        """
+        Watch a path with the observers in use, see SharedObserver.schedule.
+        
+        Returns:
+            The native and polling watches, None for an observer not in use
+        """
+        native_watch = None
+        if self.backend is not WatchBackend.POLLING:
+            try:
+                native_watch = self.native.schedule(
+                    _ObserverTap(self, event_handler, native=True),
+                    path,
+                    recursive=recursive,
+                    follow_symlinks=follow_symlinks,
+                )
+            except OSError:
+                # For example, the limit of inotify watches was reached. Once
+                # native events were seen, polling has already been stopped.
+                if self.backend is WatchBackend.NATIVE:
+                    raise
+                self._use_polling()
+        
+        polling_watch = None
+        if self.backend is not WatchBackend.NATIVE:
+            polling_watch = self.polling.schedule(
+                _ObserverTap(self, event_handler, native=False),
+                path,
+                recursive=recursive,
+                follow_symlinks=follow_symlinks,
+            )
+        return native_watch, polling_watch
+    
+    def unschedule(self, watch: Tuple[Optional[ObservedWatch], Optional[ObservedWatch]]) -> None:
+        """Stop watching a path scheduled with schedule()."""
+        for observer, observed_watch in zip((self.native, self.polling), watch):
+            if observed_watch is None:
+                continue
+            try:
+                observer.unschedule(observed_watch)
+            except KeyError:
+                pass  # The observer was stopped when it was switched off
+    
+    def start(self) -> None:
+        """Start both observers."""
+        try:
+            self.native.start()
+        except OSError:
+            self._use_polling()
+        self.polling.start()
+    
+    def stop(self) -> None:
+        """Stop both observers."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self.native.stop()
+        self.polling.stop()
+    
+    def join(self) -> None:
+        """Wait for the observers to stop."""
+        for observer in (self.native, self.polling):
+            if observer.is_alive():
+                observer.join()
+    
+    def dispatch(
+        self, event_handler: FileSystemEventHandler, event: FileSystemEvent, native: bool
+    ) -> None:
+        """Pass an event from one of the observers on if its backend is in use."""
+        with self._lock:
+            if not native:
+                if self.backend is None:
+                    self._pending.append((event_handler, event))
+                    if self._timer is None:
+                        self._timer = threading.Timer(self.grace, self._on_grace_expired)
+                        self._timer.daemon = True
+                        self._timer.start()
+                elif self.backend is WatchBackend.POLLING:
+                    event_handler.dispatch(event)
+                return
+            
+            decided = self.backend is None
+            if decided:
+                self.backend = WatchBackend.NATIVE
+                self._pending = []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            deliver = self.backend is WatchBackend.NATIVE
+        
+        # Stopped without holding the lock, since its dispatch thread may be waiting for it
+        if decided:
+            self.polling.stop()
+        if deliver:
+            event_handler.dispatch(event)
+    
+    def _on_grace_expired(self) -> None:
+        """Switch to polling if the native observer missed the changes seen by polling."""
+        with self._lock:
+            self._timer = None
+            if self.backend is not None:
+                return
+        self._use_polling()
+    
+    def _use_polling(self) -> None:
+        """Stop the native observer and pass on the events seen by polling."""
+        with self._lock:
+            if self.backend is WatchBackend.POLLING:
+                return
+            self.backend = WatchBackend.POLLING
+            for event_handler, event in self._pending:
+                event_handler.dispatch(event)
+            self._pending = []
+        if self.on_fallback is not None:
+            self.on_fallback()
+        self.native.stop()
+
+
+class _ObserverTap(FileSystemEventHandler):
+    """Event handler passing the events of one of an AutoObserver's observers to it."""
+    
+    def __init__(self, observer: AutoObserver, event_handler: FileSystemEventHandler, native: bool):
+        self.observer = observer
+        self.event_handler = event_handler
+        self.native = native
+    
+    def dispatch(self, event: FileSystemEvent) -> None:
+        self.observer.dispatch(self.event_handler, event, self.native)
+
+
+def _diff_snapshots(previous: Snapshot, current: Snapshot) -> List[FileSystemEvent]:
+    """Get the events turning one snapshot into another."""
+    events: List[FileSystemEvent] = []
+    for path in sorted(previous.keys() - current.keys()):
+        events.append(DirDeletedEvent(path) if previous[path] is None else FileDeletedEvent(path))
+    for path in sorted(current.keys() - previous.keys()):
+        events.append(DirCreatedEvent(path) if current[path] is None else FileCreatedEvent(path))
+    for path in sorted(current.keys() & previous.keys()):
+        if current[path] is not None and current[path] != previous[path]:
+            events.append(FileModifiedEvent(path))
+    return events
+
+
+def _is_rule_file(name: str) -> bool:
+    """Check whether a file name is one of the files watched for rule changes."""
+    return name.lower().endswith('.md') or name in (IGNORE_FILE, CONFIG_FILE)
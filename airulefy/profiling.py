@@ -0,0 +1,201 @@
+"""
+Per-phase profiling for Airulefy.
+"""
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import ContextManager, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field
+
+# Per-thread I/O counters of the running process, on Linux
+_THREAD_IO_PATH = "/proc/thread-self/io"
+
+
+class PhaseStats(BaseModel):
+    """Time and I/O spent in one phase, for one tool or for the whole project."""
+    
+    phase: str = Field(description="Name of the phase")
+    tool: Optional[str] = Field(default=None, description="Tool the phase ran for, if any")
+    calls: int = Field(default=0, description="Number of times the phase ran")
+    wall_time: float = Field(default=0.0, description="Elapsed seconds")
+    cpu_time: float = Field(default=0.0, description="CPU seconds of the thread running the phase")
+    bytes_read: Optional[int] = Field(
+        default=None, description="Bytes read by system calls (None if unknown on this platform)"
+    )
+    bytes_written: Optional[int] = Field(
+        default=None, description="Bytes written by system calls (None if unknown on this platform)"
+    )
+
+
+class ProfileReport(BaseModel):
+    """Profile of a run, split into phases."""
+    
+    wall_time: float = Field(description="Elapsed seconds since profiling started")
+    cpu_time: float = Field(description="CPU seconds of the process since profiling started")
+    phases: List[PhaseStats] = Field(
+        default_factory=list, description="Phases, in the order they first ran"
+    )
+
+
+class Profiler:
+    """
+    Record wall time, CPU time and I/O per phase of a run.
+    
+    Phases are identified by a name and optionally a tool, and repeated runs
+    of a phase are added up. Phases may run concurrently in several threads.
+    CPU time and I/O are measured for the thread running the phase, I/O only
+    where the platform reports it per thread.
+    
+    Example:
+        profiler = Profiler()
+        builder = RuleBuilder(project_root, config, profiler=profiler)
+        builder.build(builder.find_input_files())
+        print(profiler.report().model_dump_json(indent=2))
+    """
+    
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._phases: Dict[Tuple[str, Optional[str]], PhaseStats] = {}
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+    
+    @contextmanager
+    def phase(self, name: str, tool: Optional[str] = None) -> Iterator[None]:
+        """
+        Measure a block of code as a phase.
+        
+        Args:
+            name: Name of the phase
+            tool: Tool the phase runs for, if any
+        """
+        io_started = _read_thread_io(count_own_read=True)
+        cpu_started = time.thread_time()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - started
+            cpu_time = time.thread_time() - cpu_started
+            io_ended = _read_thread_io()
+            
+            with self._lock:
+                stats = self._phases.get((name, tool))
+                if stats is None:
+                    stats = self._phases[(name, tool)] = PhaseStats(phase=name, tool=tool)
+                stats.calls += 1
+                stats.wall_time += wall_time
+                stats.cpu_time += cpu_time
+                if io_started is not None and io_ended is not None:
+                    stats.bytes_read = (stats.bytes_read or 0) + io_ended[0] - io_started[0]
+                    stats.bytes_written = (stats.bytes_written or 0) + io_ended[1] - io_started[1]
+    
+    def report(self) -> ProfileReport:
+        """
+        Get the phases recorded so far.
+        
+        Returns:
+            ProfileReport: Totals since the profiler was created and the phases
+        """
+        with self._lock:
+            phases = [stats.model_copy() for stats in self._phases.values()]
+        
+        return ProfileReport(
+            wall_time=time.perf_counter() - self._started,
+            cpu_time=time.process_time() - self._cpu_started,
+            phases=phases,
+        )
+
+
+def profile_phase(
+    profiler: Optional[Profiler], name: str, tool: Optional[str] = None
+) -> ContextManager[None]:
+    """
+    Measure a block of code as a phase if a profiler is given.
+    
+    Args:
+        profiler: Profiler to record the phase in, or None to do nothing
+        name: Name of the phase
+        tool: Tool the phase runs for, if any
+    
+    Returns:
+        Context manager measuring the block
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name, tool)
+
+
+@contextmanager
+def profiling(
+    report_path: Optional[Union[str, Path]] = None,
+    stats_path: Optional[Union[str, Path]] = None,
+) -> Iterator[Optional[Profiler]]:
+    """
+    Profile a block of code, saving the results when it ends.
+    
+    Args:
+        report_path: File to write the phase report to as JSON (None for no report)
+        stats_path: File to write a cProfile dump of the calling thread to,
+            readable with pstats (None for no dump)
+    
+    Yields:
+        The profiler to record phases in, or None without a report path
+    """
+    profiler = Profiler() if report_path is not None else None
+    stats = None
+    if stats_path is not None:
+        import cProfile
+        
+        stats = cProfile.Profile()
+    
+    if stats is not None:
+        stats.enable()
+    try:
+        yield profiler
+    finally:
+        if stats is not None:
+            stats.disable()
+            try:
+                stats.dump_stats(str(stats_path))
+            except OSError as e:
+                print(f"Error writing profile to {stats_path}: {e}")
+        if profiler is not None and report_path is not None:
+            try:
+                Path(report_path).write_text(
+                    profiler.report().model_dump_json(indent=2) + "\n", encoding="utf-8"
+                )
+            except OSError as e:
+                print(f"Error writing profile to {report_path}: {e}")
+
+
+def _read_thread_io(count_own_read: bool = False) -> Optional[Tuple[int, int]]:
+    """
+    Get the bytes read and written by system calls of the current thread.
+    
+    Args:
+        count_own_read: Whether to include the bytes this call reads from the
+            counters, which are reported as they were before it
+    
+    Returns:
+        Tuple of the bytes read and written, or None if the platform does not
+        report them
+    """
+    try:
+        with open(_THREAD_IO_PATH, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    
+    counters = dict(line.split(b": ", 1) for line in data.splitlines() if b": " in line)
+    try:
+        bytes_read = int(counters[b"rchar"])
+        bytes_written = int(counters[b"wchar"])
+    except (KeyError, ValueError):
+        return None
+    
+    if count_own_read:
+        bytes_read += len(data)
+    return bytes_read, bytes_written
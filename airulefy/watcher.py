@@ -2,27 +2,253 @@
 File watcher for Airulefy.
 """
 
+import os
+import signal
+import stat
+import threading
 import time
 from pathlib import Path
-from typing import Callable
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple, Union
 
-from watchdog.events import FileSystemEvent, FileSystemEventHandler
-from watchdog.observers import Observer
+from pydantic import BaseModel, Field
+from watchdog.events import (
+    EVENT_TYPE_CREATED,
+    EVENT_TYPE_DELETED,
+    EVENT_TYPE_MODIFIED,
+    EVENT_TYPE_MOVED,
+    EVENT_TYPE_OPENED,
+    FileSystemEvent,
+    FileSystemEventHandler,
+    FileSystemMovedEvent,
+)
+
+from .build import RuleBuilder, ToolResult
+from .config import CONFIG_FILE, SyncMode, load_config
+from .fsutils import IGNORE_FILE
+from .manifest import OutputFileRecord, hash_file
+from .metrics import WatchMetrics
+from .observers import InotifyObserver, WatchdogObserver
+from .options import (
+    DEFAULT_MAX_LATENCY,
+    DEFAULT_QUIET_PERIOD,
+    DEFAULT_WATCH_BACKEND,
+    WatchBackend,
+)
+from .poller import AdaptivePollingObserver, AutoObserver
+
+if TYPE_CHECKING:
+    from .async_watcher import AsyncRegenerationWorker
+
+# Number of distinct pending paths, and of events within one second, beyond
+# which a burst is treated as an event storm, like a branch checkout or a
+# dependency install. The per-path events are then dropped and the input
+# directory is rescanned once instead.
+DEFAULT_STORM_PATHS = 1000
+DEFAULT_STORM_RATE = 2000
+
+# Types of events for files being opened or read, which change nothing.
+# Closing a file without writing is only reported by watchdog 5 and later,
+# so its type is not imported from watchdog.
+ACCESS_EVENT_TYPES = frozenset((EVENT_TYPE_OPENED, "closed_no_write"))
+
+
+class ChangeSet(BaseModel):
+    """Paths changed by a burst of file system events."""
+    
+    created: Set[Path] = Field(default_factory=set, description="Paths that were created")
+    modified: Set[Path] = Field(default_factory=set, description="Paths that were modified")
+    deleted: Set[Path] = Field(default_factory=set, description="Paths that were deleted")
+    moved: Dict[Path, Path] = Field(
+        default_factory=dict, description="Destination paths keyed by source path"
+    )
+    rescan: bool = Field(
+        default=False,
+        description="Whether too many events arrived to track paths, requiring a full rescan",
+    )
+    event_count: int = Field(default=0, description="Number of file system events covered")
+    first_event: Optional[float] = Field(
+        default=None, description="Monotonic time of the earliest event covered"
+    )
+    
+    @property
+    def paths(self) -> Set[Path]:
+        """All paths touched by the changes, including both ends of moves."""
+        return (
+            self.created
+            | self.modified
+            | self.deleted
+            | set(self.moved)
+            | set(self.moved.values())
+        )
+    
+    @property
+    def change_count(self) -> int:
+        """Number of recorded changes, counting each move once."""
+        return len(self.created) + len(self.modified) + len(self.deleted) + len(self.moved)
+    
+    def __bool__(self) -> bool:
+        return bool(self.rescan or self.created or self.modified or self.deleted or self.moved)
+    
+    def mark_rescan(self) -> None:
+        """Drop the recorded paths, requiring a full rescan instead."""
+        self.created.clear()
+        self.modified.clear()
+        self.deleted.clear()
+        self.moved.clear()
+        self.rescan = True
+    
+    def update(self, other: "ChangeSet") -> None:
+        """
+        Merge later changes into this change set.
+        
+        Args:
+            other: Changes that happened after the ones recorded here
+        """
+        self.event_count += other.event_count
+        if other.first_event is not None and (
+            self.first_event is None or other.first_event < self.first_event
+        ):
+            self.first_event = other.first_event
+        
+        if self.rescan or other.rescan:
+            self.mark_rescan()
+            return
+        
+        for source, dest in other.moved.items():
+            self._add_moved(source, dest)
+        for path in other.deleted:
+            self._add_deleted(path)
+        for path in other.created:
+            self._add_created(path)
+        for path in other.modified:
+            self.add(EVENT_TYPE_MODIFIED, path)
+    
+    def add(self, event_type: str, src_path: Path, dest_path: Optional[Path] = None) -> None:
+        """
+        Record a file system event, merging it with earlier changes.
+        
+        Args:
+            event_type: Watchdog event type
+            src_path: Path the event refers to
+            dest_path: Destination path of a move
+        """
+        if self.rescan:
+            return
+        
+        if event_type == EVENT_TYPE_MOVED and dest_path is not None:
+            self._add_moved(src_path, dest_path)
+        elif event_type == EVENT_TYPE_CREATED:
+            self._add_created(src_path)
+        elif event_type == EVENT_TYPE_DELETED:
+            self._add_deleted(src_path)
+        elif src_path not in self.created and src_path not in self.moved.values():
+            self.modified.add(src_path)
+    
+    def _add_created(self, path: Path) -> None:
+        if path in self.deleted:
+            # Replaced, e.g. by an editor's atomic save
+            self.deleted.discard(path)
+            self.modified.add(path)
+        else:
+            self.created.add(path)
+    
+    def _add_deleted(self, path: Path) -> None:
+        self.modified.discard(path)
+        if path in self.created:
+            self.created.discard(path)
+            return
+        
+        for source, dest in list(self.moved.items()):
+            if dest == path:
+                # Moved and then deleted: only the source is gone
+                del self.moved[source]
+                self.deleted.add(source)
+                return
+        
+        self.deleted.add(path)
+    
+    def _add_moved(self, src_path: Path, dest_path: Path) -> None:
+        modified = src_path in self.modified
+        self.modified.discard(src_path)
+        
+        if src_path in self.created:
+            self.created.discard(src_path)
+            self._add_created(dest_path)
+            return
+        
+        # Follow a chain of moves back to the original source
+        source = next((s for s, d in self.moved.items() if d == src_path), src_path)
+        self.moved.pop(source, None)
+        if source == dest_path:
+            self.modified.discard(dest_path)
+            if modified:
+                self.modified.add(dest_path)
+            return
+        
+        self.moved[source] = dest_path
+        if modified:
+            self.modified.add(dest_path)
 
 
 class RuleChangeHandler(FileSystemEventHandler):
-    """Handle file system events for AI rule files."""
+    """
+    Handle file system events for AI rule files.
+    
+    Events are coalesced: the callback runs once, after no event has arrived
+    for quiet_period seconds, or at the latest max_latency seconds after the
+    first event of a burst. Since the callback always runs after the last
+    event it covers, the final change of a burst is never lost. It receives
+    a ChangeSet of the Markdown files, directories, ignore files and
+    configuration files that were touched.
     
-    def __init__(self, callback: Callable[[], None]):
+    When a burst touches more than storm_paths paths, or more than
+    storm_rate events arrive within a second, tracking individual paths
+    costs more than it saves. The pending paths are then dropped and the
+    callback receives a change set with rescan set instead.
+    """
+    
+    def __init__(
+        self,
+        callback: Callable[[ChangeSet], None],
+        quiet_period: float = DEFAULT_QUIET_PERIOD,
+        max_latency: float = DEFAULT_MAX_LATENCY,
+        storm_paths: int = DEFAULT_STORM_PATHS,
+        storm_rate: int = DEFAULT_STORM_RATE,
+    ):
         """
         Initialize the handler.
         
         Args:
-            callback: Function to call when a change is detected
+            callback: Function to call with the changes when they are detected
+            quiet_period: Seconds without events to wait before calling back
+            max_latency: Maximum seconds to delay the callback during a burst
+            storm_paths: Maximum number of distinct paths tracked per burst
+            storm_rate: Maximum number of events per second tracked per path
         """
         self.callback = callback
-        self.last_triggered = 0
-        self.cooldown = 1.0  # Cooldown in seconds to avoid multiple rapid triggers
+        self.quiet_period = quiet_period
+        self.max_latency = max(max_latency, quiet_period)
+        self.storm_paths = storm_paths
+        self.storm_rate = storm_rate
+        # Number of bursts that fell back to a full rescan
+        self.storms = 0
+        self._lock = threading.Lock()
+        # Serializes callbacks started by timers and flush()
+        self._callback_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._changes = ChangeSet()
+        # Monotonic times of the first and last event of the pending burst
+        self._first_event: Optional[float] = None
+        self._last_event: Optional[float] = None
+        # Start and number of events of the current one-second rate window
+        self._window_start = 0.0
+        self._window_events = 0
+    
+    @property
+    def pending(self) -> bool:
+        """Whether changes are waiting for the callback."""
+        with self._lock:
+            return self._first_event is not None
     
     def on_any_event(self, event: FileSystemEvent) -> None:
         """
@@ -31,13 +257,123 @@ class RuleChangeHandler(FileSystemEventHandler):
         Args:
             event: File system event
         """
-        # Only trigger on markdown files
-        if not event.is_directory and self._is_markdown_file(event.src_path):
-            current_time = time.time()
-            # Check if it's been long enough since the last trigger
-            if current_time - self.last_triggered > self.cooldown:
-                self.last_triggered = current_time
-                self.callback()
+        # Opening and reading files changes nothing
+        if event.event_type in ACCESS_EVENT_TYPES:
+            return
+        
+        dest_path = event.dest_path if isinstance(event, FileSystemMovedEvent) else None
+        if event.is_directory:
+            # Directory modifications only mean that their entries changed,
+            # which is reported separately
+            if event.event_type not in (EVENT_TYPE_CREATED, EVENT_TYPE_DELETED, EVENT_TYPE_MOVED):
+                return
+        elif not (
+            self._is_relevant_file(event.src_path)
+            or (dest_path is not None and self._is_relevant_file(dest_path))
+        ):
+            return
+        
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_events = 0
+            self._window_events += 1
+            self._changes.event_count += 1
+            
+            if not self._changes.rescan:
+                self._changes.add(
+                    event.event_type,
+                    Path(os.fsdecode(event.src_path)),
+                    Path(os.fsdecode(dest_path)) if dest_path is not None else None,
+                )
+                if (
+                    self._window_events > self.storm_rate
+                    or self._changes.change_count > self.storm_paths
+                ):
+                    self._changes.mark_rescan()
+                    self.storms += 1
+            self._last_event = now
+            # The timer of a pending burst re-arms itself until it is quiet
+            if self._first_event is None:
+                self._first_event = now
+                self._schedule(self.quiet_period)
+    
+    def flush(self) -> bool:
+        """
+        Run the callback now if changes are pending.
+        
+        Returns:
+            bool: True if the callback was run
+        """
+        with self._lock:
+            changes = self._take_pending()
+        if changes is None:
+            return False
+        
+        self._run_callback(changes)
+        return True
+    
+    def cancel(self) -> None:
+        """Discard pending changes without running the callback."""
+        with self._lock:
+            self._take_pending()
+    
+    def _schedule(self, delay: float) -> None:
+        """Start a timer checking the pending burst after a delay."""
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _take_pending(self) -> Optional[ChangeSet]:
+        """Clear and return the pending changes. Must be called with the lock held."""
+        if self._first_event is None:
+            return None
+        
+        if self._timer is not None and self._timer is not threading.current_thread():
+            self._timer.cancel()
+        self._timer = None
+        changes, self._changes = self._changes, ChangeSet()
+        changes.first_event = self._first_event
+        self._first_event = None
+        self._last_event = None
+        return changes
+    
+    def _on_timer(self) -> None:
+        """Run the callback once the pending burst is quiet or overdue."""
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                return  # Flushed or cancelled in the meantime
+            if self._first_event is None or self._last_event is None:
+                return
+            
+            due = min(
+                self._last_event + self.quiet_period,
+                self._first_event + self.max_latency,
+            )
+            now = time.monotonic()
+            if now < due:
+                self._schedule(due - now)
+                return
+            
+            changes = self._take_pending()
+        
+        if changes is not None:
+            self._run_callback(changes)
+    
+    def _run_callback(self, changes: ChangeSet) -> None:
+        """Call the callback, never running two callbacks at once."""
+        # Changes that cancelled out, like a file created and deleted again
+        if not changes:
+            return
+        
+        with self._callback_lock:
+            self.callback(changes)
+    
+    def _is_relevant_file(self, path: Union[str, bytes]) -> bool:
+        """Check if a file event can affect the rules."""
+        path = os.fsdecode(path)
+        return self._is_markdown_file(path) or os.path.basename(path) in (IGNORE_FILE, CONFIG_FILE)
     
     def _is_markdown_file(self, path: str) -> bool:
         """
@@ -52,25 +388,633 @@ class RuleChangeHandler(FileSystemEventHandler):
         return path.lower().endswith('.md')
 
 
-def watch_directory(directory: Path, callback: Callable[[], None]) -> None:
+class RegenerationWorker:
+    """
+    Run regenerations one at a time on a dedicated thread.
+    
+    Submitting changes never blocks. Each callback has at most one queued
+    change set: while a regeneration is running, further submissions for
+    the same callback are merged into it, and it is processed as soon as
+    the running regeneration finishes. Several projects can share one
+    worker by submitting with their own callbacks.
+    """
+    
+    def __init__(self, callback: Optional[Callable[[ChangeSet], None]] = None):
+        """
+        Initialize the worker.
+        
+        Args:
+            callback: Function regenerating the rules for a change set, used
+                for submissions without their own callback
+        """
+        self.callback = callback
+        self._condition = threading.Condition()
+        # Queued change sets keyed by callback, in submission order
+        self._queued: Dict[Callable[[ChangeSet], None], ChangeSet] = {}
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="airulefy-regenerate", daemon=True)
+    
+    def start(self) -> None:
+        """Start the worker thread."""
+        self._thread.start()
+    
+    def submit(
+        self,
+        changes: ChangeSet,
+        callback: Optional[Callable[[ChangeSet], None]] = None,
+    ) -> None:
+        """
+        Queue changes for regeneration.
+        
+        Args:
+            changes: Changes to process
+            callback: Function to process them with (default: the worker's callback)
+        
+        Raises:
+            ValueError: If neither a callback nor the worker's callback is given
+        """
+        callback = callback or self.callback
+        if callback is None:
+            raise ValueError("No callback to process the changes with")
+        with self._condition:
+            if self._stopped:
+                return
+            if callback in self._queued:
+                self._queued[callback].update(changes)
+                return
+            
+            self._queued[callback] = changes.model_copy(deep=True)
+            self._condition.notify()
+    
+    def stop(self) -> None:
+        """Process the queued changes, then stop the worker thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        
+        if self._thread.is_alive():
+            self._thread.join()
+    
+    def _run(self) -> None:
+        """Process queued change sets until stopped."""
+        while True:
+            with self._condition:
+                while not self._queued and not self._stopped:
+                    self._condition.wait()
+                if not self._queued:
+                    return
+                
+                # Later submissions for this callback start a new change set
+                callback = next(iter(self._queued))
+                changes = self._queued.pop(callback)
+            
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"Error regenerating rules: {e}")
+
+
+def watch_directory(
+    directory: Path,
+    callback: Callable[[ChangeSet], None],
+    quiet_period: float = DEFAULT_QUIET_PERIOD,
+    max_latency: float = DEFAULT_MAX_LATENCY,
+    stop_event: Optional[threading.Event] = None,
+    backend: WatchBackend = DEFAULT_WATCH_BACKEND,
+    on_fallback: Optional[Callable[[], None]] = None,
+) -> None:
     """
     Watch a directory for changes to Markdown files.
     
+    The callback runs on a dedicated worker thread, so slow regenerations
+    never hold up the observer. This function blocks until stop_event is
+    set, or until interrupted with Ctrl+C or SIGTERM.
+    
     Args:
         directory: Directory to watch
-        callback: Function to call when changes are detected
+        callback: Function to call with the changes when they are detected
+        quiet_period: Seconds without events to wait before calling back
+        max_latency: Maximum seconds to delay the callback during a burst
+        stop_event: Event to set to stop watching
+        backend: Source of file system events
+            on_fallback: Function called when the auto backend switches to polling
     """
-    observer = Observer()
-    handler = RuleChangeHandler(callback)
+    if stop_event is None:
+        stop_event = threading.Event()
+    
+    worker = RegenerationWorker(callback)
+    observer = create_observer(backend, on_fallback)
+    handler = RuleChangeHandler(worker.submit, quiet_period, max_latency)
     
     # Start watching
+    worker.start()
     observer.schedule(handler, str(directory), recursive=True)
     observer.start()
     
     try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
+        wait_for_stop(stop_event)
+    finally:
         observer.stop()
     
     observer.join()
+    
+    # Process changes still waiting for their quiet period
+    handler.flush()
+    worker.stop()
+
+
+def create_observer(
+    backend: WatchBackend = DEFAULT_WATCH_BACKEND,
+    on_fallback: Optional[Callable[[], None]] = None,
+) -> Union[AdaptivePollingObserver, InotifyObserver, WatchdogObserver, AutoObserver]:
+    """
+    Create the observer delivering file system events for a backend.
+    
+    Args:
+        backend: Native events, polling, or native events with a fallback
+            to polling when they are not delivered
+        on_fallback: Function called when the auto backend switches to polling
+    
+    Returns:
+        An observer providing schedule, unschedule, start, stop and join
+    """
+    if backend == WatchBackend.POLLING:
+        return AdaptivePollingObserver()
+    if backend == WatchBackend.NATIVE:
+        return create_native_observer()
+    return AutoObserver(create_native_observer(), on_fallback=on_fallback)
+
+
+def create_native_observer() -> Union[InotifyObserver, WatchdogObserver]:
+    """
+    Create the observer delivering the platform's native file system events.
+    
+    On Linux, all watches share one inotify instance and one thread, so
+    the number of watched projects is not bounded by the limit of inotify
+    instances per user. Elsewhere, watchdog picks the platform's API.
+    
+    Returns:
+        An observer providing schedule, unschedule, start, stop and join
+    """
+    if InotifyObserver.is_supported():
+        return InotifyObserver()
+    return WatchdogObserver()
+
+
+def wait_for_stop(stop_event: threading.Event) -> None:
+    """
+    Block until an event is set, Ctrl+C is pressed or SIGTERM is received.
+    
+    Args:
+        stop_event: Event to wait for
+    """
+    previous_sigterm = None
+    if threading.current_thread() is threading.main_thread():
+        previous_sigterm = signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    
+    try:
+        stop_event.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if previous_sigterm is not None:
+            signal.signal(signal.SIGTERM, previous_sigterm)
+
+
+class WatchedProject:
+    """
+    A project whose rules are regenerated as its files change.
+    
+    The configuration and a RuleBuilder are kept between regenerations.
+    Changes to the configuration file are applied without a restart, only
+    regenerating the tools whose configuration changed. Events caused by
+    the project's own output files being written or removed are dropped,
+    so outputs inside a watched directory cannot trigger regeneration loops.
+    """
+    
+    def __init__(self, project_root: Path, force_mode: Optional[SyncMode] = None):
+        """
+        Initialize the project.
+        
+        Args:
+            project_root: Path to the project root
+            force_mode: Force a specific sync mode for all tools (overrides config)
+        """
+        self.project_root = project_root
+        self.config_path = project_root / CONFIG_FILE
+        self.config = load_config(project_root)
+        self.builder = RuleBuilder(project_root, self.config, force_mode)
+        # Number of changed paths dropped as caused by our own writes
+        self.suppressed_events = 0
+        # Number of event storms handled by rescanning the input directory
+        self.rescans = 0
+        # Output files as written and removed by the last regeneration
+        self._written: Dict[Path, OutputFileRecord] = {}
+        self._removed: Set[Path] = set()
+    
+    @property
+    def input_dir(self) -> Path:
+        """Directory containing the project's rule files."""
+        return self.builder.input_dir
+    
+    def regenerate(self, changes: Optional[ChangeSet] = None) -> Optional[List[ToolResult]]:
+        """
+        Regenerate the rules affected by changes.
+        
+        Args:
+            changes: Changes since the previous call, or None to regenerate
+                from a full scan of the input directory
+        
+        Returns:
+            List of results, an empty list if there are no input files, or
+            None if nothing needed regenerating
+        """
+        if changes is None:
+            return self._record_writes(self.builder.rebuild())
+        
+        if changes.rescan:
+            # The changed paths are unknown: check the configuration and
+            # compare all input files with the manifest
+            self.rescans += 1
+            self._reload_config()
+            return self._record_writes(self.builder.rebuild())
+        
+        changes = self._drop_own_writes(changes)
+        if not changes:
+            return None
+        
+        paths = changes.paths
+        tools: Set[str] = set()
+        if self.config_path in paths:
+            paths = paths - {self.config_path}
+            changed_tools = self._reload_config()
+            if changed_tools is None:
+                return self._record_writes(self.builder.rebuild())
+            tools = changed_tools
+        
+        results = self.builder.rebuild(paths) if paths else None
+        if results is None and tools:
+            results = self.builder.rebuild_tools(tools)
+        return self._record_writes(results)
+    
+    def _reload_config(self) -> Optional[Set[str]]:
+        """
+        Load the configuration file again and apply it to the builder.
+        
+        Returns:
+            Names of the tools whose configuration changed, or None if the
+            input files must be rediscovered
+        """
+        try:
+            config = load_config(self.project_root)
+        except Exception as e:
+            # Keep using the previous configuration until the file is fixed
+            print(f"Error loading {self.config_path}: {e}")
+            return set()
+        
+        self.config = config
+        return self.builder.reload_config(config)
+    
+    def is_own_write(self, path: Path) -> bool:
+        """
+        Check whether a path is in the state the last regeneration left it in.
+        
+        Args:
+            path: Path reported as changed
+        
+        Returns:
+            bool: True if the path is an output file with the content written
+            by the last regeneration, or an output file it removed
+        """
+        record = self._written.get(path)
+        if record is None:
+            return path in self._removed and not os.path.lexists(path)
+        
+        if record.matches(path):
+            return True
+        
+        # Rewritten with the same content, e.g. by a regeneration of another tool
+        try:
+            return record.sha256 is not None and hash_file(path) == record.sha256
+        except OSError:
+            return False
+    
+    def _drop_own_writes(self, changes: ChangeSet) -> ChangeSet:
+        """Remove the changes caused by our own writes from a change set."""
+        kept = ChangeSet(
+            created={p for p in changes.created if not self.is_own_write(p)},
+            modified={p for p in changes.modified if not self.is_own_write(p)},
+            deleted={p for p in changes.deleted if not self.is_own_write(p)},
+            moved={s: d for s, d in changes.moved.items() if not self.is_own_write(d)},
+        )
+        self.suppressed_events += len(changes.paths) - len(kept.paths)
+        return kept
+    
+    def _record_writes(self, results: Optional[List[ToolResult]]) -> Optional[List[ToolResult]]:
+        """Remember the output files of a regeneration to recognize their events."""
+        if results is not None:
+            written = self.builder.output_records()
+            self._removed = set(self._written) - set(written)
+            self._written = written
+        return results
+
+
+class _WatchedEntry:
+    """A project hosted by a RuleWatcher with its own event debouncing."""
+    
+    def __init__(self, watcher: "RuleWatcher", project: WatchedProject):
+        self.watcher = watcher
+        self.project = project
+        self.handler = RuleChangeHandler(
+            lambda changes: watcher.worker.submit(changes, self.regenerate),
+            watcher.quiet_period,
+            watcher.max_latency,
+        )
+        # Input directory currently watched, if it exists, its device and
+        # inode, and whether the watch enters symlinked directories
+        self.input_dir: Optional[Path] = None
+        self.input_dir_id: Optional[Tuple[int, int]] = None
+        self.follow_symlinks = False
+    
+    def regenerate(self, changes: ChangeSet) -> None:
+        """Regenerate the project for changes and report the results."""
+        started = time.monotonic()
+        suppressed = self.project.suppressed_events
+        # Re-arm the watch of a recreated input directory before scanning it,
+        # so changes made after the scan are seen. Its inode number may have
+        # been reused, so events for the directory itself also re-arm it, as
+        # does a storm, which may have hidden them.
+        input_dir = self.project.input_dir
+        rearm = (
+            changes.rescan or input_dir in changes.created or input_dir in changes.moved.values()
+        )
+        self.watcher._schedule_input_dir(self, rearm=rearm)
+        results = self.project.regenerate(changes)
+        self.watcher._schedule_input_dir(self)
+        
+        if self.watcher.metrics is not None:
+            self.watcher.metrics.record_regeneration(
+                self.project.project_root,
+                started - changes.first_event if changes.first_event is not None else None,
+                changes.event_count,
+                suppressed=self.project.suppressed_events - suppressed,
+                rescan=changes.rescan,
+                results=results,
+            )
+        if results is not None and self.watcher.on_results is not None:
+            self.watcher.on_results(self.project, results)
+
+
+class RuleWatcher(FileSystemEventHandler):
+    """
+    Watch the rule files and configuration files of projects and regenerate their rules.
+    
+    All projects share one observer and one regeneration worker thread;
+    on Linux, the observer also uses one inotify instance for all of them.
+    Each project's root is watched for its configuration file and its input
+    directory is watched recursively; events are routed to the projects
+    owning the paths. The observer follows an input directory when the
+    configuration moves it.
+    """
+    
+    def __init__(
+        self,
+        on_results: Optional[Callable[[WatchedProject, List[ToolResult]], None]] = None,
+        quiet_period: float = DEFAULT_QUIET_PERIOD,
+        max_latency: float = DEFAULT_MAX_LATENCY,
+        backend: WatchBackend = DEFAULT_WATCH_BACKEND,
+        metrics: Optional[WatchMetrics] = None,
+        worker: Optional[Union[RegenerationWorker, "AsyncRegenerationWorker"]] = None,
+        on_fallback: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Initialize the watcher.
+        
+        Args:
+            on_results: Function called with the results of each regeneration
+            quiet_period: Seconds without events to wait before regenerating
+            max_latency: Maximum seconds to delay regeneration during a burst
+            backend: Source of file system events
+            metrics: Metrics to record latencies, durations and event counts in
+            worker: Worker running the regenerations, providing the start,
+                submit and stop methods of RegenerationWorker (default: a
+                new RegenerationWorker)
+            on_fallback: Function called when the auto backend switches to polling
+        """
+        self.on_results = on_results
+        self.metrics = metrics
+        self.quiet_period = quiet_period
+        self.max_latency = max_latency
+        self.observer = create_observer(backend, on_fallback)
+        self.worker = worker if worker is not None else RegenerationWorker()
+        self._lock = threading.Lock()
+        self._entries: List[_WatchedEntry] = []
+        # Guards the watches separately, since the observer may hold its own
+        # lock while passing an event to on_any_event, which takes _lock
+        self._watch_lock = threading.Lock()
+        # Scheduled watches keyed by path and recursiveness, with a use count
+        self._watches: Dict[Tuple[Path, bool], list] = {}
+    
+    @property
+    def projects(self) -> List[WatchedProject]:
+        """Projects being watched."""
+        return [entry.project for entry in self._entries]
+    
+    def add_project(self, project: WatchedProject) -> None:
+        """
+        Start watching a project.
+        
+        Args:
+            project: Project to watch
+        """
+        entry = _WatchedEntry(self, project)
+        with self._lock:
+            self._entries.append(entry)
+        # The configuration file lives in the project root
+        self._acquire_watch(project.project_root, recursive=False)
+        self._schedule_input_dir(entry)
+    
+    def start(self) -> None:
+        """Start watching."""
+        self.worker.start()
+        self.observer.start()
+    
+    def stop(self) -> None:
+        """Stop watching, after processing pending changes."""
+        self.observer.stop()
+        self.observer.join()
+        for entry in self._entries:
+            entry.handler.flush()
+        self.worker.stop()
+    
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Watch until stop_event is set, Ctrl+C is pressed or SIGTERM is received.
+        
+        Args:
+            stop_event: Event to set to stop watching
+        """
+        self.start()
+        try:
+            wait_for_stop(stop_event or threading.Event())
+        finally:
+            self.stop()
+    
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        """
+        Route a file system event to the projects owning its paths.
+        
+        Args:
+            event: File system event
+        """
+        paths = [Path(os.fsdecode(event.src_path))]
+        if isinstance(event, FileSystemMovedEvent):
+            paths.append(Path(os.fsdecode(event.dest_path)))
+        
+        with self._lock:
+            entries = list(self._entries)
+        
+        for entry in entries:
+            project = entry.project
+            if any(
+                path.parent == project.project_root
+                or path == project.input_dir
+                or project.input_dir in path.parents
+                for path in paths
+            ):
+                entry.handler.on_any_event(event)
+    
+    def _schedule_input_dir(self, entry: _WatchedEntry, rearm: bool = False) -> None:
+        """
+        Watch a project's current input directory, replacing a previous watch.
+        
+        The watch is also replaced when the directory was deleted and created
+        again, for example by a branch switch, since native watches of the
+        deleted directory no longer report anything, and when the project's
+        follow_symlinks setting changed. Its creation is seen by
+        the project root watch and leads here through the regeneration. The
+        watch of a deleted directory is kept until then, since polling
+        watches see the directory come back by themselves.
+        
+        Args:
+            entry: Project entry
+            rearm: Whether to replace the watch even if the directory's path
+                and inode are unchanged
+        """
+        input_dir = entry.project.input_dir
+        follow_symlinks = entry.project.config.follow_symlinks
+        rearm = rearm or follow_symlinks != entry.follow_symlinks
+        input_dir_id = None
+        try:
+            input_stat = os.stat(input_dir)
+            if stat.S_ISDIR(input_stat.st_mode):
+                input_dir_id = (input_stat.st_dev, input_stat.st_ino)
+        except OSError:
+            pass
+        if input_dir == entry.input_dir and (
+            input_dir_id is None or (input_dir_id == entry.input_dir_id and not rearm)
+        ):
+            return
+        
+        if entry.input_dir is not None:
+            self._release_watch(entry.input_dir, recursive=True)
+            entry.input_dir = None
+            entry.input_dir_id = None
+        
+        # A missing input directory is picked up once it is created
+        if input_dir_id is not None:
+            self._acquire_watch(input_dir, recursive=True, follow_symlinks=follow_symlinks)
+            entry.input_dir = input_dir
+            entry.input_dir_id = input_dir_id
+            entry.follow_symlinks = follow_symlinks
+    
+    def _acquire_watch(self, path: Path, recursive: bool, follow_symlinks: bool = False) -> None:
+        """
+        Schedule a watch, sharing it with other projects watching the same path.
+        
+        Args:
+            path: Directory to watch
+            recursive: Whether to watch the directories below it too
+            follow_symlinks: Whether a recursive watch enters symlinked
+                directories, unless the watch is shared with another project
+        """
+        with self._watch_lock:
+            key = (path, recursive)
+            if key in self._watches:
+                self._watches[key][1] += 1
+                return
+            
+            watch = self.observer.schedule(
+                self, str(path), recursive=recursive, follow_symlinks=follow_symlinks
+            )
+            self._watches[key] = [watch, 1]
+    
+    def _release_watch(self, path: Path, recursive: bool) -> None:
+        """Unschedule a watch once no project uses it."""
+        with self._watch_lock:
+            key = (path, recursive)
+            if key not in self._watches:
+                return
+            
+            self._watches[key][1] -= 1
+            if self._watches[key][1] == 0:
+                self.observer.unschedule(self._watches.pop(key)[0])
+
+
+def watch_project(
+    project: WatchedProject,
+    on_results: Optional[Callable[[WatchedProject, List[ToolResult]], None]] = None,
+    quiet_period: float = DEFAULT_QUIET_PERIOD,
+    max_latency: float = DEFAULT_MAX_LATENCY,
+    stop_event: Optional[threading.Event] = None,
+    backend: WatchBackend = DEFAULT_WATCH_BACKEND,
+    metrics: Optional[WatchMetrics] = None,
+    on_fallback: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Watch a project and regenerate its rules until stopped.
+    
+    Args:
+        project: Project to watch
+        on_results: Function called with the results of each regeneration
+        quiet_period: Seconds without events to wait before regenerating
+        max_latency: Maximum seconds to delay regeneration during a burst
+        stop_event: Event to set to stop watching
+        backend: Source of file system events
+        metrics: Metrics to record latencies, durations and event counts in
+        on_fallback: Function called when the auto backend switches to polling
+    """
+    watch_projects(
+        [project], on_results, quiet_period, max_latency, stop_event, backend, metrics, on_fallback
+    )
+
+
+def watch_projects(
+    projects: List[WatchedProject],
+    on_results: Optional[Callable[[WatchedProject, List[ToolResult]], None]] = None,
+    quiet_period: float = DEFAULT_QUIET_PERIOD,
+    max_latency: float = DEFAULT_MAX_LATENCY,
+    stop_event: Optional[threading.Event] = None,
+    backend: WatchBackend = DEFAULT_WATCH_BACKEND,
+    metrics: Optional[WatchMetrics] = None,
+    on_fallback: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Watch several projects in one process and regenerate their rules until stopped.
+    
+    Args:
+        projects: Projects to watch
+        on_results: Function called with the results of each regeneration
+        quiet_period: Seconds without events to wait before regenerating
+        max_latency: Maximum seconds to delay regeneration during a burst
+        stop_event: Event to set to stop watching
+        backend: Source of file system events
+        metrics: Metrics to record latencies, durations and event counts in
+        on_fallback: Function called when the auto backend switches to polling
+    """
+    watcher = RuleWatcher(
+        on_results, quiet_period, max_latency, backend, metrics, on_fallback=on_fallback
+    )
+    for project in projects:
+        watcher.add_project(project)
+    watcher.run(stop_event)
@@ -0,0 +1,92 @@
+"""
+Test the asyncio watch interface.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from watchdog.events import FileModifiedEvent
+
+from airulefy.async_watcher import AsyncRegenerationWorker, AsyncRuleWatcher
+from airulefy.watcher import ChangeSet, WatchedProject
+
+
+def setup_project(tmp_path):
+    """Create a project with one rule file and a copy-mode configuration."""
+    (tmp_path / ".ai").mkdir()
+    (tmp_path / ".ai" / "main.md").write_text("# Main Rules")
+    (tmp_path / ".ai-rules.yml").write_text("default_mode: copy\n")
+    project = WatchedProject(tmp_path)
+    project.regenerate()
+    return project
+
+
+def test_async_worker_merges_changes():
+    """Test that changes submitted during a regeneration are merged."""
+    received = []
+    
+    async def main():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            worker = AsyncRegenerationWorker(loop, executor)
+            worker.start()
+            for name in ["a.md", "b.md", "c.md"]:
+                worker.submit(ChangeSet(modified={name}), received.append)
+            await worker.aclose()
+    
+    asyncio.run(main())
+    
+    # The first submission was picked up alone, the others merged behind it
+    assert [sorted(str(p) for p in changes.modified) for changes in received] in (
+        [["a.md"], ["b.md", "c.md"]],
+        [["a.md", "b.md", "c.md"]],
+    )
+
+
+def test_async_rule_watcher_yields_results(tmp_path):
+    """Test iterating over regeneration results until stopped."""
+    project = setup_project(tmp_path)
+    main_file = tmp_path / ".ai" / "main.md"
+    
+    async def main():
+        with patch('airulefy.watcher.create_observer'):
+            watcher = AsyncRuleWatcher([project], quiet_period=10)
+            await watcher.start()
+            
+            main_file.write_text("# Changed Rules")
+            handler = watcher._watcher._entries[0].handler
+            handler.on_any_event(FileModifiedEvent(str(main_file)))
+            handler.flush()
+            
+            seen_project, results = await asyncio.wait_for(watcher.__anext__(), 5)
+            
+            # Pending changes are processed when stopping
+            (tmp_path / ".ai" / "extra.md").write_text("# Extra Rules")
+            handler.on_any_event(FileModifiedEvent(str(tmp_path / ".ai" / "extra.md")))
+            await watcher.stop()
+            remaining = [item async for item in watcher]
+        return seen_project, results, remaining
+    
+    seen_project, results, remaining = asyncio.run(main())
+    
+    assert seen_project is project
+    assert {r.tool_name for r in results} == {"cursor", "cline", "copilot", "devin"}
+    assert len(remaining) == 1
+    output = (tmp_path / ".cline-rules").read_text()
+    assert "# Changed Rules" in output and "# Extra Rules" in output
+
+
+def test_async_rule_watcher_real_events(tmp_path):
+    """Test the asyncio watcher end to end with file system events."""
+    project = setup_project(tmp_path)
+    
+    async def main():
+        async with AsyncRuleWatcher([project], quiet_period=0.05) as watcher:
+            (tmp_path / ".ai" / "main.md").write_text("# Changed Rules")
+            return await asyncio.wait_for(watcher.__anext__(), 5)
+    
+    _, results = asyncio.run(main())
+    
+    assert results
+    assert (tmp_path / ".cline-rules").read_text() == "# Changed Rules"
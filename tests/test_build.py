@@ -0,0 +1,328 @@
+"""
+Test the rule generation pipeline.
+"""
+
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from airulefy.build import RuleBuilder, ToolStatus, build_projects
+from airulefy.config import AirulefyConfig, SyncMode
+from airulefy.generator.base import RuleGenerator
+from airulefy.manifest import hash_file
+
+
+def setup_project(tmp_path: Path) -> AirulefyConfig:
+    """Create input files and return a copy-mode configuration."""
+    ai_dir = tmp_path / ".ai"
+    ai_dir.mkdir()
+    (ai_dir / "main.md").write_text("# Main Rules")
+    (ai_dir / "secondary.md").write_text("# Secondary Rules")
+    
+    return AirulefyConfig(default_mode=SyncMode.COPY, tools={"unknown": {}})
+
+
+def test_build_generates_all_tools(tmp_path):
+    """Test building all configured tools."""
+    config = setup_project(tmp_path)
+    builder = RuleBuilder(tmp_path, config)
+    
+    results = builder.build(builder.find_input_files())
+    
+    assert [r.tool_name for r in results] == list(config.tools)
+    statuses = {r.tool_name: r.status for r in results}
+    assert statuses.pop("unknown") == ToolStatus.SKIPPED
+    assert set(statuses.values()) == {ToolStatus.GENERATED}
+    
+    for result in results:
+        if result.output_path:
+            assert "# Secondary Rules" in result.output_path.read_text()
+
+
+def test_build_parallel_jobs(tmp_path):
+    """Test that parallel builds run in a pool and keep configuration order."""
+    config = setup_project(tmp_path)
+    builder = RuleBuilder(tmp_path, config, jobs=4)
+    
+    threads = set()
+    original_generate = RuleGenerator.generate
+    
+    def tracking_generate(self, *args, **kwargs):
+        threads.add(threading.get_ident())
+        return original_generate(self, *args, **kwargs)
+    
+    with patch.object(RuleGenerator, "generate", tracking_generate):
+        results = builder.build(builder.find_input_files())
+    
+    assert threading.get_ident() not in threads
+    assert [r.tool_name for r in results] == list(config.tools)
+    assert sum(r.status == ToolStatus.GENERATED for r in results) == 4
+
+
+def test_build_projects(tmp_path):
+    """Test building several projects in a pool."""
+    roots = [tmp_path / name for name in ["a", "b", "broken", "empty"]]
+    for root in roots:
+        root.mkdir()
+    for root in roots[:2]:
+        (root / ".ai").mkdir()
+        (root / ".ai" / "main.md").write_text(f"# Rules of {root.name}")
+    (tmp_path / "broken" / ".ai-rules.yml").write_text("tools: [")
+    
+    project_results = build_projects(roots, SyncMode.COPY, jobs=4)
+    
+    assert [p.project_root for p in project_results] == roots
+    for project_result in project_results[:2]:
+        assert project_result.input_count == 1
+        assert {r.status for r in project_result.results} == {ToolStatus.GENERATED}
+    assert "Rules of b" in (tmp_path / "b" / ".cline-rules").read_text()
+    assert project_results[2].error.startswith("Error loading configuration")
+    assert project_results[3].results == []
+    assert project_results[3].error is None
+
+
+def test_check_writes_nothing(tmp_path):
+    """Test checking a project's outputs without writing anything."""
+    config = setup_project(tmp_path)
+    config.tools["cursor"].split = True
+    builder = RuleBuilder(tmp_path, config)
+    input_files = builder.find_input_files()
+    
+    results = builder.check(input_files)
+    statuses = {r.tool_name: r.status for r in results}
+    assert statuses.pop("unknown") == ToolStatus.SKIPPED
+    assert set(statuses.values()) == {ToolStatus.STALE}
+    assert not (tmp_path / ".airulefy").exists()
+    assert not (tmp_path / ".cursor").exists()
+    
+    builder.build(input_files)
+    manifest_mtime = (tmp_path / ".airulefy" / "manifest.json").stat().st_mtime_ns
+    statuses = {r.status for r in builder.check(input_files)}
+    assert statuses == {ToolStatus.UNCHANGED, ToolStatus.SKIPPED}
+    
+    # Only the outputs of the changed input are reported
+    (tmp_path / ".ai" / "main.md").write_text("# Changed Rules")
+    results = {r.tool_name: r for r in builder.check(input_files)}
+    assert results["cursor"].status == ToolStatus.STALE
+    assert results["cursor"].stale_files == [tmp_path / ".cursor" / "rules" / "main.mdc"]
+    assert results["cline"].stale_files == [tmp_path / ".cline-rules"]
+    assert (tmp_path / ".airulefy" / "manifest.json").stat().st_mtime_ns == manifest_mtime
+
+
+def test_build_read_error(tmp_path):
+    """Test that a failure to read the inputs fails every pending tool."""
+    config = setup_project(tmp_path)
+    builder = RuleBuilder(tmp_path, config)
+    
+    with patch('airulefy.build.read_markdown_files', side_effect=OSError("Mocked read error")):
+        results = builder.build(builder.find_input_files())
+    
+    failed = [r for r in results if r.status == ToolStatus.FAILED]
+    assert len(failed) == 4
+    assert all("Mocked read error" in r.error for r in failed)
+
+
+def test_build_reports_record_error(tmp_path, capsys):
+    """Test that a failure to record the outputs is reported without failing the tools."""
+    config = setup_project(tmp_path)
+    builder = RuleBuilder(tmp_path, config)
+    
+    with patch('airulefy.build.record_output', side_effect=OSError("Mocked record error")):
+        results = builder.build(builder.find_input_files())
+    
+    assert {r.status for r in results} == {ToolStatus.GENERATED, ToolStatus.SKIPPED}
+    assert "Error recording outputs of cursor: Mocked record error" in capsys.readouterr().out
+
+
+def test_build_streams_large_inputs(tmp_path):
+    """Test that inputs above the shared content limit are streamed per tool."""
+    config = setup_project(tmp_path)
+    builder = RuleBuilder(tmp_path, config)
+    
+    with patch('airulefy.build.SHARED_CONTENT_LIMIT', 0), \
+         patch('airulefy.build.read_markdown_files') as mock_read:
+        results = builder.build(builder.find_input_files())
+        mock_read.assert_not_called()
+    
+    assert sum(r.status == ToolStatus.GENERATED for r in results) == 4
+    assert (tmp_path / ".cline-rules").read_text() == "# Main Rules\n\n---\n\n# Secondary Rules"
+
+
+def test_build_split_replaces_combined_output(tmp_path):
+    """Test that enabling split mode removes the previous combined output."""
+    setup_project(tmp_path)
+    config = AirulefyConfig(default_mode=SyncMode.COPY, tools={"cursor": {}})
+    builder = RuleBuilder(tmp_path, config)
+    builder.build(builder.find_input_files())
+    
+    combined = tmp_path / ".cursor" / "rules" / "core.mdc"
+    assert combined.exists()
+    
+    config = AirulefyConfig(default_mode=SyncMode.COPY, tools={"cursor": {"split": True}})
+    builder = RuleBuilder(tmp_path, config)
+    results = builder.build(builder.find_input_files())
+    
+    assert results[0].status == ToolStatus.GENERATED
+    assert not combined.exists()
+    assert (tmp_path / ".cursor" / "rules" / "main.mdc").read_text() == "# Main Rules"
+    assert (tmp_path / ".cursor" / "rules" / "secondary.mdc").exists()
+    
+    # A second run keeps every per-file output
+    results = builder.build(builder.find_input_files())
+    assert results[0].status == ToolStatus.UNCHANGED
+
+
+def test_build_hardlink_then_copy(tmp_path):
+    """Test that switching from hardlink to copy mode unlinks outputs from their source."""
+    ai_dir = tmp_path / ".ai"
+    ai_dir.mkdir()
+    source = ai_dir / "main.md"
+    source.write_text("# Main Rules\n")
+    
+    config = AirulefyConfig(default_mode=SyncMode.HARDLINK)
+    builder = RuleBuilder(tmp_path, config)
+    builder.build(builder.find_input_files())
+    
+    config = AirulefyConfig(default_mode=SyncMode.COPY)
+    for force in (False, True):
+        builder = RuleBuilder(tmp_path, config)
+        results = builder.build(builder.find_input_files(), force=force)
+        
+        expected = ToolStatus.UNCHANGED if force else ToolStatus.GENERATED
+        assert {r.status for r in results} == {expected}
+        assert source.stat().st_nlink == 1
+        for result in results:
+            assert result.output_path.stat().st_nlink == 1
+            assert result.output_path.read_text() == "# Main Rules\n"
+    
+    # Editing an output no longer changes the source rule file
+    with open(tmp_path / "devin-guidelines.md", "a") as f:
+        f.write("Local note\n")
+    assert source.read_text() == "# Main Rules\n"
+
+
+def test_build_keeps_modified_stale_outputs(tmp_path):
+    """Test that moving an output does not delete the old one if it was edited."""
+    setup_project(tmp_path)
+    config = AirulefyConfig(default_mode=SyncMode.COPY, tools={"devin": {}, "cline": {}})
+    builder = RuleBuilder(tmp_path, config)
+    builder.build(builder.find_input_files())
+    
+    devin_output = tmp_path / "devin-guidelines.md"
+    devin_output.write_text("# Edited by hand")
+    cline_output = tmp_path / ".cline-rules"
+    
+    config = AirulefyConfig(
+        default_mode=SyncMode.COPY,
+        tools={"devin": {"output": "docs/devin.md"}, "cline": {"output": "docs/cline.md"}},
+    )
+    builder = RuleBuilder(tmp_path, config)
+    results = {r.tool_name: r for r in builder.build(builder.find_input_files())}
+    
+    assert results["devin"].status == ToolStatus.GENERATED
+    assert results["devin"].kept_files == [devin_output]
+    assert devin_output.read_text() == "# Edited by hand"
+    assert (tmp_path / "docs" / "devin.md").exists()
+    
+    # Unmodified outputs are still removed
+    assert results["cline"].kept_files == []
+    assert not cline_output.exists()
+
+
+def test_rebuild_updates_index_from_changed_paths(tmp_path):
+    """Test that rebuilds only examine the changed paths."""
+    config = setup_project(tmp_path)
+    builder = RuleBuilder(tmp_path, config)
+    ai_dir = tmp_path / ".ai"
+    
+    results = builder.rebuild()
+    assert sum(r.status == ToolStatus.GENERATED for r in results) == 4
+    
+    new_file = ai_dir / "new.md"
+    new_file.write_text("# New Rules")
+    (ai_dir / "secondary.md").unlink()
+    
+    with patch('airulefy.build.find_markdown_files') as mock_find, \
+         patch('airulefy.manifest.hash_file', wraps=hash_file) as mock_hash:
+        results = builder.rebuild({new_file, ai_dir / "secondary.md"})
+        mock_find.assert_not_called()
+        # Of the inputs, only the new file is hashed
+        hashed = [call.args[0] for call in mock_hash.call_args_list]
+        assert [path for path in hashed if ai_dir in path.parents] == [new_file]
+    
+    assert builder.input_files == [ai_dir / "main.md", new_file]
+    assert sum(r.status == ToolStatus.GENERATED for r in results) == 4
+    content = (tmp_path / ".cline-rules").read_text()
+    assert "# New Rules" in content
+    assert "# Secondary Rules" not in content
+
+
+def test_rebuild_ignores_unrelated_paths(tmp_path):
+    """Test that changes outside the input files do not trigger a build."""
+    config = setup_project(tmp_path)
+    builder = RuleBuilder(tmp_path, config)
+    builder.rebuild()
+    
+    ai_dir = tmp_path / ".ai"
+    (ai_dir / "node_modules").mkdir()
+    (ai_dir / "node_modules" / "README.md").write_text("# Vendored")
+    
+    with patch.object(builder, "build") as mock_build:
+        assert builder.rebuild({ai_dir / "node_modules" / "README.md"}) is None
+        mock_build.assert_not_called()
+
+
+def test_rebuild_directory_changes(tmp_path):
+    """Test that created and deleted directories update the index."""
+    config = setup_project(tmp_path)
+    builder = RuleBuilder(tmp_path, config)
+    builder.rebuild()
+    
+    sub_dir = tmp_path / ".ai" / "sub"
+    sub_dir.mkdir()
+    (sub_dir / "nested.md").write_text("# Nested")
+    builder.rebuild({sub_dir})
+    assert sub_dir / "nested.md" in builder.input_files
+    
+    (sub_dir / "nested.md").unlink()
+    sub_dir.rmdir()
+    builder.rebuild({sub_dir})
+    assert sub_dir / "nested.md" not in builder.input_files
+    assert len(builder.input_files) == 2
+
+
+def test_build_skips_outputs_in_input_dir(tmp_path):
+    """Test that outputs written inside the input directory are not read back."""
+    setup_project(tmp_path)
+    config = AirulefyConfig(
+        default_mode=SyncMode.COPY, tools={"devin": {"output": ".ai/devin.md"}}
+    )
+    builder = RuleBuilder(tmp_path, config)
+    
+    builder.build(builder.find_input_files())
+    assert tmp_path / ".ai" / "devin.md" not in builder.find_input_files()
+    
+    results = builder.build(builder.find_input_files())
+    assert all(r.status == ToolStatus.UNCHANGED for r in results if r.output_path)
+    assert (tmp_path / ".ai" / "devin.md").read_text().count("# Main Rules") == 1
+
+
+def test_build_skips_symlinked_dirs_unless_enabled(tmp_path):
+    """Test that symlinked directories, like vendored trees, are only searched when enabled."""
+    config = setup_project(tmp_path)
+    vendored_dir = tmp_path / "vendor"
+    vendored_dir.mkdir()
+    (vendored_dir / "vendored.md").write_text("# Vendored Rules")
+    try:
+        (tmp_path / ".ai" / "vendor").symlink_to(vendored_dir, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("Symlinks are not supported on this platform")
+    
+    builder = RuleBuilder(tmp_path, config)
+    assert tmp_path / ".ai" / "vendor" / "vendored.md" not in builder.find_input_files()
+    
+    config = config.model_copy(update={"follow_symlinks": True})
+    builder = RuleBuilder(tmp_path, config)
+    assert tmp_path / ".ai" / "vendor" / "vendored.md" in builder.find_input_files()
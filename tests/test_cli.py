@@ -5,6 +5,7 @@ Test CLI commands.
 import os
 from pathlib import Path
 from typing import List
+from unittest.mock import patch
 
 import pytest
 from typer.testing import CliRunner
@@ -106,6 +107,57 @@ def test_generate_command_copy_mode(tmp_path, monkeypatch):
         assert not path.is_symlink()
 
 
+def test_generate_command_unchanged(tmp_path, monkeypatch):
+    """Test that a repeated generate run reports unchanged outputs."""
+    # Set up test project
+    md_files = setup_test_project(tmp_path)
+    
+    # Change working directory to tmp_path
+    monkeypatch.chdir(tmp_path)
+    
+    # First run writes all outputs
+    result = runner.invoke(app, ["generate"])
+    assert result.exit_code == 0
+    assert "unchanged" not in result.stdout
+    
+    # Second run finds everything up to date
+    result = runner.invoke(app, ["generate"])
+    assert result.exit_code == 0
+    assert result.stdout.count("unchanged") == 5  # 4 tools and the summary
+    assert "Successfully generated rules for 4 tools (4 unchanged)" in result.stdout
+
+
+def test_generate_command_uses_manifest(tmp_path, monkeypatch):
+    """Test that generate skips reading inputs when the manifest shows no changes."""
+    # Set up test project
+    md_files = setup_test_project(tmp_path)
+    
+    # Change working directory to tmp_path
+    monkeypatch.chdir(tmp_path)
+    
+    result = runner.invoke(app, ["generate", "--copy"])
+    assert result.exit_code == 0
+    assert (tmp_path / ".airulefy" / "manifest.json").exists()
+    
+    # Nothing changed, so no input file is read
+    with patch('airulefy.build.read_markdown_files') as mock_read:
+        result = runner.invoke(app, ["generate", "--copy"])
+        mock_read.assert_not_called()
+    assert "Successfully generated rules for 4 tools (4 unchanged)" in result.stdout
+    
+    # A changed input regenerates the outputs
+    md_files[0].write_text("# Main Rules\n\nThese rules changed.")
+    result = runner.invoke(app, ["generate", "--copy"])
+    assert result.exit_code == 0
+    assert "unchanged" not in result.stdout
+    assert "These rules changed." in (tmp_path / ".cline-rules").read_text()
+    
+    # --force regenerates even though nothing changed
+    with patch('airulefy.build.read_markdown_files', return_value="") as mock_read:
+        result = runner.invoke(app, ["generate", "--copy", "--force"])
+        mock_read.assert_called_once()
+
+
 def test_validate_command_success(tmp_path, monkeypatch):
     """Test validate command with valid setup."""
     # Set up test project
@@ -2,7 +2,9 @@
 Extended tests for the CLI commands.
 """
 
+import json
 import os
+import signal
 import sys
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -12,6 +14,7 @@ import typer
 from typer.testing import CliRunner
 
 from airulefy.__main__ import app
+from airulefy.watcher import ChangeSet
 
 
 runner = CliRunner()
@@ -136,6 +139,29 @@ def test_validate_command_invalid_output(tmp_path, monkeypatch):
     assert "exists but is not a file" in result.stdout
 
 
+def test_validate_command_output_in_input_dir(tmp_path, monkeypatch):
+    """Test validate command warns about outputs inside the input directory."""
+    # Set up test project
+    setup_test_project(tmp_path)
+    (tmp_path / ".ai-rules.yml").write_text("""
+tools:
+  devin:
+    output: .ai/generated/devin.md
+""")
+    
+    # Change working directory to tmp_path
+    monkeypatch.chdir(tmp_path)
+    
+    # Run validate command
+    result = runner.invoke(app, ["validate"])
+    
+    # Check result
+    assert result.exit_code == 0
+    assert "Warnings:" in result.stdout
+    assert "devin overlaps the input directory" in result.stdout
+    assert "cline overlaps" not in result.stdout
+
+
 def test_list_tools_command(tmp_path, monkeypatch):
     """Test list-tools command."""
     # Set up test project
@@ -156,7 +182,7 @@ def test_list_tools_command(tmp_path, monkeypatch):
     assert "devin" in result.stdout
 
 
-@patch('airulefy.__main__.watch_directory')  # パスを修正
+@patch('airulefy.watcher.watch_project')  # パスを修正
 def test_watch_command(mock_watch, tmp_path, monkeypatch):
     """Test watch command."""
     # Set up test project
@@ -172,10 +198,77 @@ def test_watch_command(mock_watch, tmp_path, monkeypatch):
     assert "Watching" in result.stdout
     assert "for changes" in result.stdout
     
-    # Check that watch_directory was called
+    # Check that watch_project was called
     mock_watch.assert_called_once()
 
 
+@patch('airulefy.watcher.watch_project')
+def test_watch_command_regenerates_changed_files(mock_watch, tmp_path, monkeypatch):
+    """Test that the watched project regenerates from the reported changes."""
+    setup_test_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    
+    result = runner.invoke(app, ["watch", "--copy"])
+    assert result.exit_code == 0
+    
+    project = mock_watch.call_args[0][0]
+    new_file = tmp_path / ".ai" / "extra.md"
+    new_file.write_text("# Extra Rules")
+    results = project.regenerate(ChangeSet(created={new_file}))
+    
+    assert results
+    assert "# Extra Rules" in (tmp_path / ".cline-rules").read_text()
+    
+    # Changes that do not affect the input files are ignored
+    ignored_file = tmp_path / ".ai" / "node_modules" / "x.md"
+    assert project.regenerate(ChangeSet(modified={ignored_file})) is None
+
+
+@patch('airulefy.watcher.watch_projects')
+def test_watch_command_roots(mock_watch, tmp_path, monkeypatch):
+    """Test watching every project below a directory in one process."""
+    for name in ["a", "b"]:
+        (tmp_path / "packages" / name).mkdir(parents=True)
+        setup_test_project(tmp_path / "packages" / name)
+    
+    result = runner.invoke(app, ["watch", "--copy", "--roots", str(tmp_path / "packages")])
+    
+    assert result.exit_code == 0
+    assert "Watching 2 projects" in result.stdout
+    projects = mock_watch.call_args[0][0]
+    assert [p.project_root for p in projects] == [
+        tmp_path / "packages" / "a",
+        tmp_path / "packages" / "b",
+    ]
+    for name in ["a", "b"]:
+        assert (tmp_path / "packages" / name / ".cline-rules").exists()
+
+
+@patch('airulefy.watcher.watch_project')
+def test_watch_command_metrics(mock_watch, tmp_path, monkeypatch):
+    """Test that watch keeps a metrics file and summarizes metrics on SIGUSR1."""
+    setup_test_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    metrics_file = tmp_path / "airulefy.prom"
+    
+    def fake_watch(project, on_results, **kwargs):
+        kwargs["metrics"].record_regeneration(project.project_root, 0.1, event_count=3, results=[])
+        signal.raise_signal(signal.SIGUSR1)
+    
+    mock_watch.side_effect = fake_watch
+    result = runner.invoke(app, ["watch", "--metrics-file", str(metrics_file)])
+    
+    assert result.exit_code == 0
+    assert "1 rebuilds, 2 coalesced events" in result.stdout
+    assert "airulefy_watch_coalesced_events_total" in metrics_file.read_text()
+
+
+def test_watch_command_roots_without_projects(tmp_path):
+    """Test watching a directory without any projects."""
+    result = runner.invoke(app, ["watch", "--roots", str(tmp_path)])
+    assert "No projects" in result.stdout
+
+
 def test_watch_command_missing_dir(tmp_path, monkeypatch):
     """Test watch command with missing input directory."""
     # Create config file with non-existent directory
@@ -220,6 +313,108 @@ def test_generate_verbose_mode(tmp_path, monkeypatch):
     assert "Successfully generated" in result.stdout
 
 
+def test_generate_parallel_jobs(tmp_path, monkeypatch):
+    """Test generate command with parallel jobs."""
+    # Set up test project
+    md_files = setup_test_project(tmp_path)
+    
+    # Change working directory to tmp_path
+    monkeypatch.chdir(tmp_path)
+    
+    # Run generate command with several jobs
+    result = runner.invoke(app, ["generate", "--copy", "--jobs", "4"])
+    
+    # Check result, reported in configuration order
+    assert result.exit_code == 0
+    assert "Successfully generated rules for 4 tools." in result.stdout
+    positions = [
+        result.stdout.index(f"{tool}:") for tool in ["cursor", "cline", "copilot", "devin"]
+    ]
+    assert positions == sorted(positions)
+
+
+def test_generate_all_projects(tmp_path, monkeypatch):
+    """Test generate command for every project below a directory."""
+    for project in ["app", "packages/lib"]:
+        ai_dir = tmp_path / project / ".ai"
+        ai_dir.mkdir(parents=True)
+        (ai_dir / "main.md").write_text(f"# {project} rules")
+    (tmp_path / "packages" / "docs").mkdir()
+    (tmp_path / "packages" / "docs" / ".ai-rules.yml").write_text("default_mode: copy\n")
+    
+    monkeypatch.chdir(tmp_path)
+    result = runner.invoke(app, ["generate", "--all", "--jobs", "2"])
+    
+    assert result.exit_code == 0
+    assert str(tmp_path / "app") in result.stdout
+    assert "No Markdown files found" in result.stdout
+    assert "3 projects: 8 tools succeeded (0 unchanged), 0 failed." in result.stdout
+    assert "packages/lib rules" in (tmp_path / "packages" / "lib" / ".cline-rules").read_text()
+    
+    # Only the given trees are searched; a broken configuration fails the run
+    (tmp_path / "packages" / "docs" / ".ai-rules.yml").write_text("tools: [")
+    result = runner.invoke(app, ["generate", "--root", "packages"])
+    
+    assert result.exit_code == 1
+    assert str(tmp_path / "app") not in result.stdout
+    assert "Error loading configuration" in result.stdout
+    assert (
+        "2 projects: 4 tools succeeded (4 unchanged), 0 failed. 1 of them had errors."
+        in result.stdout
+    )
+
+
+def test_generate_all_without_projects(tmp_path, monkeypatch):
+    """Test generate command for all projects when there are none."""
+    monkeypatch.chdir(tmp_path)
+    result = runner.invoke(app, ["generate", "--all"])
+    
+    assert result.exit_code == 0
+    assert "No projects with a .ai-rules.yml or .ai directory found." in result.stdout
+
+
+def test_generate_check(tmp_path, monkeypatch):
+    """Test generate command checking whether the rules are up to date."""
+    setup_test_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    
+    result = runner.invoke(app, ["generate", "--check"])
+    assert result.exit_code == 1
+    assert "Rules are out of date for: cursor, cline, copilot, devin" in result.stdout
+    assert not (tmp_path / ".cline-rules").exists()
+    
+    runner.invoke(app, ["generate"])
+    result = runner.invoke(app, ["generate", "--check"])
+    assert result.exit_code == 0
+    assert "All rules are up to date." in result.stdout
+    
+    (tmp_path / ".cline-rules").unlink()
+    (tmp_path / ".cline-rules").write_text("Edited by hand")
+    result = runner.invoke(app, ["generate", "--check"])
+    assert result.exit_code == 1
+    assert "cline: out of date" in result.stdout
+    assert "Rules are out of date for: cline" in result.stdout
+    assert (tmp_path / ".cline-rules").read_text() == "Edited by hand"
+
+
+def test_generate_profile(tmp_path, monkeypatch):
+    """Test generate command writing a profile of its phases."""
+    setup_test_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    
+    result = runner.invoke(
+        app, ["generate", "--profile", "profile.json", "--profile-stats", "profile.pstats"]
+    )
+    
+    assert result.exit_code == 0
+    report = json.loads((tmp_path / "profile.json").read_text())
+    phases = [(phase["phase"], phase["tool"]) for phase in report["phases"]]
+    assert phases[:2] == [("config", None), ("discovery", None)]
+    assert ("generate", "cursor") in phases
+    assert phases[-1] == ("report", None)
+    assert (tmp_path / "profile.pstats").stat().st_size > 0
+
+
 def test_generate_with_skipped_unknown_tool(tmp_path, monkeypatch):
     """Test generate command with an unknown tool in config."""
     # Set up test project
@@ -3,12 +3,15 @@ Test configuration functionality.
 """
 
 import os
+import time
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 import yaml
 
-from airulefy.config import AirulefyConfig, SyncMode, load_config
+from airulefy import config as config_module
+from airulefy.config import CONFIG_CACHE_PATH, AirulefyConfig, SyncMode, load_config
 
 
 def test_default_config():
@@ -98,3 +101,94 @@ def test_input_path_normalization():
     # Empty string should default to ".ai"
     config = AirulefyConfig(input_path="")
     assert config.input_path == ".ai"
+
+
+def test_link_sync_modes(tmp_path):
+    """Test configuring the hardlink, reflink and auto sync modes."""
+    config_path = tmp_path / ".ai-rules.yml"
+    config_path.write_text("""
+default_mode: auto
+tools:
+  cursor:
+    mode: hardlink
+  cline:
+    mode: reflink
+""")
+    
+    config = load_config(tmp_path)
+    
+    assert config.default_mode == SyncMode.AUTO
+    assert config.tools["cursor"].mode == SyncMode.HARDLINK
+    assert config.tools["cline"].mode == SyncMode.REFLINK
+    assert config.tools["devin"].mode == SyncMode.AUTO
+
+
+def write_settled_config(tmp_path: Path, text: str, age: float = 10.0) -> Path:
+    """Write a configuration file last modified a while ago, outside the racy window."""
+    config_path = tmp_path / ".ai-rules.yml"
+    config_path.write_text(text)
+    mtime = time.time() - age
+    os.utime(config_path, (mtime, mtime))
+    return config_path
+
+
+def test_load_config_cached_in_memory(tmp_path):
+    """Test that an unchanged configuration file is parsed only once."""
+    write_settled_config(tmp_path, "default_mode: copy\n")
+    
+    with patch(
+        'airulefy.config._parse_config_file', wraps=config_module._parse_config_file
+    ) as mock_parse:
+        first = load_config(tmp_path)
+        second = load_config(tmp_path)
+        assert mock_parse.call_count == 1
+        
+        # Callers get their own copy
+        assert first == second
+        assert first is not second
+        
+        # A modified file is parsed again
+        write_settled_config(tmp_path, "default_mode: symlink\n", age=5.0)
+        assert load_config(tmp_path).default_mode == SyncMode.SYMLINK
+        assert mock_parse.call_count == 2
+    
+    # Without a .airulefy directory nothing is written to the project
+    assert not (tmp_path / CONFIG_CACHE_PATH).exists()
+
+
+def test_load_config_racy_file_not_cached(tmp_path):
+    """Test that a file modified just before loading is parsed every time."""
+    (tmp_path / ".ai-rules.yml").write_text("default_mode: copy\n")
+    
+    with patch(
+        'airulefy.config._parse_config_file', wraps=config_module._parse_config_file
+    ) as mock_parse:
+        load_config(tmp_path)
+        load_config(tmp_path)
+        assert mock_parse.call_count == 2
+
+
+def test_load_config_cached_on_disk(tmp_path):
+    """Test that a later process reuses the configuration cached on disk."""
+    write_settled_config(tmp_path, "default_mode: copy\ntools:\n  cursor:\n    mode: hardlink\n")
+    (tmp_path / ".airulefy").mkdir()
+    
+    with patch.dict(config_module._config_cache, clear=True):
+        load_config(tmp_path, write_cache=False)
+    assert not (tmp_path / CONFIG_CACHE_PATH).exists()
+    
+    expected = load_config(tmp_path)
+    assert (tmp_path / CONFIG_CACHE_PATH).exists()
+    
+    # Simulate a new process
+    with patch.dict(config_module._config_cache, clear=True), \
+         patch('airulefy.config._parse_config_file') as mock_parse:
+        assert load_config(tmp_path) == expected
+        mock_parse.assert_not_called()
+    
+    # A corrupt cache is ignored
+    (tmp_path / CONFIG_CACHE_PATH).write_text("{not json")
+    with patch.dict(config_module._config_cache, clear=True):
+        config = load_config(tmp_path)
+    assert config.tools["cursor"].mode == SyncMode.HARDLINK
+    assert config.tools["devin"].mode == SyncMode.COPY
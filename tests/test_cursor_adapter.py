@@ -87,3 +87,106 @@ def test_cursor_generate_multiple_files(tmp_path):
     assert "This is part 1." in content
     assert "# Part 2" in content
     assert "This is part 2." in content
+
+
+def test_cursor_transform_lines_streams():
+    """Test that the streaming transform does not consume all input up front."""
+    generator = CursorGenerator(
+        "cursor", 
+        ToolConfig(mode=SyncMode.COPY), 
+        Path("/project")
+    )
+    
+    consumed = []
+    
+    def lines():
+        for i in range(100):
+            consumed.append(i)
+            yield f"line {i}\n"
+    
+    output = generator.transform_lines(lines())
+    
+    # Only the first lines are buffered to look for a title
+    assert next(output) == "# Cursor Rules\n\n"
+    assert len(consumed) == 5
+    
+    rest = list(output)
+    assert len(rest) == 100
+    assert rest[-1] == "line 99\n"
+
+
+def test_cursor_split_generates_file_per_input(tmp_path):
+    """Test that split mode emits one rule file per input file."""
+    rules_dir = tmp_path / ".ai-rules"
+    (rules_dir / "lang").mkdir(parents=True)
+    input_file1 = rules_dir / "core.md"
+    input_file1.write_text("# Core\n\nCore rules.")
+    input_file2 = rules_dir / "lang" / "python.md"
+    input_file2.write_text("Use type hints.")
+    
+    generator = CursorGenerator("cursor", ToolConfig(mode=SyncMode.COPY, split=True), tmp_path)
+    assert generator.output_path == tmp_path / ".cursor" / "rules"
+    
+    assert generator.generate([input_file1, input_file2], source_root=rules_dir) is True
+    
+    output_dir = tmp_path / ".cursor" / "rules"
+    assert generator.output_files == [output_dir / "core.mdc", output_dir / "lang" / "python.mdc"]
+    assert (output_dir / "core.mdc").read_text() == "# Core\n\nCore rules."
+    assert (output_dir / "lang" / "python.mdc").read_text() == "# Cursor Rules\n\nUse type hints."
+
+
+def test_cursor_split_only_rewrites_changed_inputs(tmp_path):
+    """Test that split mode leaves outputs of unchanged inputs alone."""
+    rules_dir = tmp_path / ".ai-rules"
+    rules_dir.mkdir()
+    input_file1 = rules_dir / "a.md"
+    input_file1.write_text("# A")
+    input_file2 = rules_dir / "b.md"
+    input_file2.write_text("# B")
+    
+    generator = CursorGenerator("cursor", ToolConfig(mode=SyncMode.COPY, split=True), tmp_path)
+    generator.generate([input_file1, input_file2], source_root=rules_dir)
+    
+    output1, output2 = generator.output_files
+    output1.write_text("# Stale but recorded as unmodified")
+    input_file2.write_text("# B changed")
+    
+    result = generator.generate(
+        [input_file1, input_file2],
+        source_root=rules_dir,
+        changed_files={input_file2},
+        previous_files={output1: True, output2: True},
+    )
+    
+    assert result is True
+    assert generator.changed is True
+    assert output1.read_text() == "# Stale but recorded as unmodified"
+    assert output2.read_text() == "# B changed"
+
+
+def test_cursor_split_removes_orphaned_outputs(tmp_path):
+    """Test that outputs of removed input files are deleted."""
+    rules_dir = tmp_path / ".ai-rules"
+    (rules_dir / "old").mkdir(parents=True)
+    input_file1 = rules_dir / "a.md"
+    input_file1.write_text("# A")
+    input_file2 = rules_dir / "old" / "b.md"
+    input_file2.write_text("# B")
+    
+    generator = CursorGenerator("cursor", ToolConfig(mode=SyncMode.COPY, split=True), tmp_path)
+    generator.generate([input_file1, input_file2], source_root=rules_dir)
+    previous_files = {path: True for path in generator.output_files}
+    
+    input_file2.unlink()
+    result = generator.generate(
+        [input_file1],
+        source_root=rules_dir,
+        changed_files=set(),
+        previous_files=previous_files,
+    )
+    
+    output_dir = tmp_path / ".cursor" / "rules"
+    assert result is True
+    assert generator.changed is True
+    assert (output_dir / "a.mdc").exists()
+    assert not (output_dir / "old").exists()
@@ -4,15 +4,25 @@ Test file system utilities.
 
 import os
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
 from airulefy.config import SyncMode
 from airulefy.fsutils import (
+    IgnoreRules,
     combine_markdown_files,
     ensure_directory_exists,
+    file_has_content,
     find_markdown_files,
+    find_project_roots,
+    iter_lines,
+    is_markdown_input,
+    iter_markdown_files,
+    read_markdown_files,
+    symlink_points_to,
     sync_file,
+    write_file_atomic,
 )
 
 
@@ -63,6 +73,103 @@ def test_find_markdown_files_nonexistent_dir(tmp_path):
     assert len(files) == 0
 
 
+def test_find_markdown_files_prunes_default_ignores(tmp_path):
+    """Test that .git and node_modules directories are not searched."""
+    ai_dir = tmp_path / ".ai"
+    (ai_dir / ".git").mkdir(parents=True)
+    (ai_dir / ".git" / "notes.md").write_text("# Git")
+    (ai_dir / "node_modules" / "pkg").mkdir(parents=True)
+    (ai_dir / "node_modules" / "pkg" / "README.md").write_text("# Package")
+    (ai_dir / "main.md").write_text("# Main")
+    
+    assert find_markdown_files(ai_dir) == [ai_dir / "main.md"]
+
+
+def test_find_markdown_files_ignore_file(tmp_path):
+    """Test that paths listed in .airulefyignore are skipped."""
+    ai_dir = tmp_path / ".ai"
+    (ai_dir / "drafts").mkdir(parents=True)
+    (ai_dir / "sub").mkdir()
+    (ai_dir / "main.md").write_text("# Main")
+    (ai_dir / "todo.wip.md").write_text("# WIP")
+    (ai_dir / "keep.wip.md").write_text("# Keep")
+    (ai_dir / "drafts" / "draft.md").write_text("# Draft")
+    (ai_dir / "sub" / "nested.wip.md").write_text("# Nested WIP")
+    (ai_dir / ".airulefyignore").write_text("# Comment\n\ndrafts/\n*.wip.md\n!keep.wip.md\n")
+    
+    with patch("airulefy.fsutils.IgnoreRules.is_ignored", autospec=True,
+               side_effect=IgnoreRules.is_ignored) as mock_ignored:
+        files = find_markdown_files(ai_dir)
+    
+    assert files == [ai_dir / "keep.wip.md", ai_dir / "main.md"]
+    # Ignored directories are pruned, not filtered file by file
+    checked = [call.args[1] for call in mock_ignored.call_args_list]
+    assert "drafts" in checked
+    assert "drafts/draft.md" not in checked
+
+
+def test_find_markdown_files_max_depth(tmp_path):
+    """Test limiting the subdirectory depth searched."""
+    ai_dir = tmp_path / ".ai"
+    (ai_dir / "a" / "b").mkdir(parents=True)
+    (ai_dir / "top.md").write_text("# Top")
+    (ai_dir / "a" / "one.md").write_text("# One")
+    (ai_dir / "a" / "b" / "two.md").write_text("# Two")
+    
+    assert find_markdown_files(ai_dir, max_depth=0) == [ai_dir / "top.md"]
+    assert find_markdown_files(ai_dir, max_depth=1) == [ai_dir / "a" / "one.md", ai_dir / "top.md"]
+    assert len(find_markdown_files(ai_dir)) == 3
+
+
+def test_find_markdown_files_symlinked_dirs(tmp_path):
+    """Test the symlink policy and that symlink cycles terminate."""
+    ai_dir = tmp_path / ".ai"
+    ai_dir.mkdir()
+    shared_dir = tmp_path / "shared"
+    shared_dir.mkdir()
+    (shared_dir / "shared.md").write_text("# Shared")
+    (ai_dir / "main.md").write_text("# Main")
+    try:
+        (ai_dir / "shared").symlink_to(shared_dir, target_is_directory=True)
+        (ai_dir / "loop").symlink_to(ai_dir, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("Symlinks are not supported on this platform")
+    
+    # Symlinked directories are only searched when enabled
+    assert find_markdown_files(ai_dir) == [ai_dir / "main.md"]
+    assert not is_markdown_input(ai_dir, ai_dir / "shared" / "shared.md")
+    assert find_markdown_files(ai_dir, follow_symlinks=True) == [
+        ai_dir / "main.md",
+        ai_dir / "shared" / "shared.md",
+    ]
+    assert is_markdown_input(ai_dir, ai_dir / "shared" / "shared.md", follow_symlinks=True)
+
+
+def test_find_project_roots(tmp_path):
+    """Test discovering project roots by their configuration file."""
+    for project in ["app", "packages/a", "packages/a/nested", "node_modules/dep", ".cache/x"]:
+        (tmp_path / project).mkdir(parents=True)
+        (tmp_path / project / ".ai-rules.yml").write_text("")
+    (tmp_path / "packages" / "empty").mkdir()
+    
+    assert find_project_roots([tmp_path]) == [
+        tmp_path / "app",
+        tmp_path / "packages" / "a",
+        tmp_path / "packages" / "a" / "nested",
+    ]
+    assert find_project_roots([tmp_path], max_depth=1) == [tmp_path / "app"]
+    # A directory can itself be a project root, and overlapping trees are merged
+    assert find_project_roots([tmp_path / "app", tmp_path]) == find_project_roots([tmp_path])
+    
+    # Projects without a configuration file are found by their input directory
+    (tmp_path / "packages" / "empty" / ".ai").mkdir()
+    assert find_project_roots([tmp_path / "packages"], include_input_dirs=True) == [
+        tmp_path / "packages" / "a",
+        tmp_path / "packages" / "a" / "nested",
+        tmp_path / "packages" / "empty",
+    ]
+
+
 def test_ensure_directory_exists(tmp_path):
     """Test ensuring directory exists."""
     nested_path = tmp_path / "a" / "b" / "c" / "file.txt"
@@ -142,3 +249,143 @@ def test_combine_markdown_files(tmp_path):
     assert "# File 1\nContent of file 1" in content
     assert "# File 2\nContent of file 2" in content
     assert "---" in content  # Check for separator
+
+
+def test_read_markdown_files(tmp_path):
+    """Test reading multiple Markdown files into a single string."""
+    file1 = tmp_path / "file1.md"
+    file1.write_text("# File 1")
+    
+    file2 = tmp_path / "file2.md"
+    file2.write_text("# File 2")
+    
+    content = read_markdown_files([file1, file2])
+    
+    # Content should match what combine_markdown_files writes
+    output_file = tmp_path / "combined.md"
+    combine_markdown_files([file1, file2], output_file)
+    assert content == output_file.read_text()
+    assert content == "# File 1\n\n---\n\n# File 2"
+
+
+def test_write_file_atomic(tmp_path):
+    """Test writing a file atomically."""
+    target_file = tmp_path / "nested" / "target.md"
+    
+    write_file_atomic(target_file, "# First")
+    assert target_file.read_text() == "# First"
+    
+    write_file_atomic(target_file, "# Second")
+    assert target_file.read_text() == "# Second"
+    
+    # No temporary files should be left behind
+    assert [p.name for p in target_file.parent.iterdir()] == ["target.md"]
+
+
+def test_write_file_atomic_replaces_symlink(tmp_path):
+    """Test that writing over a symlink replaces it without touching its source."""
+    source_file = tmp_path / "source.md"
+    source_file.write_text("# Source")
+    
+    target_file = tmp_path / "target.md"
+    try:
+        target_file.symlink_to(source_file)
+    except (OSError, NotImplementedError):
+        pytest.skip("Symlinks are not supported on this platform")
+    
+    write_file_atomic(target_file, "# Rendered")
+    
+    assert not target_file.is_symlink()
+    assert target_file.read_text() == "# Rendered"
+    assert source_file.read_text() == "# Source"
+
+
+def test_write_file_atomic_unchanged(tmp_path):
+    """Test that writing identical content leaves the file untouched."""
+    target_file = tmp_path / "target.md"
+    
+    assert write_file_atomic(target_file, "# Content") is True
+    os.utime(target_file, ns=(1_000_000_000, 1_000_000_000))
+    
+    assert write_file_atomic(target_file, "# Content") is False
+    assert target_file.stat().st_mtime_ns == 1_000_000_000
+    
+    assert write_file_atomic(target_file, "# Changed") is True
+    assert target_file.read_text() == "# Changed"
+
+
+def test_file_has_content(tmp_path):
+    """Test comparing a file against expected bytes."""
+    target_file = tmp_path / "target.md"
+    
+    assert file_has_content(target_file, b"# Content") is False
+    
+    target_file.write_bytes(b"# Content")
+    assert file_has_content(target_file, b"# Content") is True
+    assert file_has_content(target_file, b"# Other!!") is False
+    assert file_has_content(target_file, b"# Content longer") is False
+
+
+def test_symlink_points_to(tmp_path):
+    """Test checking the source of an existing symlink."""
+    source_file = tmp_path / "source.md"
+    source_file.write_text("# Source")
+    other_file = tmp_path / "other.md"
+    other_file.write_text("# Other")
+    
+    target_file = tmp_path / "target" / "target.md"
+    assert symlink_points_to(target_file, source_file) is False
+    
+    result = sync_file(source_file, target_file, SyncMode.SYMLINK)
+    assert result is True
+    
+    if target_file.is_symlink():
+        assert symlink_points_to(target_file, source_file) is True
+        assert symlink_points_to(target_file, other_file) is False
+    else:
+        assert symlink_points_to(target_file, source_file) is False
+
+
+def test_write_file_atomic_chunks(tmp_path):
+    """Test writing streamed chunks compared against the existing file."""
+    target_file = tmp_path / "target.md"
+    
+    assert write_file_atomic(target_file, iter(["# Title\n", "Body\n"])) is True
+    assert target_file.read_text() == "# Title\nBody\n"
+    
+    # Same content split differently is unchanged
+    assert write_file_atomic(target_file, iter(["# Ti", "tle\nBody", "\n"])) is False
+    
+    # A difference after a matching prefix keeps the prefix
+    assert write_file_atomic(target_file, iter(["# Title\n", "Other\n"])) is True
+    assert target_file.read_text() == "# Title\nOther\n"
+    
+    # Content that is a prefix of the existing file truncates it
+    assert write_file_atomic(target_file, iter(["# Title\n"])) is True
+    assert target_file.read_text() == "# Title\n"
+    
+    # Empty content
+    assert write_file_atomic(target_file, iter([])) is True
+    assert target_file.read_text() == ""
+    assert [p.name for p in tmp_path.iterdir()] == ["target.md"]
+
+
+def test_iter_lines():
+    """Test regrouping chunks into lines."""
+    assert list(iter_lines(["a\nb", "c\n", "", "d"])) == ["a\n", "bc\n", "d"]
+    assert list(iter_lines(["a\n\n"])) == ["a\n", "\n"]
+    assert list(iter_lines([""])) == []
+
+
+def test_iter_markdown_files(tmp_path):
+    """Test streaming combined Markdown files line by line."""
+    file1 = tmp_path / "file1.md"
+    file1.write_text("# File 1\nLine")
+    
+    file2 = tmp_path / "file2.md"
+    file2.write_text("# File 2\n")
+    
+    lines = list(iter_markdown_files([file1, file2]))
+    
+    assert "".join(lines) == read_markdown_files([file1, file2])
+    assert all(line.endswith("\n") for line in lines)
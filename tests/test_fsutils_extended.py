@@ -2,6 +2,7 @@
 Extended tests for filesystem utilities.
 """
 
+import errno
 import os
 import shutil
 from pathlib import Path
@@ -11,9 +12,16 @@ import pytest
 
 from airulefy.config import SyncMode
 from airulefy.fsutils import (
+    clear_sync_mode_cache,
     combine_markdown_files,
+    concatenate_files_atomic,
+    file_in_sync,
     find_markdown_files,
-    sync_file
+    read_markdown_files,
+    resolve_sync_mode,
+    sync_file,
+    sync_file_with_mode,
+    write_file_atomic,
 )
 
 
@@ -29,14 +37,21 @@ def test_symlink_fallback_to_copy(tmp_path):
     # Mock os.symlink to raise an OSError
     with patch('os.path.relpath', return_value="source.md"):
         with patch('pathlib.Path.symlink_to', side_effect=OSError("Mocked symlink failure")):
-            # Mock shutil.copy2 to track calls
-            with patch('shutil.copy2') as mock_copy:
+            # Wrap shutil.copy2 to track calls
+            with patch('shutil.copy2', wraps=shutil.copy2) as mock_copy:
                 # Call the function
                 result = sync_file(source_file, dest_file, SyncMode.SYMLINK)
                 
-                # Verify that copy was called when symlink fails
-                mock_copy.assert_called_once_with(source_file, dest_file)
+                # Verify that copy was called when symlink fails, into a
+                # temporary file next to the destination
+                mock_copy.assert_called_once()
+                copy_source, copy_target = mock_copy.call_args.args
+                assert copy_source == source_file
+                assert copy_target.parent == dest_file.parent
                 assert result is True
+    
+    assert dest_file.read_text() == "# Test Content"
+    assert not dest_file.is_symlink()
 
 
 def test_sync_file_create_parent_dirs(tmp_path):
@@ -123,3 +138,196 @@ def test_combine_markdown_files_error_handling(tmp_path):
             os.chmod(input_file, 0o644)
         except:
             pass
+
+
+def create_sources(tmp_path):
+    """Create source files for concatenation tests."""
+    file1 = tmp_path / "file1.md"
+    file1.write_text("# File 1\nContent of file 1")
+    
+    file2 = tmp_path / "file2.md"
+    file2.write_text("# File 2\nContent of file 2\n")
+    
+    return [file1, file2]
+
+
+def test_concatenate_files_atomic(tmp_path):
+    """Test concatenating files matches the combined Markdown content."""
+    files = create_sources(tmp_path)
+    target_file = tmp_path / "out" / "target.md"
+    
+    assert concatenate_files_atomic(files, target_file) is True
+    assert target_file.read_text() == read_markdown_files(files)
+    
+    # Unchanged sources leave the target untouched
+    os.utime(target_file, ns=(1_000_000_000, 1_000_000_000))
+    assert concatenate_files_atomic(files, target_file) is False
+    assert target_file.stat().st_mtime_ns == 1_000_000_000
+    
+    # A same-size change is detected by content
+    files[0].write_text("# File X\nContent of file 1")
+    assert concatenate_files_atomic(files, target_file) is True
+    assert target_file.read_text() == read_markdown_files(files)
+
+
+def test_atomic_writes_replace_hardlinks(tmp_path):
+    """Test that outputs hardlinked to a source are replaced even if their content matches."""
+    source_file = tmp_path / "source.md"
+    source_file.write_text("# Test Content")
+    
+    for i, write in enumerate((
+        lambda target: concatenate_files_atomic([source_file], target),
+        lambda target: write_file_atomic(target, "# Test Content"),
+    )):
+        target_file = tmp_path / f"target{i}.md"
+        os.link(source_file, target_file)
+        assert not file_in_sync(source_file, target_file, SyncMode.COPY)
+        
+        assert write(target_file) is True
+        assert not os.path.samefile(source_file, target_file)
+        assert file_in_sync(source_file, target_file, SyncMode.COPY)
+        assert write(target_file) is False
+    
+    assert source_file.stat().st_nlink == 1
+
+
+@pytest.mark.parametrize("unsupported", [["copy_file_range"], ["copy_file_range", "sendfile"]])
+def test_concatenate_files_atomic_fallback(tmp_path, unsupported):
+    """Test falling back when kernel copy mechanisms are unsupported."""
+    files = create_sources(tmp_path)
+    target_file = tmp_path / "target.md"
+    
+    patches = [
+        patch(
+            f'os.{name}', side_effect=OSError(errno.EXDEV, "Mocked unsupported copy"), create=True
+        )
+        for name in unsupported
+    ]
+    for p in patches:
+        p.start()
+    try:
+        assert concatenate_files_atomic(files, target_file) is True
+    finally:
+        for p in patches:
+            p.stop()
+    
+    assert target_file.read_text() == read_markdown_files(files)
+
+
+def test_concatenate_files_atomic_missing_source(tmp_path):
+    """Test that a missing source leaves no partial output behind."""
+    files = create_sources(tmp_path)
+    target_file = tmp_path / "target.md"
+    target_file.write_text("# Previous")
+    
+    with pytest.raises(OSError):
+        concatenate_files_atomic(files + [tmp_path / "missing.md"], target_file)
+    
+    assert target_file.read_text() == "# Previous"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["file1.md", "file2.md", "target.md"]
+
+
+@pytest.fixture
+def sync_cache():
+    """Start and end a test with an empty sync capability cache."""
+    clear_sync_mode_cache()
+    yield
+    clear_sync_mode_cache()
+
+
+def test_sync_file_hardlink(tmp_path, sync_cache):
+    """Test syncing a file with hardlink mode."""
+    source_file = tmp_path / "source.md"
+    source_file.write_text("# Test Content")
+    dest_file = tmp_path / "nested" / "dest.md"
+    dest_file.parent.mkdir()
+    dest_file.write_text("# Old content")
+    
+    strategy = sync_file_with_mode(source_file, dest_file, SyncMode.HARDLINK)
+    
+    assert dest_file.read_text() == "# Test Content"
+    if strategy == SyncMode.HARDLINK:
+        assert os.path.samefile(source_file, dest_file)
+    else:
+        assert strategy == SyncMode.COPY
+    assert file_in_sync(source_file, dest_file, SyncMode.HARDLINK)
+    
+    # Syncing again over the existing link leaves no temporary files
+    assert sync_file(source_file, dest_file, SyncMode.HARDLINK) is True
+    assert [p.name for p in dest_file.parent.iterdir()] == ["dest.md"]
+
+
+def test_sync_file_copy_replaces_links(tmp_path, sync_cache):
+    """Test that copying replaces links to the source instead of writing through them."""
+    source_file = tmp_path / "source.md"
+    source_file.write_text("# Test Content")
+    hardlink_file = tmp_path / "hardlink.md"
+    os.link(source_file, hardlink_file)
+    symlink_file = tmp_path / "symlink.md"
+    symlink_file.symlink_to("source.md")
+    
+    for dest_file in (hardlink_file, symlink_file):
+        assert sync_file_with_mode(source_file, dest_file, SyncMode.COPY) == SyncMode.COPY
+        assert not dest_file.is_symlink()
+        assert not os.path.samefile(source_file, dest_file)
+        assert dest_file.read_text() == "# Test Content"
+    
+    assert os.stat(source_file).st_nlink == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["hardlink.md", "source.md", "symlink.md"]
+
+
+def test_sync_file_reflink(tmp_path, sync_cache):
+    """Test syncing a file with reflink mode, falling back to copy where unsupported."""
+    source_file = tmp_path / "source.md"
+    source_file.write_text("# Test Content")
+    dest_file = tmp_path / "dest.md"
+    
+    strategy = sync_file_with_mode(source_file, dest_file, SyncMode.REFLINK)
+    
+    assert strategy in (SyncMode.REFLINK, SyncMode.COPY)
+    assert not dest_file.is_symlink()
+    assert dest_file.read_text() == "# Test Content"
+    assert resolve_sync_mode(source_file, dest_file, SyncMode.REFLINK) == strategy
+    assert file_in_sync(source_file, dest_file, SyncMode.REFLINK)
+    
+    # Independent copies do not follow later edits of the source
+    source_file.write_text("# Changed")
+    assert dest_file.read_text() == "# Test Content"
+    assert not file_in_sync(source_file, dest_file, SyncMode.REFLINK)
+
+
+def test_sync_file_auto_caches_unsupported_modes(tmp_path, sync_cache):
+    """Test that AUTO mode probes once and remembers unsupported strategies."""
+    source_file = tmp_path / "source.md"
+    source_file.write_text("# Test Content")
+    dest_file = tmp_path / "dest.md"
+    
+    unsupported = OSError(errno.EPERM, "Mocked unsupported link")
+    cross_device = OSError(errno.EXDEV, "Mocked cross-device link")
+    with patch('pathlib.Path.symlink_to', side_effect=unsupported) as mock_symlink, \
+         patch('os.link', side_effect=cross_device) as mock_link:
+        strategy = sync_file_with_mode(source_file, dest_file, SyncMode.AUTO)
+        assert strategy in (SyncMode.REFLINK, SyncMode.COPY)
+        assert mock_symlink.call_count == 1
+        assert mock_link.call_count == 1
+        
+        # Later syncs on the same file systems skip the failed strategies
+        assert sync_file_with_mode(source_file, dest_file, SyncMode.AUTO) == strategy
+        assert sync_file_with_mode(source_file, dest_file, SyncMode.SYMLINK) == SyncMode.COPY
+        assert mock_symlink.call_count == 1
+        assert mock_link.call_count == 1
+    
+    assert dest_file.read_text() == "# Test Content"
+
+
+def test_sync_file_auto_prefers_symlink(tmp_path, sync_cache):
+    """Test that AUTO mode uses a symlink where the file system allows it."""
+    source_file = tmp_path / "source.md"
+    source_file.write_text("# Test Content")
+    dest_file = tmp_path / "dest.md"
+    
+    strategy = sync_file_with_mode(source_file, dest_file, SyncMode.AUTO)
+    
+    assert dest_file.read_text() == "# Test Content"
+    assert (strategy == SyncMode.SYMLINK) == dest_file.is_symlink()
+    assert file_in_sync(source_file, dest_file, SyncMode.AUTO)
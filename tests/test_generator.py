@@ -129,3 +129,154 @@ def test_rule_generator_generate_force_copy(tmp_path):
     assert (tmp_path / "output.md").exists()
     assert not (tmp_path / "output.md").is_symlink()
     assert (tmp_path / "output.md").read_text() == "TRANSFORMED: # Test content"
+
+
+def test_rule_generator_generate_shared_content(tmp_path):
+    """Test generating from pre-combined content without re-reading inputs."""
+    # The input file is never read when content is provided
+    input_file = tmp_path / "missing.md"
+    
+    config = ToolConfig(mode=SyncMode.COPY, output="output.md")
+    generator = TestGenerator("test", config, tmp_path)
+    
+    result = generator.generate([input_file], content="# Shared content")
+    
+    assert result is True
+    assert (tmp_path / "output.md").read_text() == "TRANSFORMED: # Shared content"
+
+
+def test_rule_generator_generate_multiple_files_symlink_mode(tmp_path):
+    """Test that combined output is written as a regular file in symlink mode."""
+    input_file1 = tmp_path / "input1.md"
+    input_file1.write_text("# File 1")
+    
+    input_file2 = tmp_path / "input2.md"
+    input_file2.write_text("# File 2")
+    
+    config = ToolConfig(mode=SyncMode.SYMLINK, output="output.md")
+    generator = TestGenerator("test", config, tmp_path)
+    
+    result = generator.generate([input_file1, input_file2])
+    
+    # The combined content has no single source to link to
+    assert result is True
+    assert not (tmp_path / "output.md").is_symlink()
+    assert (tmp_path / "output.md").read_text() == "TRANSFORMED: # File 1\n\n---\n\n# File 2"
+
+
+def test_rule_generator_generate_unchanged(tmp_path):
+    """Test that regenerating identical content does not rewrite the output."""
+    input_file = tmp_path / "input.md"
+    input_file.write_text("# Test content")
+    
+    config = ToolConfig(mode=SyncMode.COPY, output="output.md")
+    generator = TestGenerator("test", config, tmp_path)
+    
+    assert generator.generate([input_file]) is True
+    assert generator.changed is True
+    
+    assert generator.generate([input_file]) is True
+    assert generator.changed is False
+    
+    input_file.write_text("# New content")
+    assert generator.generate([input_file]) is True
+    assert generator.changed is True
+    assert (tmp_path / "output.md").read_text() == "TRANSFORMED: # New content"
+
+
+def test_rule_generator_identity_transform(tmp_path):
+    """Test that identity generators copy the inputs without transforming them."""
+    class IdentityGenerator(RuleGenerator):
+        identity_transform = True
+        
+        def transform_content(self, content: str) -> str:
+            raise AssertionError("identity generators are not transformed")
+    
+    input_file1 = tmp_path / "input1.md"
+    input_file1.write_text("# File 1")
+    
+    input_file2 = tmp_path / "input2.md"
+    input_file2.write_text("# File 2")
+    
+    config = ToolConfig(mode=SyncMode.COPY, output="output.md")
+    generator = IdentityGenerator("test", config, tmp_path)
+    
+    assert generator.generate([input_file1, input_file2], content="ignored") is True
+    assert generator.changed is True
+    assert (tmp_path / "output.md").read_text() == "# File 1\n\n---\n\n# File 2"
+
+
+def test_rule_generator_check(tmp_path):
+    """Test checking outputs against rendered content without writing."""
+    input_file1 = tmp_path / "input1.md"
+    input_file1.write_text("# File 1")
+    input_file2 = tmp_path / "input2.md"
+    input_file2.write_text("# File 2")
+    output_file = tmp_path / "output.md"
+    
+    config = ToolConfig(mode=SyncMode.COPY, output="output.md")
+    generator = TestGenerator("test", config, tmp_path)
+    
+    # Missing outputs are stale, and checking does not create them
+    assert generator.check([input_file1, input_file2]) == [output_file]
+    assert not output_file.exists()
+    
+    assert generator.generate([input_file1, input_file2]) is True
+    assert generator.check([input_file1, input_file2]) == []
+    
+    # Same size, different content
+    input_file2.write_text("# File 3")
+    assert generator.check([input_file1, input_file2]) == [output_file]
+    assert "File 2" in output_file.read_text()
+
+
+def test_rule_generator_check_links(tmp_path):
+    """Test that linked outputs are up to date as symlinks or identical copies."""
+    input_file = tmp_path / "input.md"
+    input_file.write_text("# Test content")
+    output_file = tmp_path / "output.md"
+    
+    config = ToolConfig(mode=SyncMode.SYMLINK, output="output.md")
+    generator = TestGenerator("test", config, tmp_path)
+    
+    assert generator.generate([input_file]) is True
+    assert output_file.is_symlink()
+    assert generator.check([input_file]) == []
+    
+    # A checkout can turn links into plain files
+    output_file.unlink()
+    output_file.write_text("# Test content")
+    assert generator.check([input_file]) == []
+    
+    # A symlink elsewhere is stale, even to a file with the same content
+    other_file = tmp_path / "other.md"
+    other_file.write_text("# Test content")
+    output_file.unlink()
+    output_file.symlink_to(other_file)
+    assert generator.check([input_file]) == [output_file]
+    
+    # Copy mode expects a regular file
+    assert generator.check([input_file], SyncMode.COPY) == [output_file]
+
+
+def test_rule_generator_check_identity_transform(tmp_path):
+    """Test checking outputs concatenated without a transformation."""
+    class IdentityGenerator(RuleGenerator):
+        identity_transform = True
+        
+        def transform_content(self, content: str) -> str:
+            raise AssertionError("identity generators are not transformed")
+    
+    input_file1 = tmp_path / "input1.md"
+    input_file1.write_text("# File 1")
+    input_file2 = tmp_path / "input2.md"
+    input_file2.write_text("# File 2")
+    
+    config = ToolConfig(mode=SyncMode.COPY, output="output.md")
+    generator = IdentityGenerator("test", config, tmp_path)
+    
+    assert generator.generate([input_file1, input_file2]) is True
+    assert generator.check([input_file1, input_file2]) == []
+    
+    (tmp_path / "output.md").write_text("# File 1\n\n---\n\n# File X")
+    assert generator.check([input_file1, input_file2]) == [tmp_path / "output.md"]
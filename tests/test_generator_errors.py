@@ -34,8 +34,8 @@ class TestGeneratorErrorHandling:
         # Check result
         assert result is False
 
-    def test_generate_temporary_file_error(self, tmp_path):
-        """Test generate method when temporary file creation fails."""
+    def test_generate_write_error(self, tmp_path):
+        """Test generate method when writing the output file fails."""
         # Create a test file
         test_file = tmp_path / "test.md"
         test_file.write_text("# Test Content")
@@ -45,8 +45,8 @@ class TestGeneratorErrorHandling:
         generator = self.TestGenerator("test", config, tmp_path)
         
         # ケース1: 単一ファイルでsymlink以外の場合に例外処理が機能するか確認
-        with patch('airulefy.generator.base.NamedTemporaryFile',
-                   side_effect=IOError("Mocked temporary file error")):
+        with patch('airulefy.generator.base.write_file_atomic',
+                   side_effect=IOError("Mocked write error")):
             with patch('builtins.print') as mock_print:
                 # Call generate with COPY mode to ensure we go into the try block
                 result = generator.generate([test_file], force_mode=SyncMode.COPY)
@@ -65,8 +65,8 @@ class TestGeneratorErrorHandling:
         config = ToolConfig()
         generator = self.TestGenerator("test", config, tmp_path)
         
-        # Mock sync_file to return False
-        with patch('airulefy.generator.base.sync_file', return_value=False):
+        # Mock the sync to fail
+        with patch('airulefy.generator.base.sync_file_with_mode', return_value=None):
             # Call generate
             result = generator.generate([test_file])
             
@@ -86,11 +86,11 @@ class TestGeneratorErrorHandling:
         generator = self.TestGenerator("test", config, tmp_path)
         
         # Mock combining function to raise an exception
-        with patch('airulefy.generator.base.combine_markdown_files', 
+        with patch('airulefy.generator.base.iter_markdown_files', 
                    side_effect=Exception("Unexpected error")):
             # Capture output to verify error message
             with patch('builtins.print') as mock_print:
-                # Call generate with multiple files to ensure combine_markdown_files is called
+                # Call generate with multiple files to ensure iter_markdown_files is called
                 result = generator.generate([test_file, test_file2], force_mode=SyncMode.COPY)
                 
                 # Check result
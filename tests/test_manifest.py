@@ -0,0 +1,200 @@
+"""
+Test the incremental build manifest.
+"""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from airulefy.manifest import (
+    MANIFEST_PATH,
+    RACY_WINDOW_NS,
+    BuildManifest,
+    hash_file,
+    inputs_digest,
+    load_manifest,
+    record_output,
+    save_manifest,
+)
+
+
+def make_old(path: Path) -> None:
+    """Give a file an mtime well before any recent scan."""
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+
+def test_scan_inputs_hashes_new_files(tmp_path):
+    """Test that unknown input files are hashed."""
+    input_file = tmp_path / "rules.md"
+    input_file.write_text("# Rules")
+    
+    inputs = BuildManifest().scan_inputs([input_file], tmp_path)
+    
+    assert list(inputs) == ["rules.md"]
+    assert inputs["rules.md"].size == len("# Rules")
+    assert inputs["rules.md"].sha256 == hash_file(input_file)
+
+
+def test_scan_inputs_reuses_known_hashes(tmp_path):
+    """Test that files with unchanged size and mtime are not read again."""
+    input_file = tmp_path / "rules.md"
+    input_file.write_text("# Rules")
+    make_old(input_file)
+    
+    manifest = BuildManifest(scanned_at_ns=10 * RACY_WINDOW_NS)
+    manifest.inputs = manifest.scan_inputs([input_file], tmp_path)
+    
+    with patch('airulefy.manifest.hash_file') as mock_hash:
+        inputs = manifest.scan_inputs([input_file], tmp_path)
+        mock_hash.assert_not_called()
+    
+    assert inputs == manifest.inputs
+
+
+def test_scan_inputs_rehashes_racy_files(tmp_path):
+    """Test that files modified close to the last scan are hashed again."""
+    input_file = tmp_path / "rules.md"
+    input_file.write_text("# Rules")
+    
+    manifest = BuildManifest(scanned_at_ns=input_file.stat().st_mtime_ns)
+    manifest.inputs = manifest.scan_inputs([input_file], tmp_path)
+    
+    with patch('airulefy.manifest.hash_file', return_value="changed") as mock_hash:
+        inputs = manifest.scan_inputs([input_file], tmp_path)
+        mock_hash.assert_called_once()
+    
+    assert inputs["rules.md"].sha256 == "changed"
+
+
+def test_inputs_digest_depends_on_paths_and_content(tmp_path):
+    """Test that the inputs digest changes with paths and content."""
+    file1 = tmp_path / "a.md"
+    file1.write_text("# A")
+    file2 = tmp_path / "b.md"
+    file2.write_text("# B")
+    
+    manifest = BuildManifest()
+    both = inputs_digest(manifest.scan_inputs([file1, file2], tmp_path))
+    only_first = inputs_digest(manifest.scan_inputs([file1], tmp_path))
+    
+    file2.write_text("# B changed")
+    changed = inputs_digest(manifest.scan_inputs([file1, file2], tmp_path))
+    
+    assert len({both, only_first, changed}) == 3
+
+
+def test_is_output_current(tmp_path):
+    """Test detecting whether a recorded output is still up to date."""
+    output_file = tmp_path / "output.md"
+    output_file.write_text("# Output")
+    
+    manifest = BuildManifest()
+    manifest.outputs["test"] = record_output("config", "inputs", [output_file], tmp_path)
+    
+    assert manifest.is_output_current("test", "config", "inputs", tmp_path)
+    assert not manifest.is_output_current("other", "config", "inputs", tmp_path)
+    assert not manifest.is_output_current("test", "changed", "inputs", tmp_path)
+    assert not manifest.is_output_current("test", "config", "changed", tmp_path)
+    
+    # Modifying the output invalidates the record
+    output_file.write_text("# Edited by hand")
+    assert not manifest.is_output_current("test", "config", "inputs", tmp_path)
+    
+    output_file.unlink()
+    assert not manifest.is_output_current("test", "config", "inputs", tmp_path)
+
+
+def test_is_output_current_symlink(tmp_path):
+    """Test detecting whether a recorded symlink output is still up to date."""
+    source_file = tmp_path / "source.md"
+    source_file.write_text("# Source")
+    output_file = tmp_path / "output.md"
+    try:
+        output_file.symlink_to("source.md")
+    except (OSError, NotImplementedError):
+        pytest.skip("Symlinks are not supported on this platform")
+    
+    manifest = BuildManifest()
+    manifest.outputs["test"] = record_output("config", "inputs", [output_file], tmp_path)
+    assert manifest.outputs["test"].files["output.md"].link_target == "source.md"
+    assert manifest.is_output_current("test", "config", "inputs", tmp_path)
+    
+    # Replacing the symlink with a regular file invalidates the record
+    output_file.unlink()
+    output_file.write_text("# Source")
+    assert not manifest.is_output_current("test", "config", "inputs", tmp_path)
+
+
+def test_is_output_current_multiple_files(tmp_path):
+    """Test that every output file of a tool must be unmodified."""
+    output_files = [tmp_path / "rules" / "a.mdc", tmp_path / "rules" / "b.mdc"]
+    output_files[0].parent.mkdir()
+    for output_file in output_files:
+        output_file.write_text(f"# {output_file.stem}")
+    
+    manifest = BuildManifest()
+    manifest.outputs["test"] = record_output("config", "inputs", output_files, tmp_path)
+    assert set(manifest.outputs["test"].files) == {"rules/a.mdc", "rules/b.mdc"}
+    assert manifest.is_output_current("test", "config", "inputs", tmp_path)
+    
+    output_files[1].unlink()
+    assert not manifest.is_output_current("test", "config", "inputs", tmp_path)
+
+
+def test_record_output_reuses_unmodified_files(tmp_path):
+    """Test that unmodified output files are not hashed again."""
+    output_file = tmp_path / "output.md"
+    output_file.write_text("# Output")
+    previous = record_output("config", "inputs", [output_file], tmp_path)
+    
+    with patch('airulefy.manifest.hash_file') as mock_hash:
+        record = record_output("config", "changed", [output_file], tmp_path, previous)
+        mock_hash.assert_not_called()
+    
+    assert record.files == previous.files
+
+
+def test_changed_inputs(tmp_path):
+    """Test finding new and modified input files."""
+    file1 = tmp_path / "a.md"
+    file1.write_text("# A")
+    file2 = tmp_path / "b.md"
+    file2.write_text("# B")
+    
+    manifest = BuildManifest()
+    manifest.inputs = manifest.scan_inputs([file1, file2], tmp_path)
+    
+    file2.write_text("# B changed")
+    file3 = tmp_path / "c.md"
+    file3.write_text("# C")
+    inputs = manifest.scan_inputs([file1, file2, file3], tmp_path)
+    
+    assert manifest.changed_inputs(inputs, tmp_path) == {file2, file3}
+
+
+def test_save_and_load_manifest(tmp_path):
+    """Test saving and loading the manifest."""
+    input_file = tmp_path / "rules.md"
+    input_file.write_text("# Rules")
+    
+    manifest = BuildManifest(scanned_at_ns=42)
+    manifest.inputs = manifest.scan_inputs([input_file], tmp_path)
+    
+    assert save_manifest(tmp_path, manifest) is True
+    assert (tmp_path / MANIFEST_PATH).exists()
+    assert load_manifest(tmp_path) == manifest
+
+
+def test_load_manifest_invalid(tmp_path):
+    """Test that missing or corrupt manifests load as empty."""
+    assert load_manifest(tmp_path) == BuildManifest()
+    
+    manifest_path = tmp_path / MANIFEST_PATH
+    manifest_path.parent.mkdir()
+    manifest_path.write_text("{not json")
+    assert load_manifest(tmp_path) == BuildManifest()
+    
+    manifest_path.write_text('{"version": 999}')
+    assert load_manifest(tmp_path) == BuildManifest()
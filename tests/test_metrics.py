@@ -0,0 +1,75 @@
+"""
+Test the watch mode metrics.
+"""
+
+from airulefy.build import ToolResult, ToolStatus
+from airulefy.metrics import Histogram, MetricsExporter, WatchMetrics
+
+
+def test_histogram_buckets_and_quantiles():
+    """Test recording observations into buckets."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 0.6, 3.0):
+        histogram.observe(value)
+    
+    assert histogram.counts == [1, 2, 1]
+    assert histogram.count == 4
+    assert histogram.sum == 4.15
+    assert histogram.quantile(0.5) == 1.0
+    # Above all bounds, the largest observation is the best estimate
+    assert histogram.quantile(1.0) == 3.0
+
+
+def test_record_regeneration():
+    """Test counting events and timing rebuilds per project and tool."""
+    metrics = WatchMetrics()
+    results = [
+        ToolResult(tool_name="cursor", status=ToolStatus.GENERATED, duration=0.002),
+        ToolResult(tool_name="cline", status=ToolStatus.UNCHANGED),
+    ]
+    metrics.record_regeneration("/project", 0.4, event_count=5, results=results)
+    metrics.record_regeneration("/project", 0.2, event_count=1, suppressed=2)
+    
+    text = metrics.render()
+    assert 'airulefy_watch_event_to_rebuild_seconds_bucket{project="/project",le="0.25"} 1' in text
+    assert 'airulefy_watch_event_to_rebuild_seconds_bucket{project="/project",le="+Inf"} 2' in text
+    assert 'airulefy_watch_event_to_rebuild_seconds_count{project="/project"} 2' in text
+    assert 'airulefy_watch_tool_rebuild_seconds_count{project="/project",tool="cursor"} 1' in text
+    # Tools left alone are not timed
+    assert 'tool="cline"' not in text
+    assert 'airulefy_watch_rebuilds_total{project="/project"} 1' in text
+    assert 'airulefy_watch_coalesced_events_total{project="/project"} 4' in text
+    assert 'airulefy_watch_suppressed_events_total{project="/project"} 2' in text
+    assert "# TYPE airulefy_watch_rescans_total counter" in text
+    
+    summary = metrics.summary()
+    assert "/project: 1 rebuilds, 4 coalesced events, 2 suppressed events, 0 rescans" in summary
+    assert "event to rebuild: 2 runs" in summary
+    assert "cursor: 1 runs" in summary
+
+
+def test_render_escapes_labels():
+    """Test that label values are escaped."""
+    metrics = WatchMetrics()
+    metrics.record_regeneration('/odd "name"', None, event_count=2)
+    
+    assert 'project="/odd \\"name\\""' in metrics.render()
+
+
+def test_summary_without_changes():
+    """Test the summary before anything happened."""
+    assert WatchMetrics().summary() == "No changes handled yet."
+
+
+def test_metrics_exporter_writes_file(tmp_path):
+    """Test that the exporter writes the metrics on start and stop."""
+    metrics = WatchMetrics()
+    metrics_file = tmp_path / "metrics" / "airulefy.prom"
+    exporter = MetricsExporter(metrics, metrics_file, interval=60)
+    
+    exporter.start()
+    assert "airulefy_watch_rebuilds_total" in metrics_file.read_text()
+    
+    metrics.record_regeneration("/project", 0.1, event_count=1, results=[])
+    exporter.stop()
+    assert 'airulefy_watch_rebuilds_total{project="/project"} 1' in metrics_file.read_text()
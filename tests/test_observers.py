@@ -0,0 +1,173 @@
+"""
+Test the observers sharing one thread between their watches.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+import pytest
+from watchdog.events import FileSystemEventHandler
+
+from airulefy.observers import InotifyObserver
+
+pytestmark = pytest.mark.skipif(
+    not InotifyObserver.is_supported(), reason="inotify is not available"
+)
+
+
+class RecordingHandler(FileSystemEventHandler):
+    """Event handler recording the event types and paths it receives."""
+    
+    def __init__(self):
+        self.events = []
+        self._condition = threading.Condition()
+    
+    def on_any_event(self, event):
+        with self._condition:
+            self.events.append((event.event_type, event.src_path, getattr(event, "dest_path", "")))
+            self._condition.notify_all()
+    
+    def wait_for(self, *expected, timeout=2.0):
+        """Wait until events with the given type and path have been received."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: all(
+                    any(event[:2] == item for event in self.events) for item in expected
+                ),
+                timeout,
+            )
+
+
+def count_inotify_instances():
+    """Count the inotify instances open in this process."""
+    count = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}") == "anon_inode:inotify":
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+@pytest.fixture
+def observer():
+    observer = InotifyObserver()
+    yield observer
+    observer.stop()
+    observer.join()
+
+
+def test_inotify_observer_reports_changes(tmp_path, observer):
+    """Test that created, modified, moved and deleted files are reported."""
+    main_file = tmp_path / "main.md"
+    main_file.write_text("# Main")
+    handler = RecordingHandler()
+    observer.schedule(handler, str(tmp_path), recursive=True)
+    observer.start()
+    
+    main_file.write_text("# Main changed")
+    (tmp_path / "new.md").write_text("# New")
+    os.rename(tmp_path / "new.md", tmp_path / "renamed.md")
+    main_file.unlink()
+    
+    assert handler.wait_for(
+        ("modified", str(main_file)),
+        ("created", str(tmp_path / "new.md")),
+        ("moved", str(tmp_path / "new.md")),
+        ("deleted", str(main_file)),
+    )
+    assert ("moved", str(tmp_path / "new.md"), str(tmp_path / "renamed.md")) in handler.events
+
+
+def test_inotify_observer_follows_new_directories(tmp_path, observer):
+    """Test that directories created below a recursive watch are watched, except ignored ones."""
+    handler = RecordingHandler()
+    observer.schedule(handler, str(tmp_path), recursive=True)
+    observer.start()
+    
+    (tmp_path / "sub" / "deeper").mkdir(parents=True)
+    (tmp_path / "node_modules").mkdir()
+    assert handler.wait_for(
+        ("created", str(tmp_path / "sub")), ("created", str(tmp_path / "node_modules"))
+    )
+    
+    nested_file = tmp_path / "sub" / "deeper" / "nested.md"
+    nested_file.write_text("# Nested")
+    (tmp_path / "node_modules" / "readme.md").write_text("# Dependency")
+    assert handler.wait_for(("created", str(nested_file)))
+    
+    time.sleep(0.1)
+    assert not any("readme.md" in event[1] for event in handler.events)
+    assert str(tmp_path / "node_modules") not in observer._descriptors
+
+
+def test_inotify_observer_rearms_recreated_directory(tmp_path, observer):
+    """Test that a watched directory deleted and created again is watched again."""
+    watched_dir = tmp_path / ".ai"
+    watched_dir.mkdir()
+    handler = RecordingHandler()
+    observer.schedule(handler, str(tmp_path), recursive=False)
+    observer.schedule(handler, str(watched_dir), recursive=True)
+    observer.start()
+    
+    shutil.rmtree(watched_dir)
+    assert handler.wait_for(("deleted", str(watched_dir)))
+    watched_dir.mkdir()
+    assert handler.wait_for(("created", str(watched_dir)))
+    
+    main_file = watched_dir / "main.md"
+    main_file.write_text("# Main")
+    assert handler.wait_for(("created", str(main_file)))
+
+
+def test_inotify_observer_shares_one_instance(tmp_path, observer):
+    """Test that more watches than the limit of inotify instances share one instance and thread."""
+    instances = count_inotify_instances()
+    threads = threading.active_count()
+    handler = RecordingHandler()
+    
+    watches = []
+    for i in range(200):
+        directory = tmp_path / f"p{i}"
+        (directory / ".ai").mkdir(parents=True)
+        watches.append(observer.schedule(handler, str(directory), recursive=False))
+        watches.append(observer.schedule(handler, str(directory / ".ai"), recursive=True))
+    observer.start()
+    
+    assert count_inotify_instances() == instances + 1
+    assert threading.active_count() == threads + 1
+    
+    main_file = tmp_path / "p199" / ".ai" / "main.md"
+    main_file.write_text("# Main")
+    assert handler.wait_for(("created", str(main_file)))
+    
+    # Unscheduling drops the inotify watches
+    for watch in watches:
+        observer.unschedule(watch)
+    assert observer._descriptors == {}
+    with pytest.raises(KeyError):
+        observer.unschedule(watches[0])
+
+
+def test_inotify_observer_symlink_policy(tmp_path, observer):
+    """Test that symlinked directories are only watched when following symlinks."""
+    vendored_dir = tmp_path / "vendor"
+    (vendored_dir / "nested").mkdir(parents=True)
+    watched_dir = tmp_path / ".ai"
+    watched_dir.mkdir()
+    try:
+        (watched_dir / "vendor").symlink_to(vendored_dir, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("Symlinks are not supported on this platform")
+    handler = RecordingHandler()
+    
+    watch = observer.schedule(handler, str(watched_dir), recursive=True)
+    assert str(watched_dir / "vendor") not in observer._descriptors
+    observer.unschedule(watch)
+    
+    observer.schedule(handler, str(watched_dir), recursive=True, follow_symlinks=True)
+    assert str(watched_dir / "vendor") in observer._descriptors
+    assert str(watched_dir / "vendor" / "nested") in observer._descriptors
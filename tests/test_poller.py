@@ -0,0 +1,210 @@
+"""
+Test the polling file system observers.
+"""
+
+import os
+import threading
+import time
+from threading import Event
+from unittest.mock import MagicMock
+
+import pytest
+from watchdog.events import FileSystemEventHandler
+
+from airulefy.poller import (
+    AdaptivePollingObserver,
+    AutoObserver,
+    PolledDirectory,
+    WatchBackend,
+)
+
+
+def event_set(events):
+    """Get the event types and paths of events."""
+    return {(event.event_type, event.src_path) for event in events}
+
+
+def test_snapshot_records_only_rule_files(tmp_path):
+    """Test that the snapshot skips unrelated files and ignored directories."""
+    (tmp_path / "main.md").write_text("# Main")
+    (tmp_path / "image.png").write_bytes(b"png")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "nested.md").write_text("# Nested")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "readme.md").write_text("# Dependency")
+    
+    directory = PolledDirectory(str(tmp_path), recursive=True)
+    
+    assert set(directory.take_snapshot()) == {
+        str(tmp_path / "main.md"),
+        str(tmp_path / "sub"),
+        str(tmp_path / "sub" / "nested.md"),
+    }
+    
+    # Without recursion, subdirectories are recorded but not entered
+    directory = PolledDirectory(str(tmp_path), recursive=False)
+    assert set(directory.take_snapshot()) == {str(tmp_path / "main.md"), str(tmp_path / "sub")}
+
+
+def test_snapshot_symlink_policy(tmp_path):
+    """Test that symlinked directories are only entered when following symlinks."""
+    vendored_dir = tmp_path / "vendor"
+    vendored_dir.mkdir()
+    (vendored_dir / "vendored.md").write_text("# Vendored")
+    polled_dir = tmp_path / ".ai"
+    polled_dir.mkdir()
+    try:
+        (polled_dir / "vendor").symlink_to(vendored_dir, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("Symlinks are not supported on this platform")
+    
+    assert PolledDirectory(str(polled_dir), recursive=True).take_snapshot() == {}
+    followed = PolledDirectory(str(polled_dir), recursive=True, follow_symlinks=True)
+    snapshot = followed.take_snapshot()
+    assert set(snapshot) == {str(polled_dir / "vendor"), str(polled_dir / "vendor" / "vendored.md")}
+
+
+def test_polled_directory_reports_changes(tmp_path):
+    """Test that polling reports created, modified and deleted files."""
+    main_file = tmp_path / "main.md"
+    main_file.write_text("# Main")
+    old_file = tmp_path / "old.md"
+    old_file.write_text("# Old")
+    
+    directory = PolledDirectory(str(tmp_path), recursive=True)
+    
+    main_file.write_text("# Main changed")
+    old_file.unlink()
+    (tmp_path / "new.md").write_text("# New")
+    (tmp_path / "notes.txt").write_text("Notes")
+    
+    assert event_set(directory.poll()) == {
+        ("modified", str(main_file)),
+        ("deleted", str(old_file)),
+        ("created", str(tmp_path / "new.md")),
+    }
+    assert directory.poll() == []
+
+
+def test_polling_observer_backs_off_when_idle(tmp_path):
+    """Test that the polling interval grows while idle and resets on changes."""
+    handler = MagicMock()
+    observer = AdaptivePollingObserver(min_interval=0.01, max_interval=0.04)
+    observer.schedule(handler, str(tmp_path), recursive=True)
+    
+    observer.poll()
+    observer.poll()
+    assert observer.interval == 0.04
+    observer.poll()
+    assert observer.interval == 0.04
+    
+    (tmp_path / "main.md").write_text("# Main")
+    assert observer.poll()
+    assert observer.interval == 0.01
+    assert event_set(call.args[0] for call in handler.dispatch.call_args_list) == {
+        ("created", str(tmp_path / "main.md"))
+    }
+
+
+def test_polling_observer_shares_one_thread(tmp_path):
+    """Test that all watches are polled by a single thread."""
+    handler = MagicMock()
+    observer = AdaptivePollingObserver(min_interval=0.01, max_interval=0.05)
+    watches = []
+    for i in range(50):
+        (tmp_path / f"p{i}").mkdir()
+        watches.append(observer.schedule(handler, str(tmp_path / f"p{i}"), recursive=True))
+    
+    threads = threading.active_count()
+    observer.start()
+    try:
+        assert threading.active_count() == threads + 1
+        
+        # Unscheduled watches are no longer polled
+        observer.unschedule(watches[0])
+        (tmp_path / "p0" / "main.md").write_text("# Main")
+        (tmp_path / "p49" / "main.md").write_text("# Main")
+        deadline = time.monotonic() + 2
+        while not handler.dispatch.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert event_set(call.args[0] for call in handler.dispatch.call_args_list) == {
+            ("created", str(tmp_path / "p49" / "main.md"))
+        }
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def test_polling_observer_dispatches_events(tmp_path):
+    """Test the polling observer end to end."""
+    received = Event()
+    handler = FileSystemEventHandler()
+    handler.on_created = lambda event: received.set()
+    
+    observer = AdaptivePollingObserver(min_interval=0.01, max_interval=0.05)
+    observer.schedule(handler, str(tmp_path), recursive=True)
+    observer.start()
+    try:
+        (tmp_path / "main.md").write_text("# Main")
+        assert received.wait(2)
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def test_auto_observer_keeps_native_events():
+    """Test that a native event stops polling."""
+    native, polling = MagicMock(), MagicMock()
+    observer = AutoObserver(native, polling)
+    handler = MagicMock()
+    observer.schedule(handler, "/project", recursive=True)
+    
+    native_tap = native.schedule.call_args[0][0]
+    polling_tap = polling.schedule.call_args[0][0]
+    polling_tap.dispatch("polled")
+    native_tap.dispatch("native")
+    
+    assert observer.backend == WatchBackend.NATIVE
+    polling.stop.assert_called_once()
+    handler.dispatch.assert_called_once_with("native")
+    
+    # Later watches only use the native observer
+    observer.schedule(handler, "/other", recursive=True)
+    assert polling.schedule.call_count == 1
+
+
+def test_auto_observer_switches_to_polling():
+    """Test that changes missed by the native observer switch to polling."""
+    native, polling = MagicMock(), MagicMock()
+    stopped = Event()
+    native.stop.side_effect = lambda: stopped.set()
+    on_fallback = MagicMock()
+    observer = AutoObserver(native, polling, grace=0.01, on_fallback=on_fallback)
+    handler = MagicMock()
+    observer.schedule(handler, "/project", recursive=True)
+    
+    polling_tap = polling.schedule.call_args[0][0]
+    polling_tap.dispatch("polled")
+    
+    # The native observer is stopped after the grace period
+    assert stopped.wait(2)
+    assert observer.backend == WatchBackend.POLLING
+    on_fallback.assert_called_once_with()
+    # The change seen before switching is passed on
+    handler.dispatch.assert_called_once_with("polled")
+    
+    polling_tap.dispatch("later")
+    assert handler.dispatch.call_count == 2
+
+
+def test_auto_observer_native_failure():
+    """Test that a native observer failing to start switches to polling."""
+    native, polling = MagicMock(), MagicMock()
+    native.schedule.side_effect = OSError(28, os.strerror(28))
+    observer = AutoObserver(native, polling)
+    
+    native_watch, polling_watch = observer.schedule(MagicMock(), "/project", recursive=True)
+    
+    assert observer.backend == WatchBackend.POLLING
+    assert native_watch is None
+    assert polling_watch is polling.schedule.return_value
@@ -0,0 +1,98 @@
+"""
+Test per-phase profiling.
+"""
+
+import json
+import os
+import pstats
+
+import pytest
+
+from airulefy.build import RuleBuilder
+from airulefy.config import AirulefyConfig, SyncMode
+from airulefy.profiling import Profiler, profile_phase, profiling
+
+# Whether the platform reports I/O per thread
+HAS_THREAD_IO = os.path.exists("/proc/thread-self/io")
+
+
+def test_profiler_phases(tmp_path):
+    """Test that repeated phases are added up per name and tool."""
+    data_file = tmp_path / "data.bin"
+    data_file.write_bytes(b"x" * 1000)
+    profiler = Profiler()
+    
+    for _ in range(2):
+        with profiler.phase("read"):
+            data_file.read_bytes()
+    with profiler.phase("write", "cursor"):
+        (tmp_path / "out.bin").write_bytes(b"y" * 300)
+    
+    report = profiler.report()
+    assert [(p.phase, p.tool, p.calls) for p in report.phases] == [
+        ("read", None, 2),
+        ("write", "cursor", 1),
+    ]
+    assert all(p.wall_time >= 0 and p.cpu_time >= 0 for p in report.phases)
+    assert report.wall_time >= sum(p.wall_time for p in report.phases)
+    
+    if HAS_THREAD_IO:
+        assert (report.phases[0].bytes_read, report.phases[0].bytes_written) == (2000, 0)
+        assert (report.phases[1].bytes_read, report.phases[1].bytes_written) == (0, 300)
+
+
+def test_profile_phase_without_profiler():
+    """Test that phases are not measured without a profiler."""
+    with profile_phase(None, "read"):
+        pass
+
+
+def test_profiling_writes_reports(tmp_path):
+    """Test writing the phase report and a cProfile dump."""
+    report_path = tmp_path / "profile.json"
+    stats_path = tmp_path / "profile.pstats"
+    
+    with profiling(report_path, stats_path) as profiler:
+        with profiler.phase("work"):
+            sum(range(1000))
+    
+    report = json.loads(report_path.read_text())
+    assert report["phases"][0]["phase"] == "work"
+    assert "wall_time" in report and "cpu_time" in report
+    assert pstats.Stats(str(stats_path)).total_calls > 0
+    
+    with profiling() as profiler:
+        assert profiler is None
+
+
+def test_builder_records_phases(tmp_path):
+    """Test the phases recorded by a build and a check."""
+    ai_dir = tmp_path / ".ai"
+    ai_dir.mkdir()
+    (ai_dir / "main.md").write_text("# Main Rules")
+    (ai_dir / "secondary.md").write_text("# Secondary Rules")
+    
+    profiler = Profiler()
+    builder = RuleBuilder(tmp_path, AirulefyConfig(default_mode=SyncMode.COPY), profiler=profiler)
+    input_files = builder.find_input_files()
+    builder.build(input_files)
+    builder.check(input_files)
+    
+    phases = {(p.phase, p.tool): p for p in profiler.report().phases}
+    tools = ["cursor", "cline", "copilot", "devin"]
+    assert set(phases) == {
+        ("discovery", None),
+        ("scan", None),
+        ("read", None),
+        ("save", None),
+        *(("generate", tool) for tool in tools),
+        *(("record", tool) for tool in tools),
+        *(("check", tool) for tool in tools),
+    }
+    assert phases[("read", None)].calls == 2
+    
+    if HAS_THREAD_IO:
+        # The combined output was written once by each tool
+        size = len((tmp_path / ".cline-rules").read_bytes())
+        assert phases[("generate", "cline")].bytes_written >= size
+        assert phases[("check", "cline")].bytes_written == 0
@@ -0,0 +1,96 @@
+"""
+Test the start-up cost of the CLI.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Root of the repository, put on the path of the measured interpreters
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Generous budgets in seconds for the imports of the hot commands, which
+# take about 0.07s and 0.2s on a laptop
+VERSION_IMPORT_BUDGET = 0.2
+GENERATE_IMPORT_BUDGET = 0.5
+
+# Modules only the watch and list-tools commands need
+WATCH_ONLY_MODULES = (
+    "watchdog",
+    "airulefy.watcher",
+    "airulefy.poller",
+    "airulefy.observers",
+    "airulefy.metrics",
+)
+LIST_TOOLS_ONLY_MODULES = ("rich.table",)
+
+
+def measure_imports(args: List[str], cwd: Path) -> Tuple[float, Dict[str, int]]:
+    """
+    Run the CLI under -X importtime.
+    
+    Args:
+        args: Command line arguments for the CLI
+        cwd: Working directory to run the CLI in
+    
+    Returns:
+        Tuple[float, Dict[str, int]]: Total import time in seconds and the
+        cumulative import time in microseconds of each imported module
+    """
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "airulefy", *args],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    
+    total = 0
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+        # Nested imports are included in the cumulative time of top-level ones
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total / 1_000_000, modules
+
+
+def best_of(runs: int, args: List[str], cwd: Path) -> Tuple[float, Dict[str, int]]:
+    """Measure several runs and keep the fastest, to tolerate noisy machines."""
+    return min((measure_imports(args, cwd) for _ in range(runs)), key=lambda run: run[0])
+
+
+def test_version_imports(tmp_path):
+    """Test that --version loads neither the configuration nor watch mode."""
+    total, modules = best_of(3, ["--version"], tmp_path)
+    
+    for module in ("pydantic", "yaml", *WATCH_ONLY_MODULES, *LIST_TOOLS_ONLY_MODULES):
+        assert module not in modules
+    assert total < VERSION_IMPORT_BUDGET
+
+
+def test_generate_imports(tmp_path):
+    """Test that generating unchanged rules does not load watch mode."""
+    (tmp_path / ".ai").mkdir()
+    (tmp_path / ".ai" / "main.md").write_text("# Main Rules")
+    subprocess.run(
+        [sys.executable, "-m", "airulefy", "generate"],
+        cwd=tmp_path,
+        env=dict(os.environ, PYTHONPATH=str(REPO_ROOT)),
+        capture_output=True,
+        check=True,
+    )
+    
+    total, modules = best_of(3, ["generate"], tmp_path)
+    
+    assert "airulefy.build" in modules
+    for module in (*WATCH_ONLY_MODULES, *LIST_TOOLS_ONLY_MODULES):
+        assert module not in modules
+    assert total < GENERATE_IMPORT_BUDGET
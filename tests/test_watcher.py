@@ -8,8 +8,23 @@ from threading import Event, Thread
 from typing import Optional
 
 import pytest
+from watchdog.events import (
+    DirDeletedEvent,
+    DirModifiedEvent,
+    FileCreatedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileOpenedEvent,
+    FileSystemEvent,
+)
 
-from airulefy.watcher import RuleChangeHandler
+from airulefy.watcher import ChangeSet, RuleChangeHandler
+
+
+class FileClosedNoWriteEvent(FileSystemEvent):
+    """Event of watchdog 5 and later for a file closed without writing."""
+    
+    event_type = "closed_no_write"
 
 
 def test_rule_change_handler():
@@ -17,63 +32,213 @@ def test_rule_change_handler():
     # Setup tracker for callback
     callback_triggered = Event()
     
-    def callback():
+    def callback(changes):
         callback_triggered.set()
     
     # Create handler
-    handler = RuleChangeHandler(callback)
+    handler = RuleChangeHandler(callback, quiet_period=0.01)
     
     # Simulate file events
     class MockEvent:
         def __init__(self, path, is_dir=False):
             self.src_path = path
             self.is_directory = is_dir
+            self.event_type = "modified"
     
     # Simulate Markdown file change
     handler.on_any_event(MockEvent("test/file.md"))
-    assert callback_triggered.is_set()
+    assert callback_triggered.wait(1)
     
     # Reset and test non-markdown file
     callback_triggered.clear()
     handler.on_any_event(MockEvent("test/file.txt"))
-    assert not callback_triggered.is_set()
+    assert not handler.pending
     
     # Reset and test directory event
-    callback_triggered.clear()
     handler.on_any_event(MockEvent("test/dir", is_dir=True))
+    assert not handler.pending
     assert not callback_triggered.is_set()
 
 
-def test_cooldown():
-    """Test that the handler respects cooldown period."""
-    # Setup tracker for callback count
-    callback_count = 0
+def test_debounce_runs_after_last_event():
+    """Test that a burst of events triggers one callback after the last event."""
+    # Setup tracker for callback times
+    calls = []
+    done = Event()
     
-    def callback():
-        nonlocal callback_count
-        callback_count += 1
+    def callback(changes):
+        calls.append(time.monotonic())
+        done.set()
     
-    # Create handler with cooldown
-    handler = RuleChangeHandler(callback)
-    handler.cooldown = 0.1  # Short cooldown for testing
+    handler = RuleChangeHandler(callback, quiet_period=0.1, max_latency=5.0)
     
-    # Simulate rapid file events
     class MockEvent:
         def __init__(self, path):
             self.src_path = path
             self.is_directory = False
+            self.event_type = "modified"
     
-    # First event should trigger
-    handler.on_any_event(MockEvent("test/file.md"))
-    assert callback_count == 1
+    # Events keep arriving within the quiet period
+    for i in range(5):
+        handler.on_any_event(MockEvent(f"test/file{i}.md"))
+        time.sleep(0.03)
+    last_event = time.monotonic()
     
-    # Second event immediately after should not trigger due to cooldown
-    handler.on_any_event(MockEvent("test/file2.md"))
-    assert callback_count == 1
-    
-    # Wait for cooldown to expire
+    assert done.wait(1)
     time.sleep(0.2)
     
-    # Third event after cooldown should trigger
-    handler.on_any_event(MockEvent("test/file3.md"))
-    assert callback_count == 2
+    # Exactly one callback, after the final event
+    assert len(calls) == 1
+    assert calls[0] >= last_event
+
+
+def test_debounce_max_latency():
+    """Test that a continuous burst cannot delay the callback beyond max_latency."""
+    done = Event()
+    handler = RuleChangeHandler(lambda changes: done.set(), quiet_period=0.1, max_latency=0.2)
+    
+    class MockEvent:
+        def __init__(self, path):
+            self.src_path = path
+            self.is_directory = False
+            self.event_type = "modified"
+    
+    start = time.monotonic()
+    while not done.is_set() and time.monotonic() - start < 2:
+        handler.on_any_event(MockEvent("test/file.md"))
+        time.sleep(0.02)
+    
+    assert done.is_set()
+    assert time.monotonic() - start < 1
+
+
+def test_flush_and_cancel():
+    """Test running or discarding pending changes immediately."""
+    calls = []
+    handler = RuleChangeHandler(lambda changes: calls.append(1), quiet_period=10)
+    
+    class MockEvent:
+        src_path = "test/file.md"
+        is_directory = False
+        event_type = "modified"
+    
+    assert handler.flush() is False
+    
+    handler.on_any_event(MockEvent())
+    assert handler.pending
+    assert handler.flush() is True
+    assert calls == [1]
+    assert not handler.pending
+    
+    handler.on_any_event(MockEvent())
+    handler.cancel()
+    assert not handler.pending
+    assert handler.flush() is False
+    assert calls == [1]
+
+
+def test_change_set_coalesces_events():
+    """Test that events for the same path are merged."""
+    changes = ChangeSet()
+    
+    # Created and modified is still a creation
+    changes.add("created", Path("a.md"))
+    changes.add("modified", Path("a.md"))
+    # Deleted and recreated, as by an atomic save, is a modification
+    changes.add("deleted", Path("b.md"))
+    changes.add("created", Path("b.md"))
+    # Created and deleted again cancels out
+    changes.add("created", Path("tmp.md"))
+    changes.add("deleted", Path("tmp.md"))
+    # Chained moves keep the original source
+    changes.add("moved", Path("c.md"), Path("d.md"))
+    changes.add("moved", Path("d.md"), Path("e.md"))
+    
+    assert changes.created == {Path("a.md")}
+    assert changes.modified == {Path("b.md")}
+    assert changes.deleted == set()
+    assert changes.moved == {Path("c.md"): Path("e.md")}
+    assert changes.paths == {Path("a.md"), Path("b.md"), Path("c.md"), Path("e.md")}
+    
+    # Moving back to the original path leaves nothing to report
+    changes = ChangeSet()
+    changes.add("moved", Path("c.md"), Path("d.md"))
+    changes.add("moved", Path("d.md"), Path("c.md"))
+    assert not changes
+
+
+def test_rule_change_handler_reports_paths(tmp_path):
+    """Test that the callback receives the paths touched by a burst."""
+    received = []
+    handler = RuleChangeHandler(received.append, quiet_period=10)
+    
+    handler.on_any_event(FileCreatedEvent(str(tmp_path / "new.md")))
+    handler.on_any_event(FileModifiedEvent(str(tmp_path / "main.md")))
+    handler.on_any_event(FileMovedEvent(str(tmp_path / "old.md"), str(tmp_path / "renamed.md")))
+    handler.on_any_event(FileMovedEvent(str(tmp_path / "draft.txt"), str(tmp_path / "final.md")))
+    handler.on_any_event(DirDeletedEvent(str(tmp_path / "sub")))
+    handler.on_any_event(FileCreatedEvent(str(tmp_path / ".airulefyignore")))
+    # Reading files and directory entry updates are not changes
+    handler.on_any_event(FileOpenedEvent(str(tmp_path / "main.md")))
+    handler.on_any_event(FileClosedNoWriteEvent(str(tmp_path / "main.md")))
+    handler.on_any_event(DirModifiedEvent(str(tmp_path)))
+    handler.on_any_event(FileModifiedEvent(str(tmp_path / "notes.txt")))
+    handler.flush()
+    
+    assert len(received) == 1
+    changes = received[0]
+    assert changes.created == {tmp_path / "new.md", tmp_path / ".airulefyignore"}
+    assert changes.modified == {tmp_path / "main.md"}
+    assert changes.deleted == {tmp_path / "sub"}
+    assert changes.moved == {
+        tmp_path / "old.md": tmp_path / "renamed.md",
+        tmp_path / "draft.txt": tmp_path / "final.md",
+    }
+
+
+def test_rule_change_handler_event_storm(tmp_path):
+    """Test that too many paths in a burst fall back to a rescan."""
+    received = []
+    handler = RuleChangeHandler(received.append, quiet_period=10, storm_paths=5)
+    
+    for i in range(20):
+        handler.on_any_event(FileCreatedEvent(str(tmp_path / f"file{i}.md")))
+    handler.flush()
+    
+    assert handler.storms == 1
+    assert len(received) == 1
+    assert received[0].rescan
+    assert received[0].paths == set()
+    
+    # The next burst tracks paths again
+    handler.on_any_event(FileModifiedEvent(str(tmp_path / "main.md")))
+    handler.flush()
+    assert not received[1].rescan
+    assert received[1].modified == {tmp_path / "main.md"}
+
+
+def test_rule_change_handler_event_rate(tmp_path):
+    """Test that too many events within a second fall back to a rescan."""
+    received = []
+    handler = RuleChangeHandler(received.append, quiet_period=10, storm_rate=10)
+    
+    # Few distinct paths, but many events
+    for _ in range(20):
+        handler.on_any_event(FileModifiedEvent(str(tmp_path / "main.md")))
+    handler.flush()
+    
+    assert handler.storms == 1
+    assert received[0].rescan
+
+
+def test_change_set_rescan_absorbs_changes():
+    """Test that merging with a rescan drops the tracked paths."""
+    changes = ChangeSet(modified={Path("a.md")})
+    changes.update(ChangeSet(rescan=True))
+    assert changes.rescan
+    assert changes.paths == set()
+    assert changes
+    
+    changes.add("created", Path("b.md"))
+    changes.update(ChangeSet(deleted={Path("c.md")}))
+    assert changes.paths == set()
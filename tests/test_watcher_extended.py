@@ -3,15 +3,29 @@ Extended tests for the watcher module.
 """
 
 import os
+import shutil
 import tempfile
+import threading
 import time
 from pathlib import Path
-from threading import Event
+from threading import Event, Thread
 from unittest.mock import MagicMock, patch
 
 import pytest
+from watchdog.events import FileModifiedEvent
 
-from airulefy.watcher import RuleChangeHandler, watch_directory
+from airulefy.build import ToolStatus
+from airulefy.metrics import WatchMetrics
+from airulefy.observers import InotifyObserver
+from airulefy.options import WatchBackend
+from airulefy.watcher import (
+    ChangeSet,
+    RegenerationWorker,
+    RuleChangeHandler,
+    RuleWatcher,
+    WatchedProject,
+    watch_directory,
+)
 
 
 class TestRuleChangeHandler:
@@ -33,7 +47,9 @@ class TestRuleChangeHandler:
         # Call on_any_event
         handler.on_any_event(event)
         
-        # Check that callback was called once
+        # The callback runs once the pending change is flushed
+        callback.assert_not_called()
+        assert handler.flush() is True
         callback.assert_called_once()
     
     def test_on_any_event_non_md_file(self):
@@ -74,8 +90,8 @@ class TestRuleChangeHandler:
         # Check that callback was never called
         callback.assert_not_called()
         
-    def test_cooldown_period(self):
-        """Test that the cooldown period prevents rapid multiple triggers."""
+    def test_burst_coalesced(self):
+        """Test that rapid events are coalesced into a single callback."""
         # Create a mock callback
         callback = MagicMock()
         
@@ -89,7 +105,8 @@ class TestRuleChangeHandler:
         
         # Call on_any_event multiple times in rapid succession
         handler.on_any_event(event)
-        handler.on_any_event(event)  # This should be ignored due to cooldown
+        handler.on_any_event(event)  # Coalesced with the first event
+        handler.flush()
         
         # Check that callback was called only once
         callback.assert_called_once()
@@ -102,30 +119,21 @@ def test_watch_directory(tmp_path):
     watch_dir.mkdir()
     
     # Create a mock callback
-    callback = MagicMock()
-    
-    # Use a side effect to exit the infinite loop in watch_directory
-    # First call allows loop to start, second call raises KeyboardInterrupt to exit
-    keyboard_interrupts = [False, True]
-    def side_effect(*args, **kwargs):
-        if keyboard_interrupts.pop(0):
-            raise KeyboardInterrupt()
-        time.sleep(0.1)
+    called = Event()
+    callback = MagicMock(side_effect=lambda changes: called.set())
+    stop_event = Event()
     
-    # Patch time.sleep to control the loop
-    with patch('airulefy.watcher.Observer') as MockObserver, \
-         patch('airulefy.watcher.time.sleep', side_effect=side_effect):
-        
+    with patch('airulefy.watcher.create_observer') as MockObserver:
         # Configure the mock observer
         mock_observer = MockObserver.return_value
+        scheduled = Event()
+        mock_observer.start.side_effect = lambda: scheduled.set()
         
-        # Call the function - this will return when KeyboardInterrupt is raised
-        watch_directory(watch_dir, callback)
-        
-        # Check that observer was started and stopped
-        mock_observer.start.assert_called_once()
-        mock_observer.stop.assert_called_once()
-        mock_observer.join.assert_called_once()
+        # Watch in a thread, which blocks until the stop event is set
+        thread = Thread(target=watch_directory, args=(watch_dir, callback), 
+                        kwargs={"stop_event": stop_event})
+        thread.start()
+        assert scheduled.wait(1)
         
         # Create a mock event to simulate file change
         mock_handler = mock_observer.schedule.call_args[0][0]
@@ -133,8 +141,384 @@ def test_watch_directory(tmp_path):
         mock_event.is_directory = False
         mock_event.src_path = str(watch_dir / "test.md")
         
-        # Simulate the file event
+        # Simulate the file event; the callback runs on the worker thread
         mock_handler.on_any_event(mock_event)
+        mock_handler.flush()
+        assert called.wait(1)
+        assert callback.call_args[0][0].modified == {watch_dir / "test.md"}
+        
+        stop_event.set()
+        thread.join(1)
+        assert not thread.is_alive()
         
-        # Check that callback was called
+        # Check that observer was started and stopped
+        mock_observer.start.assert_called_once()
+        mock_observer.stop.assert_called_once()
+        mock_observer.join.assert_called_once()
         callback.assert_called_once()
+
+
+def test_watch_directory_keyboard_interrupt(tmp_path):
+    """Test that Ctrl+C stops watching and processes pending changes."""
+    stop_event = MagicMock()
+    stop_event.wait.side_effect = KeyboardInterrupt()
+    
+    with patch('airulefy.watcher.create_observer') as MockObserver:
+        mock_observer = MockObserver.return_value
+        watch_directory(tmp_path, MagicMock(), stop_event=stop_event)
+        
+        mock_observer.stop.assert_called_once()
+        mock_observer.join.assert_called_once()
+
+
+def test_regeneration_worker_collapses_requests():
+    """Test that requests arriving during a regeneration are merged."""
+    started = Event()
+    release = Event()
+    calls = []
+    
+    def callback(changes):
+        calls.append(changes.paths)
+        started.set()
+        release.wait(1)
+    
+    worker = RegenerationWorker(callback)
+    worker.start()
+    
+    worker.submit(ChangeSet(modified={Path("a.md")}))
+    assert started.wait(1)
+    
+    # The first regeneration is still running
+    worker.submit(ChangeSet(modified={Path("b.md")}))
+    worker.submit(ChangeSet(created={Path("c.md")}))
+    release.set()
+    worker.stop()
+    
+    assert calls == [{Path("a.md")}, {Path("b.md"), Path("c.md")}]
+
+
+def test_regeneration_worker_requires_callback():
+    """Test that submitting without any callback is rejected."""
+    with pytest.raises(ValueError):
+        RegenerationWorker().submit(ChangeSet())
+
+
+def test_regeneration_worker_survives_errors(capsys):
+    """Test that a failing regeneration does not stop the worker."""
+    calls = []
+    first_done = Event()
+    
+    def callback(changes):
+        calls.append(changes)
+        if len(calls) == 1:
+            first_done.set()
+            raise RuntimeError("Mocked failure")
+    
+    worker = RegenerationWorker(callback)
+    worker.start()
+    worker.submit(ChangeSet(modified={Path("a.md")}))
+    assert first_done.wait(1)
+    worker.submit(ChangeSet(modified={Path("b.md")}))
+    worker.stop()
+    
+    assert len(calls) == 2
+    assert "Mocked failure" in capsys.readouterr().out
+
+
+def setup_project(tmp_path: Path) -> Path:
+    """Create a project with one rule file and a copy-mode configuration."""
+    ai_dir = tmp_path / ".ai"
+    ai_dir.mkdir()
+    (ai_dir / "main.md").write_text("# Main Rules")
+    config_file = tmp_path / ".ai-rules.yml"
+    config_file.write_text("default_mode: copy\n")
+    return config_file
+
+
+def test_watched_project_reloads_changed_tool_config(tmp_path):
+    """Test that a configuration change only regenerates the affected tools."""
+    config_file = setup_project(tmp_path)
+    project = WatchedProject(tmp_path)
+    assert len(project.regenerate()) == 4
+    
+    config_file.write_text("default_mode: copy\ntools:\n  cline:\n    output: rules/cline.md\n")
+    results = project.regenerate(ChangeSet(modified={config_file}))
+    
+    assert [r.tool_name for r in results] == ["cline"]
+    assert (tmp_path / "rules" / "cline.md").read_text() == "# Main Rules"
+    # The output of the previous configuration is removed
+    assert not (tmp_path / ".cline-rules").exists()
+    
+    # Changes that leave the tool configurations alone regenerate nothing
+    config_file.write_text(
+        "# Comment\ndefault_mode: copy\ntools:\n  cline:\n    output: rules/cline.md\n"
+    )
+    assert project.regenerate(ChangeSet(modified={config_file})) is None
+
+
+def test_watched_project_keeps_config_on_error(tmp_path, capsys):
+    """Test that an invalid configuration file keeps the previous configuration."""
+    config_file = setup_project(tmp_path)
+    project = WatchedProject(tmp_path)
+    project.regenerate()
+    
+    config_file.write_text("default_mode: [not valid")
+    assert project.regenerate(ChangeSet(modified={config_file})) is None
+    assert project.config.default_mode == "copy"
+    assert "Error loading" in capsys.readouterr().out
+
+
+def test_watched_project_rescans_after_event_storm(tmp_path):
+    """Test that a rescan picks up changes whose paths were not tracked."""
+    config_file = setup_project(tmp_path)
+    project = WatchedProject(tmp_path)
+    project.regenerate()
+    
+    (tmp_path / ".ai" / "extra.md").write_text("# Extra Rules")
+    config_file.write_text("default_mode: copy\ntools:\n  cline:\n    output: rules/cline.md\n")
+    results = project.regenerate(ChangeSet(rescan=True))
+    
+    assert project.rescans == 1
+    assert project.config.tools["cline"].output == "rules/cline.md"
+    assert "# Extra Rules" in (tmp_path / "rules" / "cline.md").read_text()
+    assert all(r.status != ToolStatus.FAILED for r in results)
+
+
+def test_watched_project_moves_input_dir(tmp_path):
+    """Test that changing input_path rediscovers the inputs and re-points the observer."""
+    config_file = setup_project(tmp_path)
+    rules_dir = tmp_path / "rules"
+    rules_dir.mkdir()
+    (rules_dir / "other.md").write_text("# Other Rules")
+    
+    project = WatchedProject(tmp_path)
+    with patch('airulefy.watcher.create_observer') as MockObserver:
+        mock_observer = MockObserver.return_value
+        watcher = RuleWatcher()
+        watcher.add_project(project)
+        watcher.start()
+        
+        # Project root for the configuration file and the input directory
+        scheduled = [call.args[1] for call in mock_observer.schedule.call_args_list]
+        assert scheduled == [str(tmp_path), str(tmp_path / ".ai")]
+        
+        config_file.write_text("default_mode: copy\ninput_path: rules\n")
+        watcher._entries[0].regenerate(ChangeSet(modified={config_file}))
+        
+        assert project.builder.input_files == [rules_dir / "other.md"]
+        assert (tmp_path / ".cline-rules").read_text() == "# Other Rules"
+        mock_observer.unschedule.assert_called_once()
+        assert mock_observer.schedule.call_args.args[1] == str(rules_dir)
+        
+        watcher.stop()
+
+
+def test_rule_watcher_rearms_recreated_input_dir(tmp_path):
+    """Test that a deleted and recreated input directory is watched again."""
+    setup_project(tmp_path)
+    input_dir = tmp_path / ".ai"
+    
+    project = WatchedProject(tmp_path)
+    with patch('airulefy.watcher.create_observer') as MockObserver:
+        mock_observer = MockObserver.return_value
+        watcher = RuleWatcher()
+        watcher.add_project(project)
+        entry = watcher._entries[0]
+        
+        # The watch of a deleted directory is kept until it is created again
+        shutil.rmtree(input_dir)
+        entry.regenerate(ChangeSet(deleted={input_dir}))
+        mock_observer.unschedule.assert_not_called()
+        
+        input_dir.mkdir()
+        (input_dir / "main.md").write_text("# Recreated Rules")
+        entry.regenerate(ChangeSet(created={input_dir}))
+        mock_observer.unschedule.assert_called_once()
+        assert mock_observer.schedule.call_count == 3
+        assert mock_observer.schedule.call_args.args[1] == str(input_dir)
+        assert (tmp_path / ".cline-rules").read_text() == "# Recreated Rules"
+        
+        # Replaced by another directory without an event for it
+        (tmp_path / "switched").mkdir()
+        (tmp_path / "switched" / "main.md").write_text("# Switched Rules")
+        shutil.rmtree(input_dir)
+        (tmp_path / "switched").rename(input_dir)
+        entry.regenerate(ChangeSet(modified={input_dir / "main.md"}))
+        assert mock_observer.unschedule.call_count == 2
+        assert mock_observer.schedule.call_count == 4
+        assert mock_observer.schedule.call_args.args[1] == str(input_dir)
+        
+        # Paths hidden by an event storm
+        entry.regenerate(ChangeSet(rescan=True))
+        assert mock_observer.unschedule.call_count == 3
+        assert mock_observer.schedule.call_count == 5
+        
+        # Other changes keep the watch
+        entry.regenerate(ChangeSet(modified={input_dir / "main.md"}))
+        assert mock_observer.schedule.call_count == 5
+
+
+def test_watched_project_drops_own_writes(tmp_path):
+    """Test that events caused by the project's own output writes are ignored."""
+    config_file = setup_project(tmp_path)
+    config_file.write_text("default_mode: copy\ntools:\n  devin:\n    output: .ai/devin.md\n")
+    output_file = tmp_path / ".ai" / "devin.md"
+    
+    project = WatchedProject(tmp_path)
+    project.regenerate()
+    assert output_file.exists()
+    
+    with patch.object(project.builder, "rebuild") as mock_rebuild:
+        assert project.regenerate(ChangeSet(created={output_file})) is None
+        mock_rebuild.assert_not_called()
+    assert project.suppressed_events == 1
+    
+    # A hand edit of the output is not our own write
+    output_file.write_text("# Edited")
+    assert not project.is_own_write(output_file)
+
+
+def test_rule_watcher_routes_events_to_projects(tmp_path):
+    """Test that one watcher hosts several projects and routes their events."""
+    project_roots = [tmp_path / "a", tmp_path / "b"]
+    for project_root in project_roots:
+        project_root.mkdir()
+        setup_project(project_root)
+    
+    with patch('airulefy.watcher.create_observer') as MockObserver:
+        mock_observer = MockObserver.return_value
+        watcher = RuleWatcher()
+        for project_root in project_roots:
+            watcher.add_project(WatchedProject(project_root))
+        
+        # One observer with a root and an input directory watch per project
+        MockObserver.assert_called_once()
+        assert mock_observer.schedule.call_count == 4
+        
+        entry_a, entry_b = watcher._entries
+        watcher.on_any_event(FileModifiedEvent(str(tmp_path / "b" / ".ai" / "main.md")))
+        assert entry_b.handler.pending
+        assert not entry_a.handler.pending
+        
+        watcher.on_any_event(FileModifiedEvent(str(tmp_path / "a" / ".ai-rules.yml")))
+        assert entry_a.handler.pending
+        
+        # Events outside every project are dropped
+        entry_a.handler.cancel()
+        entry_b.handler.cancel()
+        watcher.on_any_event(FileModifiedEvent(str(tmp_path / "other" / "x.md")))
+        assert not entry_a.handler.pending and not entry_b.handler.pending
+
+
+def test_rule_watcher_shares_watches(tmp_path):
+    """Test that projects watching the same directory share one watch."""
+    setup_project(tmp_path)
+    
+    with patch('airulefy.watcher.create_observer') as MockObserver:
+        mock_observer = MockObserver.return_value
+        watcher = RuleWatcher()
+        watcher.add_project(WatchedProject(tmp_path))
+        watcher.add_project(WatchedProject(tmp_path))
+        assert mock_observer.schedule.call_count == 2
+        
+        watcher._release_watch(tmp_path / ".ai", recursive=True)
+        mock_observer.unschedule.assert_not_called()
+        watcher._release_watch(tmp_path / ".ai", recursive=True)
+        mock_observer.unschedule.assert_called_once()
+
+
+@pytest.mark.skipif(not InotifyObserver.is_supported(), reason="inotify is not available")
+def test_rule_watcher_watches_more_projects_than_inotify_instances(tmp_path):
+    """Test that native watching of many projects uses one inotify instance and one thread."""
+    def count_inotify_instances():
+        links = []
+        for fd in os.listdir("/proc/self/fd"):
+            try:
+                links.append(os.readlink(f"/proc/self/fd/{fd}"))
+            except OSError:
+                continue
+        return links.count("anon_inode:inotify")
+    
+    # More projects than the default limit of 128 inotify instances per user
+    project_roots = [tmp_path / f"p{i}" for i in range(150)]
+    for project_root in project_roots:
+        project_root.mkdir()
+        setup_project(project_root)
+    
+    instances = count_inotify_instances()
+    threads = threading.active_count()
+    regenerated = Event()
+    watcher = RuleWatcher(
+        lambda project, results: (
+            regenerated.set() if project.project_root == project_roots[-1] else None
+        ),
+        quiet_period=0.05,
+        backend=WatchBackend.NATIVE,
+    )
+    for project_root in project_roots:
+        project = WatchedProject(project_root)
+        project.regenerate()
+        watcher.add_project(project)
+    watcher.start()
+    try:
+        # The observer and the regeneration worker
+        assert threading.active_count() == threads + 2
+        assert count_inotify_instances() == instances + 1
+        
+        (project_roots[-1] / ".ai" / "main.md").write_text("# Changed Rules")
+        assert regenerated.wait(5)
+        assert "Changed Rules" in (project_roots[-1] / ".cline-rules").read_text()
+    finally:
+        watcher.stop()
+
+
+def test_rule_watcher_passes_symlink_policy(tmp_path):
+    """Test that input directory watches follow the project's symlink setting."""
+    config_file = setup_project(tmp_path)
+    config_file.write_text("default_mode: copy\nfollow_symlinks: true\n")
+    
+    with patch('airulefy.watcher.create_observer') as MockObserver:
+        mock_observer = MockObserver.return_value
+        watcher = RuleWatcher()
+        watcher.add_project(WatchedProject(tmp_path))
+        mock_observer.schedule.assert_called_with(
+            watcher, str(tmp_path / ".ai"), recursive=True, follow_symlinks=True
+        )
+        
+        # Turning the setting off while watching replaces the watch
+        config_file.write_text("default_mode: copy\n")
+        watcher._entries[0].regenerate(ChangeSet(modified={config_file}))
+        mock_observer.unschedule.assert_called_once()
+        mock_observer.schedule.assert_called_with(
+            watcher, str(tmp_path / ".ai"), recursive=True, follow_symlinks=False
+        )
+
+
+def test_rule_watcher_records_metrics(tmp_path):
+    """Test that regenerations record their latency, events and tool durations."""
+    setup_project(tmp_path)
+    project = WatchedProject(tmp_path)
+    project.regenerate()
+    metrics = WatchMetrics()
+    
+    with patch('airulefy.watcher.create_observer'):
+        watcher = RuleWatcher(metrics=metrics)
+        watcher.add_project(project)
+        entry = watcher._entries[0]
+        
+        main_file = tmp_path / ".ai" / "main.md"
+        main_file.write_text("# Changed Rules")
+        for _ in range(3):
+            entry.handler.on_any_event(FileModifiedEvent(str(main_file)))
+        changes = entry.handler._take_pending()
+        assert changes.event_count == 3
+        entry.regenerate(changes)
+    
+    text = metrics.render()
+    assert f'airulefy_watch_event_to_rebuild_seconds_count{{project="{tmp_path}"}} 1' in text
+    assert f'airulefy_watch_coalesced_events_total{{project="{tmp_path}"}} 2' in text
+    assert f'airulefy_watch_rebuilds_total{{project="{tmp_path}"}} 1' in text
+    assert (
+        f'airulefy_watch_tool_rebuild_seconds_count{{project="{tmp_path}",tool="cursor"}} 1'
+        in text
+    )